@@ -1,5 +1,4 @@
-from flask import Flask, jsonify, request
-from flask_mysqldb import MySQL
+from flask import Flask, jsonify, request, g
 from flask_cors import CORS, cross_origin
 import pymysql
 from werkzeug.security import generate_password_hash, check_password_hash
@@ -10,21 +9,32 @@ import jwt
 from functools import wraps
 import os
 import json
+import threading
 
 # Import our models and utilities
-from models import AIModels, RecommendationEngine, PricingOptimizer, TravelChatbot
-
-# Configure logging
-logging.basicConfig(
-    level=logging.DEBUG,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler('app.log'),
-        logging.StreamHandler()
-    ]
+from models import AIModels, RecommendationEngine, PricingOptimizer, TravelChatbot, DEFAULT_MODELS_DIR
+from model_server import ModelServerClient
+from training_jobs import DEFAULT_JOBS_DIR, TrainingJobRunner
+from db_pool import PooledMySQL
+from migrations import run_migrations
+from logging_config import configure_logging, RequestLogSampler
+from http_cache import NO_STORE
+
+# Configure logging: records are queued and written by a background thread
+log_listener = configure_logging(
+    'app.log',
+    level=os.environ.get('LOG_LEVEL', 'INFO').upper(),
+    max_bytes=int(os.environ.get('LOG_MAX_BYTES', 10 * 1024 * 1024)),
+    backup_count=int(os.environ.get('LOG_BACKUP_COUNT', 5))
 )
 logger = logging.getLogger(__name__)
 
+# Access-log sampling per route prefix; override with LOG_SAMPLE_RATES="/api/tours=0.1,..."
+request_log_sampler = RequestLogSampler.from_string(
+    os.environ.get('LOG_SAMPLE_RATES', '/api/health=0,/api/ready=0,/api/tours=0.1,/api/guides=0.1'),
+    default_rate=float(os.environ.get('LOG_SAMPLE_DEFAULT', 1.0))
+)
+
 app = Flask(__name__)
 
 # Configuration
@@ -39,7 +49,32 @@ app.config['MYSQL_DB'] = 'tour_system'
 app.config['MYSQL_CURSORCLASS'] = 'DictCursor'
 app.config['MYSQL_CONNECT_TIMEOUT'] = 10
 
-mysql = MySQL(app)
+# Connection pool configuration
+app.config['MYSQL_POOL_MIN_SIZE'] = int(os.environ.get('MYSQL_POOL_MIN_SIZE', 2))
+app.config['MYSQL_POOL_MAX_SIZE'] = int(os.environ.get('MYSQL_POOL_MAX_SIZE', 10))
+app.config['MYSQL_POOL_TIMEOUT'] = float(os.environ.get('MYSQL_POOL_TIMEOUT', 5))
+app.config['MYSQL_POOL_IDLE_TIMEOUT'] = float(os.environ.get('MYSQL_POOL_IDLE_TIMEOUT', 300))
+app.config['MYSQL_POOL_PING_ON_BORROW'] = True
+
+# Micro-batching of concurrent AI predictions
+app.config['AI_MICRO_BATCHING'] = os.environ.get('AI_MICRO_BATCHING', '1') == '1'
+app.config['AI_BATCH_MAX_ROWS'] = int(os.environ.get('AI_BATCH_MAX_ROWS', 64))
+app.config['AI_BATCH_WINDOW_MS'] = float(os.environ.get('AI_BATCH_WINDOW_MS', 2))
+
+# Optional out-of-process model server (python model_server.py); when set,
+# workers forward predictions over this Unix socket instead of loading models
+app.config['AI_MODEL_SERVER_SOCKET'] = os.environ.get('AI_MODEL_SERVER_SOCKET')
+
+# Poll models/CURRENT and hot-reload new releases (0 disables)
+app.config['AI_MODEL_WATCH_SECONDS'] = float(os.environ.get('AI_MODEL_WATCH_SECONDS', 30))
+
+# Background training jobs (POST /api/train-models); each job publishes a model release
+app.config['TRAINING_CSV_PATH'] = os.environ.get(
+    'TRAINING_CSV_PATH', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'tour_package.csv')
+)
+app.config['TRAINING_JOBS_DIR'] = os.environ.get('TRAINING_JOBS_DIR', DEFAULT_JOBS_DIR)
+
+mysql = PooledMySQL(app)
 
 # COMPLETE CORS FIX - Most permissive configuration
 CORS(app, resources={
@@ -55,7 +90,16 @@ CORS(app, resources={
 })
 
 # Initialize models
-ai_models = AIModels()
+if app.config['AI_MODEL_SERVER_SOCKET']:
+    ai_models = ModelServerClient(app.config['AI_MODEL_SERVER_SOCKET'])
+else:
+    ai_models = AIModels()
+training_jobs = TrainingJobRunner(
+    app.config['TRAINING_CSV_PATH'],
+    getattr(ai_models, 'models_dir', DEFAULT_MODELS_DIR),
+    jobs_dir=app.config['TRAINING_JOBS_DIR'],
+    ai_models=ai_models
+)
 recommender = RecommendationEngine()
 pricing_optimizer = PricingOptimizer()
 chatbot = TravelChatbot()
@@ -63,11 +107,14 @@ chatbot = TravelChatbot()
 # Handle ALL preflight requests globally
 @app.before_request
 def handle_preflight():
-    # Log all requests for debugging
-    logger.info(f"{request.method} {request.path} from {request.headers.get('Origin', 'no-origin')}")
+    # Sample access logs per route; the decision is reused in after_request
+    g.log_request = request_log_sampler.should_log(request.path)
+    if g.log_request:
+        logger.info("%s %s from %s", request.method, request.path, request.headers.get('Origin', 'no-origin'))
     
     if request.method == "OPTIONS":
-        logger.info(f"Handling OPTIONS request for {request.path}")
+        if g.log_request:
+            logger.debug("Handling OPTIONS request for %s", request.path)
         response = jsonify({'status': 'ok', 'message': 'CORS preflight successful'})
         response.headers['Access-Control-Allow-Origin'] = '*'
         response.headers['Access-Control-Allow-Methods'] = 'GET, POST, PUT, DELETE, OPTIONS'
@@ -84,13 +131,19 @@ def after_request(response):
     response.headers['Access-Control-Allow-Methods'] = 'GET, POST, PUT, DELETE, OPTIONS'
     response.headers['Access-Control-Allow-Headers'] = 'Content-Type, Authorization, Accept, Origin, X-Requested-With'
     response.headers['Access-Control-Expose-Headers'] = '*'
-    response.headers['Cache-Control'] = 'no-cache, no-store, must-revalidate'
-    response.headers['Pragma'] = 'no-cache'
-    response.headers['Expires'] = '0'
     
-    # Log response for debugging
+    # Catalogue routes set their own cache policy; everything else is no-store
+    if 'Cache-Control' not in response.headers:
+        response.headers['Cache-Control'] = NO_STORE
+        response.headers['Pragma'] = 'no-cache'
+        response.headers['Expires'] = '0'
+    
+    # Log response for debugging; errors are always logged
     if request.method != 'OPTIONS':
-        logger.debug(f"Response to {request.method} {request.path}: {response.status_code}")
+        if response.status_code >= 400:
+            logger.info("Response to %s %s: %s", request.method, request.path, response.status_code)
+        elif g.get('log_request', False):
+            logger.debug("Response to %s %s: %s", request.method, request.path, response.status_code)
     
     return response
 
@@ -148,8 +201,37 @@ def close_db_cursor(cursor):
     except Exception as e:
         logger.error(f"Failed to close cursor: {str(e)}")
 
+# Admin Role Decorator; goes below @token_required
+def admin_required(f):
+    @wraps(f)
+    def decorated(current_user, *args, **kwargs):
+        cur = None
+        try:
+            # Read the role from the database so a demotion applies immediately
+            cur = get_db_cursor()
+            cur.execute("SELECT role FROM users WHERE id = %s", (current_user,))
+            user = cur.fetchone()
+        except Exception as e:
+            logger.error(f"Role check failed: {str(e)}")
+            return jsonify({
+                "status": "error",
+                "message": "Authorization check failed"
+            }), 500
+        finally:
+            if cur:
+                close_db_cursor(cur)
+        
+        if not user or user['role'] != 'admin':
+            return jsonify({
+                "status": "error",
+                "message": "Admin access required"
+            }), 403
+        
+        return f(current_user, *args, **kwargs)
+    return decorated
+
 # Database initialization
-def init_db():
+def init_db(apply_migrations=True):
     cur = None
     try:
         try:
@@ -314,6 +396,11 @@ def init_db():
         
         mysql.connection.commit()
         logger.info("Database tables initialized successfully!")
+        
+        # Bring indexes and later schema changes up to date
+        if apply_migrations:
+            run_migrations(mysql.connection)
+        
         return True
         
     except pymysql.Error as e:
@@ -371,35 +458,156 @@ def cors_debug():
         "server_time": datetime.now().isoformat()
     })
 
+# Connection pool metrics
+@app.route('/api/db-pool/metrics', methods=['GET'])
+def db_pool_metrics():
+    return jsonify({
+        "status": "success",
+        "data": mysql.pool.get_metrics()
+    })
+
+# Recommendation neighbour-table staleness
+@app.route('/api/recommender/metrics', methods=['GET'])
+def recommender_metrics():
+    return jsonify({
+        "status": "success",
+        "data": recommender.get_staleness_metrics()
+    })
+
+# AI prediction micro-batcher queue depth, batch sizes and added wait
+@app.route('/api/ai/batcher/metrics', methods=['GET'])
+def ai_batcher_metrics():
+    try:
+        return jsonify({
+            "status": "success",
+            "data": ai_models.get_batcher_metrics()
+        })
+    except Exception as e:
+        return jsonify({
+            "status": "error",
+            "message": f"Batcher metrics unavailable: {str(e)}"
+        }), 503
+
 # Import routes AFTER defining app
 from routes import register_routes
 register_routes(app, mysql, ai_models, recommender, pricing_optimizer, chatbot, 
-               token_required, get_db_cursor, close_db_cursor, logger)
+               token_required, get_db_cursor, close_db_cursor, logger, admin_required,
+               training_jobs=training_jobs)
+
+def load_recommender():
+    """Fit the recommendation engine from existing bookings"""
+    cur = None
+    try:
+        cur = get_db_cursor()
+        cur.execute("SELECT id FROM users")
+        users = cur.fetchall()
+        cur.execute("SELECT id FROM tours")
+        tours = cur.fetchall()
+        cur.execute("SELECT user_id, tour_id FROM bookings WHERE user_id IS NOT NULL")
+        bookings = cur.fetchall()
+        recommender.fit(bookings, users, tours)
+    finally:
+        if cur:
+            close_db_cursor(cur)
 
 # Initialize application
+startup_state = {
+    "ready": False,
+    "database_initialized": False,
+    "models_loaded": False,
+    "warmup_ms": None,
+    "started_at": None,
+    "completed_at": None,
+    "error": None
+}
+startup_lock = threading.Lock()
+
 def initialize_app():
     """Initialize the app with database and AI models"""
-    if not hasattr(app, 'initialized'):
-        logger.info("Initializing Sri Lanka AI-powered tour system...")
+    with startup_lock:
+        if getattr(app, 'initialized', False):
+            return
         
-        if init_db():
-            logger.info("Database initialized successfully")
-        else:
-            logger.error("Database initialization failed")
+        logger.info("Initializing Sri Lanka AI-powered tour system...")
+        startup_state["started_at"] = datetime.now().isoformat()
         
-        # Try to load pre-trained models
-        if ai_models.load_models():
-            logger.info("AI models loaded successfully!")
-        else:
-            logger.warning("AI models not found. Train models using /api/train-models")
+        try:
+            with app.app_context():
+                try:
+                    mysql.pool.prefill()
+                    logger.info(f"Database pool ready with {mysql.pool.min_size} connections")
+                except Exception as e:
+                    logger.error(f"Failed to prefill database pool: {str(e)}")
+                
+                if init_db():
+                    startup_state["database_initialized"] = True
+                    logger.info("Database initialized successfully")
+                else:
+                    startup_state["error"] = "Database initialization failed"
+                    logger.error("Database initialization failed")
+                
+                # Seed the recommendation engine; create_booking keeps it current
+                try:
+                    load_recommender()
+                    recommender.precompute_neighbours()
+                    recommender.start_background_refresh(
+                        interval=float(os.environ.get('RECOMMENDER_REFRESH_SECONDS', 300))
+                    )
+                except Exception as e:
+                    logger.error(f"Failed to load recommendation data: {str(e)}")
+                
+                # Warm the in-process tours/guides caches
+                for name, cache in app.extensions['catalogue_cache'].items():
+                    try:
+                        cache.reload()
+                    except Exception as e:
+                        logger.error(f"Failed to load {name} catalogue cache: {str(e)}")
+            
+            # Try to load pre-trained models
+            if ai_models.load_models(parallel=True):
+                startup_state["models_loaded"] = True
+                logger.info("AI models loaded successfully!")
+                startup_state["warmup_ms"] = round(ai_models.warm_up() * 1000, 2)
+                if app.config['AI_MICRO_BATCHING']:
+                    ai_models.enable_micro_batching(
+                        max_batch_size=app.config['AI_BATCH_MAX_ROWS'],
+                        max_wait_ms=app.config['AI_BATCH_WINDOW_MS']
+                    )
+            else:
+                logger.warning("AI models not found. Train models using /api/train-models")
+            
+            # Also catches the first release when starting without models
+            if app.config['AI_MODEL_WATCH_SECONDS'] > 0:
+                ai_models.start_release_watcher(interval=app.config['AI_MODEL_WATCH_SECONDS'])
+        except Exception as e:
+            startup_state["error"] = str(e)
+            logger.error(f"Startup initialization failed: {str(e)}")
         
         app.initialized = True
+        startup_state["ready"] = (startup_state["database_initialized"] and startup_state["models_loaded"]
+                                  and startup_state["error"] is None)
+        startup_state["completed_at"] = datetime.now().isoformat()
 
-# Initialize on first request only
-@app.before_request
-def check_initialization():
-    if not hasattr(app, 'initialized'):
-        initialize_app()
+# Readiness probe: load balancers should only route to warm workers
+@app.route('/api/ready', methods=['GET'])
+def readiness_check():
+    if (not startup_state["ready"] and startup_state["completed_at"] and startup_state["error"] is None
+            and startup_state["database_initialized"] and ai_models.is_loaded):
+        # Started without models and the release watcher has since loaded the first release
+        startup_state["models_loaded"] = True
+        startup_state["ready"] = True
+    
+    if startup_state["ready"]:
+        status = "ready"
+    elif startup_state["completed_at"]:
+        status = "unavailable"
+    else:
+        status = "starting"
+    status_code = 200 if startup_state["ready"] else 503
+    return jsonify({
+        "status": status,
+        "data": dict(startup_state)
+    }), status_code
 
 @app.route('/', methods=['GET', 'OPTIONS'])
 def home():
@@ -419,6 +627,7 @@ def home():
         },
         "test_endpoints": {
             "health_check": "GET /api/health (from routes.py)",
+            "readiness_check": "GET /api/ready",
             "cors_test": "GET /api/test-cors", 
             "cors_debug": "GET /api/cors-debug",
             "guides_list": "GET /api/guides",
@@ -445,10 +654,18 @@ def home():
                 "bookings": "GET/POST /api/bookings",
                 "tour_details": "GET /api/tours/<id>"
             },
+            "ai": {
+                "batch_purchase_probability": "POST /api/ai/purchase-probability/batch"
+            },
             "utilities": {
                 "seed": "GET /api/seed",
                 "seed_sri_lanka": "GET /api/seed-sri-lanka",
                 "test_db": "GET /api/test-db",
+                "db_pool_metrics": "GET /api/db-pool/metrics",
+                "recommender_metrics": "GET /api/recommender/metrics",
+                "ai_batcher_metrics": "GET /api/ai/batcher/metrics",
+                "ai_models": "GET /api/ai/models",
+                "ai_models_reload": "POST /api/ai/models/reload",
                 "chat": "POST /api/chat"
             }
         },
@@ -461,6 +678,12 @@ def home():
         }
     })
 
+# Initialize at process start instead of on the first request. This runs in
+# a background thread so the server can answer /api/ready (503) meanwhile;
+# set EAGER_INIT=0 to skip it, e.g. for CLI tools that import this module.
+if os.environ.get('EAGER_INIT', '1') == '1':
+    threading.Thread(target=initialize_app, name='app-initializer', daemon=True).start()
+
 if __name__ == '__main__':
     print("=" * 80)
     print("🇱🇰 STARTING SRI LANKA TOURISM API SERVER")
@@ -472,7 +695,7 @@ if __name__ == '__main__':
     print()
     print("🔧 Configuration:")
     print("   • CORS: FULLY OPEN (all origins allowed)")
-    print("   • Cache: DISABLED")
+    print("   • Cache: ETags on catalogue routes, no-store elsewhere")
     print("   • Debug: ENABLED") 
     print("   • Threading: ENABLED")
     print()
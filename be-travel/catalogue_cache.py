@@ -0,0 +1,131 @@
+# catalogue_cache.py
+import json
+import threading
+import time
+import logging
+
+from flask import current_app
+
+from http_cache import get_content_version
+
+logger = logging.getLogger(__name__)
+
+class CatalogueSnapshot:
+    """Immutable view of a catalogue table at one content version"""
+
+    def __init__(self, version, rows, row_json, sort_key):
+        self.version = version
+        self.rows = rows
+        self.row_json = row_json
+        self.sort_key = sort_key
+        self.by_id = {row['id']: row for row in rows}
+        self.position = {row['id']: idx for idx, row in enumerate(rows)}
+        self.json_by_id = {row['id']: row_json[idx] for idx, row in enumerate(rows)}
+        self.loaded_at = time.time()
+
+    def _start_after(self, after, descending):
+        if after is None:
+            return 0
+        sort_value, row_id = after
+        if row_id in self.position:
+            return self.position[row_id] + 1
+
+        # Cursor row no longer exists (e.g. catalogue reseeded): seek by value
+        for idx, row in enumerate(self.rows):
+            value = row[self.sort_key]
+            value = type(value)(sort_value) if value is not None else value
+            key, cursor_key = (row[self.sort_key], row['id']), (value, row_id)
+            if (key < cursor_key) if descending else (key > cursor_key):
+                return idx
+        return len(self.rows)
+
+    def page_json(self, limit, after, descending, encode_cursor):
+        """Serialized list response identical in shape to routes.paginated_response"""
+        start = self._start_after(after, descending)
+        end = start + limit
+        has_more = end < len(self.rows)
+        next_cursor = None
+        count = min(limit, max(0, len(self.rows) - start))
+        if has_more and count:
+            last = self.rows[end - 1]
+            next_cursor = encode_cursor(last[self.sort_key], last['id'])
+        return (
+            '{"count":%d,"data":[%s],"has_more":%s,"limit":%d,"next_cursor":%s,"status":"success"}'
+            % (count, ','.join(self.row_json[start:end]), json.dumps(has_more),
+               limit, json.dumps(next_cursor))
+        )
+
+class CatalogueCache:
+    """Read-through cache of a small, read-mostly table (tours, guides).
+
+    Every worker keeps a full snapshot in memory and compares its version to
+    the shared `content_versions` counter at most once per `check_interval`
+    seconds, so writes made by other processes show up within that window.
+    Writers must call bump_content_version() in their transaction and then
+    reload() (or invalidate()) here after committing.
+    """
+
+    def __init__(self, name, table, order_by, sort_key, get_db_cursor, close_db_cursor,
+                 check_interval=2.0):
+        self.name = name
+        self.table = table
+        self.order_by = order_by
+        self.sort_key = sort_key
+        self.get_db_cursor = get_db_cursor
+        self.close_db_cursor = close_db_cursor
+        self.check_interval = check_interval
+
+        self._snapshot = None
+        self._last_check = 0.0
+        self._lock = threading.Lock()
+        self.stats = {'hits': 0, 'reloads': 0, 'version_checks': 0}
+
+    def reload(self):
+        """Load the whole table and atomically swap in the new snapshot"""
+        with self._lock:
+            cur = None
+            try:
+                cur = self.get_db_cursor()
+                version = get_content_version(cur, self.name)
+                cur.execute(f"SELECT * FROM {self.table} ORDER BY {self.order_by}")
+                rows = [dict(row) for row in cur.fetchall()]
+            finally:
+                if cur:
+                    self.close_db_cursor(cur)
+
+            row_json = [current_app.json.dumps(row) for row in rows]
+            self._snapshot = CatalogueSnapshot(version, rows, row_json, self.sort_key)
+            self._last_check = time.monotonic()
+            self.stats['reloads'] += 1
+            logger.info(f"Loaded {len(rows)} {self.name} into catalogue cache (version {version})")
+            return self._snapshot
+
+    def invalidate(self):
+        """Force a version check on the next access"""
+        self._last_check = 0.0
+
+    def snapshot(self):
+        """Current snapshot, reloading first if the shared version moved"""
+        snapshot = self._snapshot
+        if snapshot is None:
+            return self.reload()
+
+        if time.monotonic() - self._last_check >= self.check_interval:
+            cur = None
+            try:
+                cur = self.get_db_cursor()
+                version = get_content_version(cur, self.name)
+            finally:
+                if cur:
+                    self.close_db_cursor(cur)
+            self._last_check = time.monotonic()
+            self.stats['version_checks'] += 1
+            if version != snapshot.version:
+                return self.reload()
+
+        self.stats['hits'] += 1
+        return snapshot
+
+    def get(self, row_id):
+        """Row dict by primary key, or None"""
+        return self.snapshot().by_id.get(row_id)
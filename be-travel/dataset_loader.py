@@ -0,0 +1,350 @@
+# dataset_loader.py
+import argparse
+import logging
+import os
+import resource
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+from sklearn.preprocessing import LabelEncoder
+
+from preprocessing_cache import smallest_int_dtype
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CHUNK_ROWS = 100_000
+
+# Parse-time dtypes for the customer pitch export. Integer columns are
+# parsed as float64 (the C parser's fast path, and a missing value doesn't
+# fail the read) and narrowed to the smallest NumPy int in the output when
+# the file turns out to have no gaps. Any other column is read as text and
+# only converted to numbers if pass one finds every value is numeric.
+STRING_COLUMNS = ['TypeofContact', 'Occupation', 'Gender', 'ProductPitched', 'MaritalStatus', 'Designation']
+INTEGER_COLUMNS = [
+    'CustomerID', 'ProdTaken', 'CityTier', 'NumberOfPersonVisiting',
+    'Passport', 'PitchSatisfactionScore', 'OwnCar'
+]
+FLOAT_COLUMNS = [
+    'Age', 'DurationOfPitch', 'NumberOfFollowups', 'PreferredPropertyStar',
+    'NumberOfTrips', 'NumberOfChildrenVisiting', 'MonthlyIncome'
+]
+
+# Same preprocessing as EpochBasedTrainer.preprocess_csv
+REQUIRED_COLUMNS = ['CustomerID', 'ProdTaken']
+MEDIAN_FILL_COLUMNS = ['Age', 'DurationOfPitch', 'NumberOfFollowups',
+                       'PreferredPropertyStar', 'NumberOfTrips', 'MonthlyIncome']
+AGE_BINS = ([0, 30, 45, 60, 100], ['Young', 'Middle', 'Senior', 'Elder'], 'Middle')
+INCOME_BINS = ([0, 20000, 50000, 100000, float('inf')], ['Low', 'Medium', 'High', 'Premium'], 'Low')
+
+def csv_dtypes(columns):
+    dtypes = {col: 'category' for col in STRING_COLUMNS}
+    dtypes.update({col: 'float64' for col in INTEGER_COLUMNS + FLOAT_COLUMNS})
+    return {col: dtypes.get(col, object) for col in columns}
+
+def _extra_columns(columns):
+    return [col for col in columns if col not in STRING_COLUMNS + INTEGER_COLUMNS + FLOAT_COLUMNS]
+
+def _float32_exact(values):
+    """True if float32 holds every value exactly"""
+    values = np.asarray(values, dtype=np.float64)
+    return bool(np.array_equal(values.astype(np.float32).astype(np.float64), values, equal_nan=True))
+
+def peak_rss_mb():
+    """Peak resident set size of this process so far"""
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+def _read_chunks(csv_path, columns, chunk_size):
+    reader = pd.read_csv(csv_path, usecols=columns, dtype=csv_dtypes(columns), chunksize=chunk_size)
+    for chunk in reader:
+        yield chunk.dropna(subset=REQUIRED_COLUMNS)
+
+def _median_from_counts(counts):
+    """Exact median (pandas semantics) from a value -> count Series"""
+    counts = counts.sort_index()
+    total = int(counts.sum())
+    if total == 0:
+        return np.nan
+    cumulative = counts.to_numpy().cumsum()
+    values = counts.index.to_numpy(dtype=np.float64)
+    lower = values[np.searchsorted(cumulative, (total - 1) // 2, side='right')]
+    upper = values[np.searchsorted(cumulative, total // 2, side='right')]
+    return (lower + upper) / 2
+
+def _bin_codes(values, bins):
+    edges, labels, _ = bins
+    return pd.cut(values.to_numpy(), bins=edges, labels=labels).codes
+
+def _fit_pass(csv_path, columns, chunk_size):
+    """First pass: row count, category vocabularies, integer ranges and value
+    counts for the median-filled columns"""
+    stats = {
+        'rows_read': 0, 'rows': 0, 'chunks': 0,
+        'categories': {col: set() for col in STRING_COLUMNS if col in columns},
+        'has_null': {},
+        'int_range': {},
+        'value_counts': {col: pd.Series(dtype=np.float64) for col in MEDIAN_FILL_COLUMNS if col in columns},
+        # Numeric outputs stay float64 unless float32 is lossless for the whole column
+        'float32_exact': dict({col: True for col in INTEGER_COLUMNS + FLOAT_COLUMNS if col in columns},
+                              Family_Size=True),
+        # Unrecognised columns: (all values numeric, all whole numbers without gaps)
+        'extra': {col: (True, True) for col in _extra_columns(columns)},
+        'age_groups': np.zeros(len(AGE_BINS[1]) + 1, dtype=bool),
+        'income_groups': np.zeros(len(INCOME_BINS[1]) + 1, dtype=bool)
+    }
+    reader = pd.read_csv(csv_path, usecols=columns, dtype=csv_dtypes(columns), chunksize=chunk_size)
+    for chunk in reader:
+        stats['rows_read'] += len(chunk)
+        chunk = chunk.dropna(subset=REQUIRED_COLUMNS)
+        stats['rows'] += len(chunk)
+        stats['chunks'] += 1
+
+        for col, seen in stats['categories'].items():
+            codes = chunk[col].cat.codes.to_numpy()
+            seen.update(chunk[col].cat.categories[np.unique(codes[codes >= 0])])
+            stats['has_null'][col] = stats['has_null'].get(col, False) or bool((codes < 0).any())
+        for col in INTEGER_COLUMNS:
+            if col not in columns:
+                continue
+            values = chunk[col].to_numpy()
+            stats['has_null'][col] = stats['has_null'].get(col, False) or bool(np.isnan(values).any())
+            if len(values) and not np.isnan(values).all():
+                lo, hi = stats['int_range'].get(col, (np.nanmin(values), np.nanmax(values)))
+                stats['int_range'][col] = (min(lo, np.nanmin(values)), max(hi, np.nanmax(values)))
+        for col, counts in stats['value_counts'].items():
+            stats['value_counts'][col] = counts.add(chunk[col].value_counts(), fill_value=0)
+        family_size = chunk['NumberOfPersonVisiting'] + chunk['NumberOfChildrenVisiting'].fillna(0)
+        for col, exact in stats['float32_exact'].items():
+            values = family_size if col == 'Family_Size' else chunk[col]
+            stats['float32_exact'][col] = exact and _float32_exact(values)
+        for col, (numeric, integral) in stats['extra'].items():
+            values = chunk[col]
+            parsed = pd.to_numeric(values, errors='coerce')
+            numeric = numeric and int(parsed.notna().sum()) == int(values.notna().sum())
+            integral = integral and numeric and not parsed.isna().any() and bool((parsed % 1 == 0).all())
+            stats['extra'][col] = (numeric, integral)
+
+        # Present bin labels decide the LabelEncoder classes (index -1 = missing)
+        stats['age_groups'][_bin_codes(chunk['Age'], AGE_BINS)] = True
+        stats['income_groups'][_bin_codes(chunk['MonthlyIncome'], INCOME_BINS)] = True
+    return stats
+
+def _bin_encoder(present, bins):
+    """LabelEncoder over the bin labels that occur (missing -> fill label),
+    plus a lookup from bin code (-1 = missing) to encoded class"""
+    _, labels, fill = bins
+    used = [label for label, seen in zip(labels, present[:-1]) if seen]
+    if present[-1] and fill not in used:
+        used.append(fill)
+    encoder = LabelEncoder().fit(used)
+    lookup = np.searchsorted(encoder.classes_, labels + [fill]).astype(np.int8)
+    return encoder, lookup
+
+def load_training_csv(csv_path, chunk_size=DEFAULT_CHUNK_ROWS):
+    """Two-pass streaming version of EpochBasedTrainer.preprocess_csv.
+
+    Pass 1 reads the file chunk by chunk to fit the label encoders, bin
+    classes and exact medians; pass 2 re-reads it and writes each chunk's
+    encoded values straight into preallocated compact arrays (categories
+    and small ints as int8 codes, floats as float32 where pass 1 found that
+    lossless, float64 otherwise). Peak memory is the
+    output matrix plus one chunk instead of the whole parsed file.
+    Returns (DataFrame, {'label_encoders': ..., 'load_stats': ...}).
+    """
+    start = time.perf_counter()
+    columns = list(pd.read_csv(csv_path, nrows=0).columns)
+    fitted = _fit_pass(csv_path, columns, chunk_size)
+    fit_seconds = time.perf_counter() - start
+
+    label_encoders = {}
+    string_lookup = {}
+    for col, seen in fitted['categories'].items():
+        categories = sorted(seen)
+        encoder = LabelEncoder().fit(categories + (['Unknown'] if fitted['has_null'][col] else []))
+        # Raw category code -> encoded class; the trailing slot (code -1) is a missing value
+        missing = encoder.transform(['Unknown'])[0] if fitted['has_null'][col] else 0
+        string_lookup[col] = (categories, np.append(encoder.transform(categories), missing))
+        label_encoders[col] = encoder
+    _, age_lookup = _bin_encoder(fitted['age_groups'], AGE_BINS)
+    _, income_lookup = _bin_encoder(fitted['income_groups'], INCOME_BINS)
+    medians = {col: _median_from_counts(counts) for col, counts in fitted['value_counts'].items()}
+
+    def float_dtype(col):
+        exact = fitted['float32_exact'][col] and (col not in medians or _float32_exact([medians[col]]))
+        return np.float32 if exact else np.float64
+
+    n = fitted['rows']
+    out = {}
+    for col in columns:
+        if col in STRING_COLUMNS:
+            out[col] = np.empty(n, dtype=smallest_int_dtype(np.array([-1, len(string_lookup[col][0])])))
+        elif col in INTEGER_COLUMNS:
+            lo, hi = fitted['int_range'].get(col, (0, 0))
+            out[col] = (np.empty(n, dtype=float_dtype(col)) if fitted['has_null'][col]
+                        else np.empty(n, dtype=smallest_int_dtype(np.array([lo, hi], dtype=np.int64))))
+        elif col in fitted['extra']:
+            numeric, integral = fitted['extra'][col]
+            # What pd.read_csv would infer for the whole column
+            out[col] = np.empty(n, dtype=np.int64 if integral else np.float64 if numeric else object)
+        else:
+            out[col] = np.empty(n, dtype=float_dtype(col))
+    encoded_columns = [col for col in STRING_COLUMNS if col in columns]
+    for col in encoded_columns:
+        out[f'{col}_encoded'] = np.empty(n, dtype=smallest_int_dtype(np.array([0, len(label_encoders[col].classes_)])))
+    for name in ('Age_Group', 'Age_Group_encoded', 'Income_Group', 'Income_Group_encoded'):
+        out[name] = np.empty(n, dtype=np.int8)
+    out['Family_Size'] = np.empty(n, dtype=float_dtype('Family_Size'))
+    index = np.empty(n, dtype=np.int64)
+
+    pos = 0
+    for chunk in _read_chunks(csv_path, columns, chunk_size):
+        rows = slice(pos, pos + len(chunk))
+        index[rows] = chunk.index.to_numpy()
+        for col in columns:
+            values = chunk[col]
+            if col in STRING_COLUMNS:
+                categories, lookup = string_lookup[col]
+                codes = pd.Categorical(values, categories=categories).codes
+                out[col][rows] = codes
+                out[f'{col}_encoded'][rows] = lookup[codes]
+            elif col in medians:
+                out[col][rows] = values.fillna(medians[col]).to_numpy(dtype=out[col].dtype)
+            elif col in fitted['extra'] and out[col].dtype != object:
+                out[col][rows] = pd.to_numeric(values).to_numpy(dtype=out[col].dtype)
+            else:
+                out[col][rows] = values.to_numpy()
+
+        age_codes = _bin_codes(chunk['Age'], AGE_BINS)
+        out['Age_Group'][rows] = age_codes
+        out['Age_Group_encoded'][rows] = age_lookup[age_codes]
+        income_codes = _bin_codes(chunk['MonthlyIncome'], INCOME_BINS)
+        out['Income_Group'][rows] = income_codes
+        out['Income_Group_encoded'][rows] = income_lookup[income_codes]
+        out['Family_Size'][rows] = (
+            chunk['NumberOfPersonVisiting'].to_numpy(dtype=np.float64) +
+            chunk['NumberOfChildrenVisiting'].fillna(0).to_numpy(dtype=np.float64)
+        )
+        pos = rows.stop
+
+    # Same column order as the in-memory preprocessing
+    frame = {}
+    for col in columns:
+        if col in STRING_COLUMNS:
+            frame[col] = pd.Categorical.from_codes(out[col], string_lookup[col][0])
+        else:
+            frame[col] = out[col]
+    for col in encoded_columns:
+        frame[f'{col}_encoded'] = out[f'{col}_encoded']
+    frame['Age_Group'] = pd.Categorical.from_codes(out['Age_Group'], AGE_BINS[1], ordered=True)
+    frame['Age_Group_encoded'] = out['Age_Group_encoded']
+    frame['Income_Group'] = pd.Categorical.from_codes(out['Income_Group'], INCOME_BINS[1], ordered=True)
+    frame['Income_Group_encoded'] = out['Income_Group_encoded']
+    frame['Family_Size'] = out['Family_Size']
+    df = pd.DataFrame(frame, index=pd.Index(index), copy=False)
+
+    seconds = time.perf_counter() - start
+    load_stats = {
+        'rows_read': fitted['rows_read'],
+        'rows': n,
+        'chunks': fitted['chunks'],
+        'chunk_size': chunk_size,
+        'fit_seconds': round(fit_seconds, 3),
+        'write_seconds': round(seconds - fit_seconds, 3),
+        'rows_per_second': round(fitted['rows_read'] / seconds) if seconds else None,
+        'output_mb': round(sum(values.nbytes for values in out.values()) / 1e6, 2),
+        'peak_rss_mb': round(peak_rss_mb(), 1)
+    }
+    logger.info(f"Loaded {n} rows from {csv_path} in {seconds:.2f}s "
+                f"({load_stats['rows_per_second']} rows/s, 2 passes, "
+                f"{load_stats['output_mb']} MB output, peak RSS {load_stats['peak_rss_mb']} MB)")
+    return df, {'label_encoders': label_encoders, 'load_stats': load_stats}
+
+def check_parity(csv_path, chunk_size=DEFAULT_CHUNK_ROWS):
+    """Compare the streaming loader with EpochBasedTrainer.preprocess_csv"""
+    from train_tour_package_models import EpochBasedTrainer
+    expected, expected_state = EpochBasedTrainer.preprocess_csv(csv_path)
+    actual, actual_state = load_training_csv(csv_path, chunk_size)
+
+    mismatched = []
+    for col in expected.columns:
+        left, right = expected[col], actual[col]
+        if isinstance(left.dtype, pd.CategoricalDtype) or not pd.api.types.is_numeric_dtype(left):
+            same = left.astype(object).fillna('<NA>').equals(right.astype(object).fillna('<NA>'))
+        else:
+            same = np.array_equal(left.to_numpy(dtype=np.float64), right.to_numpy(dtype=np.float64), equal_nan=True)
+        if not same:
+            mismatched.append(col)
+    encoders_match = all(
+        list(expected_state['label_encoders'][col].classes_) == list(actual_state['label_encoders'][col].classes_)
+        for col in expected_state['label_encoders']
+    )
+    return {
+        'ok': not mismatched and encoders_match and list(expected.columns) == list(actual.columns)
+              and expected.index.equals(actual.index),
+        'mismatched_columns': mismatched,
+        'encoders_match': encoders_match
+    }
+
+def make_large_csv(source_csv, target_csv, rows):
+    """Repeat source rows (with fresh CustomerIDs) until the file has `rows` rows"""
+    source = pd.read_csv(source_csv)
+    written = 0
+    with open(target_csv, 'w', newline='') as f:
+        while written < rows:
+            block = source.head(rows - written).copy()
+            block['CustomerID'] = np.arange(written, written + len(block)) + 200000
+            block.to_csv(f, header=written == 0, index=False)
+            written += len(block)
+    return target_csv
+
+def _measure(loader, csv_path, chunk_size):
+    """Run one loader in a fresh process so peak RSS is its own"""
+    from train_tour_package_models import EpochBasedTrainer
+    baseline_rss = peak_rss_mb()
+    start = time.perf_counter()
+    if loader == 'chunked':
+        df, _ = load_training_csv(csv_path, chunk_size)
+    else:
+        df, _ = EpochBasedTrainer.preprocess_csv(csv_path)
+    seconds = time.perf_counter() - start
+    return {
+        'loader': loader,
+        'rows': len(df),
+        'seconds': round(seconds, 2),
+        'rows_per_second': round(len(df) / seconds),
+        'frame_mb': round(float(df.memory_usage(deep=True).sum()) / 1e6, 1),
+        'peak_rss_mb': round(peak_rss_mb(), 1),
+        'import_rss_mb': round(baseline_rss, 1)
+    }
+
+def benchmark_loader(csv_path, chunk_size=DEFAULT_CHUNK_ROWS):
+    results = []
+    for loader in ('pandas', 'chunked'):
+        with ProcessPoolExecutor(max_workers=1) as executor:
+            results.append(executor.submit(_measure, loader, csv_path, chunk_size).result())
+    return results
+
+def main():
+    """Benchmark: python dataset_loader.py [--rows 1000000] [--chunk-size 200000]"""
+    parser = argparse.ArgumentParser(description="Compare the streaming training loader with pandas")
+    parser.add_argument('--source', default='tour_package.csv')
+    parser.add_argument('--rows', type=int, default=1_000_000)
+    parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_ROWS)
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    parity = check_parity(args.source, chunk_size=1000)
+    print(f"Parity with in-memory preprocessing: {'✅' if parity['ok'] else '❌'} {parity}")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        csv_path = make_large_csv(args.source, os.path.join(tmp, 'customers.csv'), args.rows)
+        print(f"Generated {args.rows} rows ({os.path.getsize(csv_path) / 1e6:.0f} MB)")
+        for result in benchmark_loader(csv_path, args.chunk_size):
+            print(f"{result['loader']:>8}: {result['seconds']:6.2f}s  {result['rows_per_second']:>9} rows/s  "
+                  f"frame {result['frame_mb']:7.1f} MB  peak RSS {result['peak_rss_mb']:7.1f} MB "
+                  f"(after imports {result['import_rss_mb']:.1f} MB)")
+
+if __name__ == "__main__":
+    main()
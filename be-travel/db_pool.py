@@ -0,0 +1,257 @@
+# db_pool.py
+import threading
+import time
+from collections import deque
+import logging
+
+from flask import g
+from flask_mysqldb import MySQL
+
+logger = logging.getLogger(__name__)
+
+class PoolTimeoutError(Exception):
+    """Raised when no connection becomes available within the wait timeout"""
+    pass
+
+class ConnectionPool:
+    def __init__(self, factory, min_size=2, max_size=10, timeout=5.0,
+                 idle_timeout=300.0, ping_on_borrow=True):
+        if min_size < 0 or max_size < 1 or min_size > max_size:
+            raise ValueError("Pool sizes must satisfy 0 <= min_size <= max_size and max_size >= 1")
+
+        self.factory = factory
+        self.min_size = min_size
+        self.max_size = max_size
+        self.timeout = timeout
+        self.idle_timeout = idle_timeout
+        self.ping_on_borrow = ping_on_borrow
+
+        self._lock = threading.Lock()
+        self._available = threading.Condition(self._lock)
+        self._idle = deque()  # (connection, last_used) pairs, most recently used on the right
+        self._size = 0
+
+        # Metrics
+        self._wait_times = deque(maxlen=1000)
+        self._stats = {
+            'borrowed': 0,
+            'created': 0,
+            'closed': 0,
+            'evicted_idle': 0,
+            'failed_health_checks': 0,
+            'timeouts': 0,
+            'total_wait_seconds': 0.0,
+            'max_wait_seconds': 0.0
+        }
+
+    def prefill(self):
+        """Open connections until the pool holds min_size of them"""
+        while True:
+            with self._lock:
+                if self._size >= self.min_size:
+                    return
+                self._size += 1
+            try:
+                conn = self._create()
+            except Exception:
+                with self._lock:
+                    self._size -= 1
+                raise
+            with self._lock:
+                self._idle.append((conn, time.monotonic()))
+                self._available.notify()
+
+    def acquire(self):
+        """Borrow a healthy connection, waiting up to `timeout` seconds"""
+        start = time.monotonic()
+        deadline = start + self.timeout
+
+        while True:
+            conn = None
+            create = False
+            with self._available:
+                while True:
+                    self._evict_idle_locked()
+                    if self._idle:
+                        conn, _ = self._idle.pop()
+                        break
+                    if self._size < self.max_size:
+                        self._size += 1
+                        create = True
+                        break
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self._stats['timeouts'] += 1
+                        raise PoolTimeoutError(
+                            f"No database connection available after {self.timeout}s "
+                            f"(max_size={self.max_size})"
+                        )
+                    self._available.wait(remaining)
+
+            if create:
+                try:
+                    conn = self._create()
+                except Exception:
+                    self._discard(None)
+                    raise
+            elif self.ping_on_borrow and not self._is_healthy(conn):
+                self._stats['failed_health_checks'] += 1
+                self._discard(conn)
+                continue
+
+            self._record_wait(time.monotonic() - start)
+            return conn
+
+    def release(self, conn):
+        """Return a borrowed connection, discarding it if it cannot be reset"""
+        if conn is None:
+            return
+        try:
+            # Never hand an open transaction to the next borrower
+            conn.rollback()
+        except Exception as e:
+            logger.warning(f"Discarding pooled connection that failed to reset: {str(e)}")
+            self._discard(conn)
+            return
+
+        with self._available:
+            self._idle.append((conn, time.monotonic()))
+            self._evict_idle_locked()
+            self._available.notify()
+
+    def close_all(self):
+        """Close every idle connection; borrowed connections close on release"""
+        with self._lock:
+            idle = list(self._idle)
+            self._idle.clear()
+            self._size -= len(idle)
+            self._stats['closed'] += len(idle)
+        for conn, _ in idle:
+            self._close_quietly(conn)
+
+    def get_metrics(self):
+        """Snapshot of pool occupancy and borrow wait times"""
+        with self._lock:
+            waits = sorted(self._wait_times)
+            stats = dict(self._stats)
+            size = self._size
+            idle = len(self._idle)
+
+        borrowed = stats['borrowed']
+        return {
+            'min_size': self.min_size,
+            'max_size': self.max_size,
+            'size': size,
+            'idle': idle,
+            'in_use': size - idle,
+            'borrowed_total': borrowed,
+            'created_total': stats['created'],
+            'closed_total': stats['closed'],
+            'evicted_idle_total': stats['evicted_idle'],
+            'failed_health_checks_total': stats['failed_health_checks'],
+            'timeouts_total': stats['timeouts'],
+            'wait_ms': {
+                'avg': (stats['total_wait_seconds'] / borrowed * 1000) if borrowed else 0.0,
+                'p50': self._percentile(waits, 0.50) * 1000,
+                'p99': self._percentile(waits, 0.99) * 1000,
+                'max': stats['max_wait_seconds'] * 1000
+            }
+        }
+
+    def _create(self):
+        conn = self.factory()
+        with self._lock:
+            self._stats['created'] += 1
+        return conn
+
+    def _discard(self, conn):
+        with self._available:
+            self._size -= 1
+            if conn is not None:
+                self._stats['closed'] += 1
+            self._available.notify()
+        if conn is not None:
+            self._close_quietly(conn)
+
+    def _evict_idle_locked(self):
+        # Oldest idle connections sit on the left; keep at least min_size open
+        now = time.monotonic()
+        while (self._idle and self._size > self.min_size and
+               now - self._idle[0][1] > self.idle_timeout):
+            conn, _ = self._idle.popleft()
+            self._size -= 1
+            self._stats['evicted_idle'] += 1
+            self._stats['closed'] += 1
+            self._close_quietly(conn)
+
+    def _record_wait(self, waited):
+        with self._lock:
+            self._stats['borrowed'] += 1
+            self._stats['total_wait_seconds'] += waited
+            self._stats['max_wait_seconds'] = max(self._stats['max_wait_seconds'], waited)
+            self._wait_times.append(waited)
+
+    @staticmethod
+    def _is_healthy(conn):
+        try:
+            conn.ping()
+            return True
+        except Exception:
+            return False
+
+    @staticmethod
+    def _close_quietly(conn):
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+    @staticmethod
+    def _percentile(sorted_values, fraction):
+        if not sorted_values:
+            return 0.0
+        idx = min(len(sorted_values) - 1, int(round(fraction * (len(sorted_values) - 1))))
+        return sorted_values[idx]
+
+class PooledMySQL(MySQL):
+    """flask_mysqldb.MySQL whose `connection` is borrowed from a bounded pool.
+
+    The connection is held for the lifetime of the app context and returned
+    on teardown, so `mysql.connection.commit()` and friends keep working.
+    """
+
+    def __init__(self, app=None):
+        self.pool = None
+        super().__init__(app)
+
+    def init_app(self, app):
+        app.config.setdefault('MYSQL_POOL_MIN_SIZE', 2)
+        app.config.setdefault('MYSQL_POOL_MAX_SIZE', 10)
+        app.config.setdefault('MYSQL_POOL_TIMEOUT', 5.0)
+        app.config.setdefault('MYSQL_POOL_IDLE_TIMEOUT', 300.0)
+        app.config.setdefault('MYSQL_POOL_PING_ON_BORROW', True)
+        super().init_app(app)
+
+        def factory():
+            with app.app_context():
+                return self.connect
+
+        self.pool = ConnectionPool(
+            factory,
+            min_size=app.config['MYSQL_POOL_MIN_SIZE'],
+            max_size=app.config['MYSQL_POOL_MAX_SIZE'],
+            timeout=app.config['MYSQL_POOL_TIMEOUT'],
+            idle_timeout=app.config['MYSQL_POOL_IDLE_TIMEOUT'],
+            ping_on_borrow=app.config['MYSQL_POOL_PING_ON_BORROW']
+        )
+
+    @property
+    def connection(self):
+        if 'mysql_db' not in g:
+            g.mysql_db = self.pool.acquire()
+        return g.mysql_db
+
+    def teardown(self, exception):
+        conn = g.pop('mysql_db', None)
+        if conn is not None:
+            self.pool.release(conn)
@@ -0,0 +1,219 @@
+# forest_engine.py
+import argparse
+import numpy as np
+import logging
+import sys
+import time
+
+logger = logging.getLogger(__name__)
+
+class CompiledForest:
+    """A trained random forest flattened into contiguous NumPy node arrays.
+
+    All trees share one set of node arrays; `roots[t]` is the first node of
+    tree t and child indices are global. Leaves point to themselves, so every
+    sample can take the same number of steps (max_depth) without branching
+    on leaf status. Samples are compared as float32 against the float64
+    thresholds, exactly like sklearn, so predictions match bit-for-bit up to
+    the order of summation over trees.
+    """
+
+    def __init__(self, feature, threshold, left, right, value, roots, max_depth,
+                 n_features, classes=None):
+        self.feature = feature
+        self.threshold = threshold
+        self.left = left
+        self.right = right
+        self.value = value
+        self.roots = roots
+        self.max_depth = int(max_depth)
+        self.n_features = int(n_features)
+        self.classes_ = classes
+
+    @property
+    def is_classifier(self):
+        return self.classes_ is not None
+
+    @property
+    def n_trees(self):
+        return len(self.roots)
+
+    def nbytes(self):
+        return sum(arr.nbytes for arr in (self.feature, self.threshold, self.left,
+                                          self.right, self.value, self.roots))
+
+    def apply(self, X):
+        """Leaf node index reached in every tree, shape (n_samples, n_trees)"""
+        X = np.ascontiguousarray(X, dtype=np.float32)
+        if X.ndim == 1:
+            X = X.reshape(1, -1)
+        if X.shape[1] != self.n_features:
+            raise ValueError(f"Expected {self.n_features} features, got {X.shape[1]}")
+
+        flat = X.ravel()
+        row_offsets = (np.arange(len(X), dtype=np.int64) * self.n_features)[:, None]
+        nodes = np.broadcast_to(self.roots, (len(X), self.n_trees)).copy()
+        for _ in range(self.max_depth):
+            go_left = flat[row_offsets + self.feature[nodes]] <= self.threshold[nodes]
+            nodes = np.where(go_left, self.left[nodes], self.right[nodes])
+        return nodes
+
+    def predict_proba(self, X):
+        if not self.is_classifier:
+            raise AttributeError("predict_proba is only available for classifiers")
+        return self.value[self.apply(X)].mean(axis=1)
+
+    def predict(self, X):
+        leaf_values = self.value[self.apply(X)].mean(axis=1)
+        if self.is_classifier:
+            return self.classes_[leaf_values.argmax(axis=1)]
+        return leaf_values
+
+def compile_forest(model):
+    """Flatten a fitted RandomForestClassifier/Regressor into a CompiledForest"""
+    is_classifier = hasattr(model, 'classes_')
+    if getattr(model, 'n_outputs_', 1) != 1:
+        raise ValueError("Only single-output forests can be compiled")
+
+    features, thresholds, lefts, rights, values, roots = [], [], [], [], [], []
+    offset, max_depth = 0, 0
+    for estimator in model.estimators_:
+        tree = estimator.tree_
+        node_ids = np.arange(tree.node_count, dtype=np.int32) + offset
+        is_leaf = tree.children_left == -1
+
+        feature = np.where(is_leaf, 0, tree.feature).astype(np.int32)
+        threshold = np.where(is_leaf, 0.0, tree.threshold).astype(np.float64)
+        left = np.where(is_leaf, node_ids, tree.children_left + offset).astype(np.int32)
+        right = np.where(is_leaf, node_ids, tree.children_right + offset).astype(np.int32)
+
+        if is_classifier:
+            # Older sklearn stores weighted class counts; normalize to fractions
+            value = tree.value[:, 0, :].astype(np.float64)
+            totals = value.sum(axis=1, keepdims=True)
+            totals[totals == 0] = 1.0
+            value = value / totals
+        else:
+            value = tree.value[:, 0, 0].astype(np.float64)
+
+        features.append(feature)
+        thresholds.append(threshold)
+        lefts.append(left)
+        rights.append(right)
+        values.append(value)
+        roots.append(offset)
+        offset += tree.node_count
+        max_depth = max(max_depth, tree.max_depth)
+
+    return CompiledForest(
+        np.concatenate(features), np.concatenate(thresholds),
+        np.concatenate(lefts), np.concatenate(rights), np.concatenate(values),
+        np.asarray(roots, dtype=np.int32), max_depth, model.n_features_in_,
+        np.asarray(model.classes_) if is_classifier else None
+    )
+
+def check_parity(model, compiled, X, atol=1e-9):
+    """Max absolute difference between sklearn and compiled predictions"""
+    if compiled.is_classifier:
+        expected, actual = model.predict_proba(X), compiled.predict_proba(X)
+    else:
+        expected, actual = model.predict(X), compiled.predict(X)
+    max_diff = float(np.abs(expected - actual).max())
+    return {'max_abs_diff': max_diff, 'ok': max_diff <= atol, 'rows': len(X)}
+
+def verify_parity(atol=1e-9):
+    """Deterministic parity check on small seeded forests.
+
+    Fits a classifier and a regressor on fixed synthetic data and compares
+    predictions on held-out rows and on rows placed exactly on the split
+    thresholds, where the float32 comparison has to match sklearn's.
+    """
+    from sklearn.datasets import make_classification, make_regression
+    from sklearn.ensemble import RandomForestClassifier, RandomForestRegressor
+
+    X, y = make_classification(n_samples=600, n_features=8, n_informative=5, n_classes=3,
+                               random_state=0)
+    classifier = RandomForestClassifier(n_estimators=15, max_depth=8, class_weight='balanced',
+                                        random_state=0, n_jobs=1).fit(X[:400], y[:400])
+    X_reg, y_reg = make_regression(n_samples=600, n_features=5, noise=5.0, random_state=0)
+    regressor = RandomForestRegressor(n_estimators=15, max_depth=8, random_state=0,
+                                      n_jobs=1).fit(X_reg[:400], y_reg[:400])
+
+    results = {}
+    for name, model, data in (('classifier', classifier, X), ('regressor', regressor, X_reg)):
+        compiled = compile_forest(model)
+        # Held-out rows, then copies of them with one feature set to the
+        # float32 values just below/at and just above a split threshold
+        splits = np.flatnonzero(compiled.left != np.arange(len(compiled.left)))
+        threshold = compiled.threshold[splits]
+        nearest = threshold.astype(np.float32)
+        below = np.where(nearest > threshold, np.nextafter(nearest, np.float32(-np.inf)), nearest)
+        above = np.nextafter(below, np.float32(np.inf))
+        rows = np.arange(len(splits))
+        edges = []
+        for value in (below, above):
+            edge = data[400 + rows % 200].copy()
+            edge[rows, compiled.feature[splits]] = value
+            edges.append(edge)
+        results[name] = check_parity(model, compiled, np.vstack([data[400:]] + edges), atol=atol)
+    return results
+
+def benchmark_forest(model, compiled, X, batch_sizes=(1, 10, 100, 1000, 10000), repeats=20):
+    """Per-call latency of sklearn vs the compiled engine for several batch sizes"""
+    predict_sklearn = model.predict_proba if compiled.is_classifier else model.predict
+    predict_compiled = compiled.predict_proba if compiled.is_classifier else compiled.predict
+
+    results = []
+    for batch_size in batch_sizes:
+        batch = X[np.arange(batch_size) % len(X)]
+        n_repeats = max(1, repeats if batch_size <= 1000 else repeats // 10)
+        timings = {}
+        for label, predict in (('sklearn', predict_sklearn), ('compiled', predict_compiled)):
+            predict(batch)
+            start = time.perf_counter()
+            for _ in range(n_repeats):
+                predict(batch)
+            timings[label] = (time.perf_counter() - start) / n_repeats * 1000
+        results.append({
+            'batch_size': batch_size,
+            'sklearn_ms': round(timings['sklearn'], 3),
+            'compiled_ms': round(timings['compiled'], 3),
+            'speedup': round(timings['sklearn'] / timings['compiled'], 1)
+        })
+        print(f"batch={batch_size:>6} sklearn={timings['sklearn']:.3f}ms "
+              f"compiled={timings['compiled']:.3f}ms speedup={timings['sklearn'] / timings['compiled']:.1f}x")
+    return results
+
+def main():
+    """Parity check and latency benchmark: python forest_engine.py [--check]"""
+    parser = argparse.ArgumentParser(description="Compare the compiled forest engine with sklearn")
+    parser.add_argument('--check', action='store_true',
+                        help="only run the deterministic parity check; exit 1 on a mismatch")
+    args = parser.parse_args()
+
+    results = verify_parity()
+    for name, parity in results.items():
+        print(f"Parity ({name}, {parity['rows']} rows): max diff {parity['max_abs_diff']:.2e} "
+              f"{'✅' if parity['ok'] else '❌'}")
+    if args.check:
+        sys.exit(0 if all(parity['ok'] for parity in results.values()) else 1)
+
+    from sklearn.datasets import make_classification, make_regression
+    from sklearn.ensemble import RandomForestClassifier, RandomForestRegressor
+
+    X, y = make_classification(n_samples=5000, n_features=21, random_state=42)
+    classifier = RandomForestClassifier(n_estimators=240, max_depth=24, class_weight='balanced',
+                                        random_state=42).fit(X, y)
+    X_reg, y_reg = make_regression(n_samples=5000, n_features=7, random_state=42)
+    regressor = RandomForestRegressor(n_estimators=100, random_state=42).fit(X_reg, y_reg)
+
+    for name, model, data in (('classifier', classifier, X), ('regressor', regressor, X_reg)):
+        compiled = compile_forest(model)
+        parity = check_parity(model, compiled, data)
+        print(f"\n{name}: {compiled.n_trees} trees, {len(compiled.feature):,} nodes, "
+              f"{compiled.nbytes() / 1e6:.1f} MB, parity max diff {parity['max_abs_diff']:.2e} "
+              f"({'OK' if parity['ok'] else 'MISMATCH'})")
+        benchmark_forest(model, compiled, data)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,42 @@
+# http_cache.py
+import hashlib
+
+from flask import current_app
+
+# Cache-Control policies. Routes without an explicit policy get NO_STORE from
+# after_request in app.py (user-specific and admin data must never be cached).
+NO_STORE = 'no-cache, no-store, must-revalidate'
+CATALOGUE_CACHE_CONTROL = 'public, max-age=60, stale-while-revalidate=300'
+
+def get_content_version(cur, name):
+    """Current version counter for a content set such as 'tours' or 'guides'"""
+    cur.execute("SELECT version FROM content_versions WHERE name = %s", (name,))
+    row = cur.fetchone()
+    return row['version'] if row else 0
+
+def bump_content_version(cur, name):
+    """Increment a content version; call inside the writing transaction"""
+    cur.execute("""
+        INSERT INTO content_versions (name, version) VALUES (%s, 1)
+        ON DUPLICATE KEY UPDATE version = version + 1
+    """, (name,))
+
+def make_etag(name, version, request):
+    """Strong ETag from the content version plus the path and query string"""
+    variant = hashlib.sha1(
+        request.path.encode('utf-8') + b'?' + request.query_string
+    ).hexdigest()[:12]
+    return f"{name}-v{version}-{variant}"
+
+def not_modified(etag, cache_control=CATALOGUE_CACHE_CONTROL):
+    """304 response for a matching If-None-Match"""
+    response = current_app.response_class(status=304)
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = cache_control
+    return response
+
+def with_cache_headers(response, etag, cache_control=CATALOGUE_CACHE_CONTROL):
+    """Attach the ETag and cache policy to a successful response"""
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = cache_control
+    return response
@@ -0,0 +1,171 @@
+# inference_batcher.py
+import queue
+import threading
+import time
+import logging
+from collections import deque
+from concurrent.futures import Future
+
+logger = logging.getLogger(__name__)
+
+_STOP = object()
+
+class MicroBatcher:
+    """Coalesces concurrent single-item predictions into vectorized batch calls.
+
+    Request threads submit() one item and wait on the returned Future. One
+    worker thread takes the first queued item, keeps collecting until
+    `max_batch_size` items are queued or `max_wait_ms` has passed since that
+    first item arrived, then calls `batch_fn(items)` once and resolves each
+    Future with its result. An idle batcher adds no delay beyond the
+    window: a lone request is dispatched when its window expires.
+
+    `prepare_fn` validates and coerces each item in submit(), so a bad item
+    fails its own Future instead of the batch it would have joined. If
+    `batch_fn` still raises, the batch is retried one item at a time.
+    """
+
+    def __init__(self, batch_fn, max_batch_size=64, max_wait_ms=2.0, name='micro-batcher', prepare_fn=None):
+        self.batch_fn = batch_fn
+        self.prepare_fn = prepare_fn
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self.name = name
+
+        self._queue = queue.Queue()
+        self._thread = None
+        self._lock = threading.Lock()
+        self._wait_times = deque(maxlen=1000)
+        self._batch_sizes = {}
+        self._stats = {
+            'batches': 0,
+            'items': 0,
+            'errors': 0,
+            'total_wait_seconds': 0.0,
+            'max_wait_seconds': 0.0,
+            'total_inference_seconds': 0.0
+        }
+
+    def start(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self, timeout=5.0):
+        """Finish queued work and stop the worker"""
+        if self._thread is not None:
+            self._queue.put(_STOP)
+            self._thread.join(timeout)
+            self._thread = None
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def submit(self, item):
+        """Queue one item; the Future resolves to batch_fn's result for it"""
+        future = Future()
+        if self.prepare_fn is not None:
+            try:
+                item = self.prepare_fn(item)
+            except Exception as e:
+                future.set_exception(e)
+                return future
+        self._queue.put((item, future, time.perf_counter()))
+        return future
+
+    def _collect(self, first):
+        batch = [first]
+        deadline = first[2] + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            try:
+                entry = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if entry is _STOP:
+                self._queue.put(_STOP)
+                break
+            batch.append(entry)
+        return batch
+
+    def _run(self):
+        while True:
+            first = self._queue.get()
+            if first is _STOP:
+                return
+            batch = self._collect(first)
+            self._dispatch(batch)
+
+    def _dispatch(self, batch):
+        dispatched_at = time.perf_counter()
+        waits = [dispatched_at - enqueued_at for _, _, enqueued_at in batch]
+        try:
+            results = self.batch_fn([item for item, _, _ in batch])
+            for (_, future, _), result in zip(batch, results):
+                future.set_result(result)
+            failed = False
+        except Exception as e:
+            failed = True
+            if len(batch) == 1:
+                logger.error(f"{self.name} item failed: {str(e)}")
+                batch[0][1].set_exception(e)
+            else:
+                logger.error(f"{self.name} batch of {len(batch)} failed, scoring items one at a time: {str(e)}")
+                for item, future, _ in batch:
+                    try:
+                        future.set_result(self.batch_fn([item])[0])
+                    except Exception as item_error:
+                        future.set_exception(item_error)
+        inference_seconds = time.perf_counter() - dispatched_at
+
+        with self._lock:
+            self._wait_times.extend(waits)
+            self._batch_sizes[len(batch)] = self._batch_sizes.get(len(batch), 0) + 1
+            self._stats['batches'] += 1
+            self._stats['items'] += len(batch)
+            self._stats['errors'] += int(failed)
+            self._stats['total_wait_seconds'] += sum(waits)
+            self._stats['max_wait_seconds'] = max(self._stats['max_wait_seconds'], max(waits))
+            self._stats['total_inference_seconds'] += inference_seconds
+
+    def get_metrics(self):
+        """Queue depth, batch size distribution and wait added by batching"""
+        with self._lock:
+            waits = sorted(self._wait_times)
+            stats = dict(self._stats)
+            batch_sizes = dict(self._batch_sizes)
+
+        batches, items = stats['batches'], stats['items']
+        histogram = {}
+        for size, count in sorted(batch_sizes.items()):
+            bucket = 1 << (size - 1).bit_length()  # round up to a power of two
+            label = f"<={bucket}"
+            histogram[label] = histogram.get(label, 0) + count
+
+        return {
+            'running': self.running,
+            'max_batch_size': self.max_batch_size,
+            'max_wait_ms': self.max_wait * 1000,
+            'queue_depth': self._queue.qsize(),
+            'batches_total': batches,
+            'items_total': items,
+            'errors_total': stats['errors'],
+            'avg_batch_size': (items / batches) if batches else 0.0,
+            'batch_size_histogram': histogram,
+            'added_wait_ms': {
+                'avg': (stats['total_wait_seconds'] / items * 1000) if items else 0.0,
+                'p50': self._percentile(waits, 0.50) * 1000,
+                'p99': self._percentile(waits, 0.99) * 1000,
+                'max': stats['max_wait_seconds'] * 1000
+            },
+            'avg_inference_ms': (stats['total_inference_seconds'] / batches * 1000) if batches else 0.0
+        }
+
+    @staticmethod
+    def _percentile(sorted_values, fraction):
+        if not sorted_values:
+            return 0.0
+        idx = min(len(sorted_values) - 1, int(round(fraction * (len(sorted_values) - 1))))
+        return sorted_values[idx]
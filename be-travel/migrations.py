@@ -0,0 +1,163 @@
+# migrations.py
+import logging
+import os
+import sys
+
+logger = logging.getLogger(__name__)
+
+MIGRATION_LOCK_NAME = 'tour_system_schema_migrations'
+MIGRATION_LOCK_TIMEOUT = 30
+
+# Versioned, append-only list of schema migrations. Each step is either
+# (table, index_name, columns), skipped if the index already exists, or an
+# idempotent SQL statement, so a migration interrupted half way can simply
+# be re-run.
+# InnoDB appends the primary key to every secondary index, so these also
+# serve the `ORDER BY <col> DESC, id DESC` keyset pagination in routes.py.
+MIGRATIONS = [
+    (1, "Bookings indexes for user_id/status filters ordered by booking_date", [
+        ('bookings', 'idx_bookings_booking_date', ['booking_date']),
+        ('bookings', 'idx_bookings_user_booking_date', ['user_id', 'booking_date']),
+        ('bookings', 'idx_bookings_status_booking_date', ['status', 'booking_date']),
+        ('bookings', 'idx_bookings_user_status_booking_date', ['user_id', 'status', 'booking_date'])
+    ]),
+    (2, "Guide request indexes for status/request_type/guide_id filters ordered by created_at", [
+        ('guide_requests', 'idx_guide_requests_created_at', ['created_at']),
+        ('guide_requests', 'idx_guide_requests_status_created_at', ['status', 'created_at']),
+        ('guide_requests', 'idx_guide_requests_type_created_at', ['request_type', 'created_at']),
+        ('guide_requests', 'idx_guide_requests_status_type_created_at', ['status', 'request_type', 'created_at']),
+        ('guide_requests', 'idx_guide_requests_guide_created_at', ['guide_id', 'created_at'])
+    ]),
+    (3, "Custom tour request index ordered by created_at", [
+        ('custom_tour_requests', 'idx_custom_tour_requests_created_at', ['created_at'])
+    ]),
+    (4, "Catalogue sort indexes for tours and guides listings", [
+        ('tours', 'idx_tours_name', ['name']),
+        ('guides', 'idx_guides_rating', ['rating'])
+    ]),
+    (5, "Content version counters for catalogue ETags", [
+        """
+        CREATE TABLE IF NOT EXISTS content_versions (
+            name VARCHAR(50) PRIMARY KEY,
+            version BIGINT NOT NULL DEFAULT 0,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
+        )
+        """,
+        "INSERT IGNORE INTO content_versions (name, version) VALUES ('tours', 1), ('guides', 1)"
+    ])
+]
+
+def _scalar(row):
+    if row is None:
+        return None
+    if isinstance(row, dict):
+        return next(iter(row.values()))
+    return row[0]
+
+def ensure_schema_version_table(cur):
+    """Create the schema_version bookkeeping table if needed"""
+    cur.execute("""
+    CREATE TABLE IF NOT EXISTS schema_version (
+        version INT PRIMARY KEY,
+        description VARCHAR(255) NOT NULL,
+        applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+    """)
+
+def get_applied_versions(cur):
+    """Return the set of migration versions already recorded"""
+    cur.execute("SELECT version FROM schema_version")
+    return {_scalar(row) for row in cur.fetchall()}
+
+def index_exists(cur, table, index_name):
+    cur.execute("""
+        SELECT COUNT(*) AS count FROM information_schema.statistics
+        WHERE table_schema = DATABASE() AND table_name = %s AND index_name = %s
+    """, (table, index_name))
+    return bool(_scalar(cur.fetchone()))
+
+def create_index(cur, table, index_name, columns):
+    """Idempotently create an index; returns True if it was created"""
+    if index_exists(cur, table, index_name):
+        logger.info(f"Index {index_name} already exists on {table}, skipping")
+        return False
+    column_list = ', '.join(f'`{col}`' for col in columns)
+    cur.execute(f"CREATE INDEX `{index_name}` ON `{table}` ({column_list})")
+    logger.info(f"Created index {index_name} on {table}({', '.join(columns)})")
+    return True
+
+def run_migrations(connection, target_version=None):
+    """Apply pending migrations in version order.
+
+    A MySQL named lock serialises concurrent runners (e.g. several workers
+    starting together). Returns the list of versions applied by this call.
+    """
+    cur = connection.cursor()
+    applied_now = []
+    try:
+        cur.execute("SELECT GET_LOCK(%s, %s) AS acquired", (MIGRATION_LOCK_NAME, MIGRATION_LOCK_TIMEOUT))
+        if _scalar(cur.fetchone()) != 1:
+            raise RuntimeError("Timed out waiting for the schema migration lock")
+
+        try:
+            ensure_schema_version_table(cur)
+            applied = get_applied_versions(cur)
+
+            for version, description, steps in MIGRATIONS:
+                if version in applied:
+                    continue
+                if target_version is not None and version > target_version:
+                    break
+
+                logger.info(f"Applying migration {version}: {description}")
+                for step in steps:
+                    if isinstance(step, str):
+                        cur.execute(step)
+                    else:
+                        create_index(cur, *step)
+
+                cur.execute(
+                    "INSERT INTO schema_version (version, description) VALUES (%s, %s)",
+                    (version, description)
+                )
+                connection.commit()
+                applied_now.append(version)
+
+            if applied_now:
+                logger.info(f"Applied migrations: {applied_now}")
+            else:
+                logger.info("Database schema is up to date")
+            return applied_now
+        finally:
+            cur.execute("SELECT RELEASE_LOCK(%s)", (MIGRATION_LOCK_NAME,))
+            cur.fetchone()
+    finally:
+        cur.close()
+
+def current_version(connection):
+    """Highest applied migration version, or 0 for an unmigrated database"""
+    cur = connection.cursor()
+    try:
+        ensure_schema_version_table(cur)
+        cur.execute("SELECT MAX(version) AS version FROM schema_version")
+        return _scalar(cur.fetchone()) or 0
+    finally:
+        cur.close()
+
+def main():
+    """Apply migrations from the command line: python migrations.py [target_version]"""
+    os.environ['EAGER_INIT'] = '0'
+    from app import app, mysql, init_db
+
+    target_version = int(sys.argv[1]) if len(sys.argv) > 1 else None
+
+    with app.app_context():
+        if not init_db(apply_migrations=False):
+            print("❌ Database initialization failed")
+            sys.exit(1)
+        applied = run_migrations(mysql.connection, target_version)
+        print(f"✅ Applied migrations: {applied or 'none'}")
+        print(f"Schema version: {current_version(mysql.connection)}")
+
+if __name__ == "__main__":
+    main()
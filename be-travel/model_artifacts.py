@@ -0,0 +1,203 @@
+# model_artifacts.py
+import hashlib
+import json
+import logging
+import os
+import shutil
+import sys
+import uuid
+from datetime import datetime
+
+import joblib
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_NAME = 'manifest.json'
+CURRENT_POINTER = 'CURRENT'
+RELEASES_DIR = 'releases'
+MANIFEST_FORMAT = 1
+
+# Release layout:
+#   <models_dir>/releases/<version>/manifest.json
+#   <models_dir>/releases/<version>/<artifact>.pkl ...
+#   <models_dir>/CURRENT            -> name of the active version
+# A release directory is written under a temporary name, renamed into place
+# and only then made current by atomically replacing CURRENT, so readers
+# never see a half-written model set. Releases are never modified afterwards.
+
+def sha256_file(path, chunk_size=1024 * 1024):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def release_dir(models_dir, version):
+    return os.path.join(models_dir, RELEASES_DIR, version)
+
+def current_release(models_dir):
+    """Active release version, or None when only the legacy flat layout exists"""
+    try:
+        with open(os.path.join(models_dir, CURRENT_POINTER), 'r') as f:
+            version = f.read().strip()
+    except FileNotFoundError:
+        return None
+    return version or None
+
+def list_releases(models_dir):
+    root = os.path.join(models_dir, RELEASES_DIR)
+    if not os.path.isdir(root):
+        return []
+    return sorted(
+        name for name in os.listdir(root)
+        if not name.startswith('.') and os.path.exists(os.path.join(root, name, MANIFEST_NAME))
+    )
+
+def activate_release(models_dir, version):
+    """Point CURRENT at an existing release (also used for rollback)"""
+    if not os.path.exists(os.path.join(release_dir(models_dir, version), MANIFEST_NAME)):
+        raise ValueError(f"Unknown model release: {version}")
+    pointer = os.path.join(models_dir, CURRENT_POINTER)
+    tmp_pointer = f"{pointer}.tmp-{uuid.uuid4().hex[:8]}"
+    with open(tmp_pointer, 'w') as f:
+        f.write(version + '\n')
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_pointer, pointer)
+    logger.info(f"Activated model release {version}")
+
+def publish_release(models_dir, artifacts, features, metadata=None, keep=5):
+    """Write artifacts as a new immutable release and make it current.
+
+    `artifacts` maps file names (e.g. 'scaler.pkl') to Python objects,
+    `features` maps model names to their ordered input feature lists.
+    Returns the new version string.
+    """
+    version = f"{datetime.now().strftime('%Y%m%dT%H%M%S')}-{uuid.uuid4().hex[:6]}"
+    os.makedirs(os.path.join(models_dir, RELEASES_DIR), exist_ok=True)
+    tmp_dir = os.path.join(models_dir, RELEASES_DIR, f".tmp-{version}")
+    os.makedirs(tmp_dir)
+
+    try:
+        files = {}
+        for filename, obj in artifacts.items():
+            if obj is None:
+                continue
+            path = os.path.join(tmp_dir, filename)
+            # Uncompressed so numpy arrays can be memory-mapped on load
+            joblib.dump(obj, path)
+            files[filename] = {'sha256': sha256_file(path), 'bytes': os.path.getsize(path)}
+
+        manifest = {
+            'format': MANIFEST_FORMAT,
+            'version': version,
+            'created_at': datetime.now().isoformat(),
+            'files': files,
+            'features': {name: list(columns) for name, columns in features.items()},
+            'metadata': metadata or {}
+        }
+        with open(os.path.join(tmp_dir, MANIFEST_NAME), 'w') as f:
+            json.dump(manifest, f, indent=2, default=str)
+
+        os.rename(tmp_dir, release_dir(models_dir, version))
+    except Exception:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        raise
+
+    activate_release(models_dir, version)
+    prune_releases(models_dir, keep)
+    logger.info(f"Published model release {version} ({len(files)} artifacts)")
+    return version
+
+def prune_releases(models_dir, keep=5):
+    """Delete the oldest releases beyond `keep`, never the current one"""
+    current = current_release(models_dir)
+    releases = list_releases(models_dir)
+    for version in releases[:max(0, len(releases) - keep)]:
+        if version != current:
+            shutil.rmtree(release_dir(models_dir, version), ignore_errors=True)
+            logger.info(f"Pruned model release {version}")
+
+def load_manifest(models_dir, version):
+    with open(os.path.join(release_dir(models_dir, version), MANIFEST_NAME), 'r') as f:
+        return json.load(f)
+
+def verify_release(models_dir, manifest):
+    """Raise ValueError if any artifact is missing or fails its checksum"""
+    base = release_dir(models_dir, manifest['version'])
+    for filename, entry in manifest['files'].items():
+        path = os.path.join(base, filename)
+        if not os.path.exists(path):
+            raise ValueError(f"Release {manifest['version']} is missing {filename}")
+        if sha256_file(path) != entry['sha256']:
+            raise ValueError(f"Checksum mismatch for {filename} in release {manifest['version']}")
+
+def load_release(models_dir, version=None, mmap_mode='r', verify=True):
+    """Load (manifest, {filename: object}) for a release, memory-mapping arrays"""
+    version = version or current_release(models_dir)
+    if version is None:
+        raise ValueError(f"No current model release in {models_dir}")
+
+    manifest = load_manifest(models_dir, version)
+    if manifest.get('format') != MANIFEST_FORMAT:
+        raise ValueError(f"Unsupported manifest format {manifest.get('format')} in release {version}")
+    if verify:
+        verify_release(models_dir, manifest)
+
+    base = release_dir(models_dir, version)
+    artifacts = {
+        filename: joblib.load(os.path.join(base, filename), mmap_mode=mmap_mode)
+        for filename in manifest['files']
+    }
+    return manifest, artifacts
+
+def publish_legacy_models(models_dir):
+    """Package the flat models/*.pkl layout as a release"""
+    artifacts = {}
+    for filename in sorted(os.listdir(models_dir)):
+        if filename.endswith('.pkl'):
+            artifacts[filename] = joblib.load(os.path.join(models_dir, filename))
+
+    features = {'recommendation': []}
+    features_file = os.path.join(models_dir, 'features.txt')
+    if os.path.exists(features_file):
+        with open(features_file, 'r') as f:
+            features['recommendation'] = [
+                line[2:].strip() for line in f if line.startswith('- ') and line[2:].strip()
+            ]
+
+    metadata = {'source': 'legacy'}
+    results_file = os.path.join(models_dir, 'training_results.json')
+    if os.path.exists(results_file):
+        with open(results_file, 'r') as f:
+            metadata['training_results'] = json.load(f)
+
+    return publish_release(models_dir, artifacts, features, metadata)
+
+def main():
+    """python model_artifacts.py [list | publish-legacy | activate <version>] [--dir models]"""
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    args = sys.argv[1:]
+    models_dir = 'models'
+    if '--dir' in args:
+        idx = args.index('--dir')
+        models_dir = args[idx + 1]
+        del args[idx:idx + 2]
+    command = args[0] if args else 'list'
+
+    if command == 'list':
+        current = current_release(models_dir)
+        for version in list_releases(models_dir):
+            marker = '*' if version == current else ' '
+            print(f"{marker} {version}")
+    elif command == 'publish-legacy':
+        print(f"✅ Published {publish_legacy_models(models_dir)}")
+    elif command == 'activate' and len(args) > 1:
+        activate_release(models_dir, args[1])
+        print(f"✅ Activated {args[1]}")
+    else:
+        print(main.__doc__)
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,351 @@
+# model_server.py
+import argparse
+import json
+import logging
+import os
+import signal
+import socket
+import socketserver
+import struct
+import threading
+import time
+
+import numpy as np
+
+from models import AIModels
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SOCKET_PATH = '/tmp/tour_system_models.sock'
+
+# Methods a client may call; everything else is rejected
+SERVED_METHODS = {
+    'predict_purchase_probability',
+    'predict_purchase_probability_batch',
+    'get_customer_segment',
+    'get_customer_segments',
+    'predict_optimal_price',
+    'get_batcher_metrics',
+    'get_model_info',
+    'reload_models',
+    'status'
+}
+
+# Exceptions that are re-raised on the client with their original type
+CLIENT_ERRORS = {'ValueError': ValueError, 'TypeError': TypeError}
+
+_HEADER = struct.Struct('!I')
+
+# How long ModelServerClient trusts the server's is_loaded/models answer
+STATUS_TTL_SECONDS = 1.0
+CONNECT_RETRY_DELAY = 0.05
+
+def _send(sock, payload):
+    body = json.dumps(payload, default=_to_json).encode('utf-8')
+    sock.sendall(_HEADER.pack(len(body)) + body)
+
+def _recv(sock):
+    body = _recv_frame(sock)
+    return json.loads(body.decode('utf-8')) if body is not None else None
+
+def _recv_frame(sock):
+    """One length-prefixed message body, or None at end of stream"""
+    header = _recv_exact(sock, _HEADER.size)
+    if header is None:
+        return None
+    return _recv_exact(sock, _HEADER.unpack(header)[0])
+
+def _recv_exact(sock, size):
+    chunks = []
+    while size:
+        chunk = sock.recv(min(size, 65536))
+        if not chunk:
+            return None
+        chunks.append(chunk)
+        size -= len(chunk)
+    return b''.join(chunks)
+
+def _is_closed(sock):
+    """True if the peer has closed an idle connection (reads as EOF)"""
+    try:
+        return sock.recv(1, socket.MSG_PEEK | socket.MSG_DONTWAIT) == b''
+    except BlockingIOError:
+        return False
+    except OSError:
+        return True
+
+def _to_json(value):
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    if isinstance(value, np.generic):
+        return value.item()
+    return str(value)
+
+class ModelRequestHandler(socketserver.BaseRequestHandler):
+    """Serves length-prefixed JSON requests on one persistent client connection"""
+
+    def handle(self):
+        ai_models = self.server.ai_models
+        while True:
+            try:
+                body = _recv_frame(self.request)
+            except (ConnectionError, OSError):
+                return
+            if body is None:
+                return
+
+            try:
+                message = json.loads(body.decode('utf-8'))
+                # The frame was read in full, so a bad message doesn't desync the stream
+                if not isinstance(message, dict):
+                    raise ValueError("Request must be a JSON object")
+                method = message.get('method')
+                args = message.get('args', [])
+                if not isinstance(args, list):
+                    raise ValueError("args must be a list")
+                if method not in SERVED_METHODS:
+                    raise ValueError(f"Unknown method: {method}")
+                if method == 'status':
+                    result = self.server.status()
+                else:
+                    result = getattr(ai_models, method)(*args)
+                response = {'ok': True, 'result': result}
+            except Exception as e:
+                response = {'ok': False, 'error': str(e), 'type': type(e).__name__}
+
+            try:
+                _send(self.request, response)
+            except (ConnectionError, OSError):
+                return
+
+class ModelServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    """Local process that owns the only in-memory copy of the AI models.
+
+    Flask workers connect over a Unix socket through ModelServerClient, so
+    N workers share one set of loaded forests instead of unpickling N
+    copies, and inference runs here rather than on request threads.
+    Concurrent single-profile requests from all workers are coalesced by
+    the AIModels micro-batcher.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, socket_path, ai_models):
+        if os.path.exists(socket_path):
+            os.unlink(socket_path)
+        self.ai_models = ai_models
+        self.started_at = time.time()
+        super().__init__(socket_path, ModelRequestHandler)
+        os.chmod(socket_path, 0o660)
+
+    def status(self):
+        return {
+            'is_loaded': self.ai_models.is_loaded,
+            'models': {
+                name: self.ai_models.has_model(name)
+                for name in ('recommendation_model', 'pricing_model', 'segmentation_artifact')
+            },
+            'pid': os.getpid(),
+            'uptime_seconds': round(time.time() - self.started_at, 1)
+        }
+
+    def server_close(self):
+        super().server_close()
+        if os.path.exists(self.server_address):
+            os.unlink(self.server_address)
+
+class ModelServerClient:
+    """AIModels stand-in that forwards predictions to a ModelServer.
+
+    Method signatures match AIModels. Each thread keeps its own persistent
+    connection; if the server is unreachable the same fallbacks AIModels
+    uses for missing models are returned (0.5, "Unknown", base_price).
+    `is_loaded` and `models` come from the server's status, re-read at most
+    every STATUS_TTL_SECONDS, so server-side reloads and new releases show
+    up without reconnecting.
+    """
+
+    def __init__(self, socket_path=DEFAULT_SOCKET_PATH, timeout=5.0):
+        self.socket_path = socket_path
+        self.timeout = timeout
+        self._local = threading.local()
+        self._status = {'is_loaded': False, 'models': {}}
+        self._status_checked_at = None
+
+    def server_status(self, refresh=False):
+        """The server's status reply, cached for STATUS_TTL_SECONDS"""
+        checked_at = self._status_checked_at
+        if refresh or checked_at is None or time.monotonic() - checked_at > STATUS_TTL_SECONDS:
+            try:
+                self._status = self.call('status')
+            except Exception as e:
+                logger.debug(f"Model server status unavailable: {str(e)}")
+                self._status = {'is_loaded': False, 'models': {}}
+            self._status_checked_at = time.monotonic()
+        return self._status
+
+    @property
+    def is_loaded(self):
+        return bool(self.server_status()['is_loaded'])
+
+    @property
+    def models(self):
+        return self.server_status()['models']
+
+    def _connection(self):
+        sock = getattr(self._local, 'sock', None)
+        if sock is not None and _is_closed(sock):
+            # The server restarted or dropped this idle connection
+            self._reset_connection()
+            sock = None
+        if sock is None:
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            sock.settimeout(self.timeout)
+            try:
+                sock.connect(self.socket_path)
+            except OSError:
+                sock.close()
+                raise
+            self._local.sock = sock
+        return sock
+
+    def _reset_connection(self):
+        sock = getattr(self._local, 'sock', None)
+        self._local.sock = None
+        if sock is not None:
+            try:
+                sock.close()
+            except OSError:
+                pass
+
+    def call(self, method, *args):
+        """Invoke an AIModels method in the server process.
+
+        Only connecting is retried: once a request has been sent it may be
+        running on the server (e.g. reload_models), so a timeout or dropped
+        reply is raised rather than sending it again.
+        """
+        try:
+            sock = self._connection()
+        except (ConnectionRefusedError, FileNotFoundError):
+            # The server may be mid-restart; try once more
+            time.sleep(CONNECT_RETRY_DELAY)
+            sock = self._connection()
+        try:
+            _send(sock, {'method': method, 'args': list(args)})
+            response = _recv(sock)
+            if response is None:
+                raise ConnectionError("Model server closed the connection")
+        except (ConnectionError, OSError, ValueError):
+            self._reset_connection()
+            raise
+        if not response['ok']:
+            raise CLIENT_ERRORS.get(response['type'], RuntimeError)(response['error'])
+        return response['result']
+
+    def load_models(self, parallel=True):
+        """Check the server is up and which models it has loaded"""
+        status = self.server_status(refresh=True)
+        if 'pid' not in status:
+            logger.error(f"Model server unavailable at {self.socket_path}")
+            return False
+        logger.info(f"Connected to model server pid {status['pid']} at {self.socket_path}")
+        return bool(status['is_loaded'])
+
+    def warm_up(self):
+        """Open this thread's connection and time one round trip"""
+        start = time.perf_counter()
+        self.predict_purchase_probability({'age': 35, 'income': 50000, 'guests': 2})
+        elapsed = time.perf_counter() - start
+        logger.info(f"Model server round trip {elapsed * 1000:.1f} ms")
+        return elapsed
+
+    def has_model(self, name):
+        return bool(self.models.get(name))
+
+    def enable_micro_batching(self, max_batch_size=64, max_wait_ms=2.0):
+        """Batching happens in the server process"""
+        return None
+
+    def disable_micro_batching(self):
+        return None
+
+    def get_batcher_metrics(self):
+        return self.call('get_batcher_metrics')
+
+    def get_model_info(self):
+        return self.call('get_model_info')
+
+    def reload_models(self, background=True):
+        """Ask the server to hot-reload; it swaps its model set atomically"""
+        try:
+            return self.call('reload_models', background)
+        finally:
+            # Re-read is_loaded/models on next use instead of after the TTL
+            self._status_checked_at = None
+
+    def start_release_watcher(self, interval=30):
+        """The model server watches releases itself"""
+        return None
+
+    def predict_purchase_probability_batch(self, customer_profiles):
+        return np.asarray(self.call('predict_purchase_probability_batch', customer_profiles))
+
+    def predict_purchase_probability(self, customer_profile):
+        try:
+            return float(self.call('predict_purchase_probability', customer_profile))
+        except Exception as e:
+            logger.error(f"Error predicting purchase probability: {str(e)}")
+            return 0.5
+
+    def get_customer_segments(self, customer_profiles):
+        return self.call('get_customer_segments', customer_profiles)
+
+    def get_customer_segment(self, customer_profile):
+        try:
+            return self.call('get_customer_segment', customer_profile)
+        except Exception as e:
+            logger.error(f"Error getting customer segment: {str(e)}")
+            return "Unknown"
+
+    def predict_optimal_price(self, customer_profile, base_price):
+        try:
+            return self.call('predict_optimal_price', customer_profile, base_price)
+        except Exception as e:
+            logger.error(f"Error predicting optimal price: {str(e)}")
+            return base_price
+
+def main():
+    """Run the model server: python model_server.py [--socket PATH]"""
+    parser = argparse.ArgumentParser(description="Serve AI model predictions over a Unix socket")
+    parser.add_argument('--socket', default=os.environ.get('AI_MODEL_SERVER_SOCKET', DEFAULT_SOCKET_PATH))
+    parser.add_argument('--batch-max-rows', type=int, default=int(os.environ.get('AI_BATCH_MAX_ROWS', 64)))
+    parser.add_argument('--batch-window-ms', type=float, default=float(os.environ.get('AI_BATCH_WINDOW_MS', 2)))
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+
+    ai_models = AIModels()
+    if not ai_models.load_models(parallel=True):
+        logger.warning("Serving without trained models; predictions use fallbacks")
+    else:
+        ai_models.warm_up()
+    ai_models.enable_micro_batching(max_batch_size=args.batch_max_rows, max_wait_ms=args.batch_window_ms)
+    watch_seconds = float(os.environ.get('AI_MODEL_WATCH_SECONDS', 30))
+    if watch_seconds > 0:
+        ai_models.start_release_watcher(interval=watch_seconds)
+
+    server = ModelServer(args.socket, ai_models)
+    # serve_forever() returns on SIGTERM so the socket file is cleaned up
+    signal.signal(signal.SIGTERM, lambda signum, frame: threading.Thread(target=server.shutdown).start())
+    logger.info(f"Model server listening on {args.socket} (pid {os.getpid()})")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        ai_models.disable_micro_batching()
+
+if __name__ == "__main__":
+    main()
@@ -1,81 +1,207 @@
 import numpy as np
 import pandas as pd
+from scipy import sparse
 from sklearn.neighbors import NearestNeighbors
 from sklearn.ensemble import RandomForestRegressor
 from sklearn.model_selection import train_test_split
 import joblib
 import os
 import json
+import math
 import random
+import threading
+import time
+from array import array
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
 import logging
 
+from forest_engine import compile_forest
+from model_artifacts import current_release, load_release
+from inference_batcher import MicroBatcher
+
 logger = logging.getLogger(__name__)
 
+# Above this many rows sklearn's C tree traversal beats the NumPy engine
+COMPILED_FOREST_MAX_BATCH = 256
+
+# Upper bound on how long a request waits for its micro-batched prediction
+BATCH_RESULT_TIMEOUT = 5.0
+
+# Customer profile keys -> recommendation model feature names
+PROFILE_FEATURE_MAPPING = {
+    'age': 'Age',
+    'city_tier': 'CityTier',
+    'guests': 'NumberOfPersonVisiting',
+    'children': 'NumberOfChildrenVisiting', 
+    'income': 'MonthlyIncome',
+    'owns_car': 'OwnCar',
+    'has_passport': 'Passport',
+    'trips': 'NumberOfTrips',
+    'satisfaction': 'PitchSatisfactionScore'
+}
+
+# Segmentation inputs in model column order: (profile key, default value)
+SEGMENTATION_FEATURES = [
+    'Age', 'MonthlyIncome', 'NumberOfPersonVisiting',
+    'NumberOfTrips', 'PitchSatisfactionScore', 'CityTier'
+]
+SEGMENTATION_PROFILE_DEFAULTS = [
+    ('age', 35), ('income', 50000), ('guests', 2),
+    ('trips', 1), ('satisfaction', 3), ('city_tier', 2)
+]
+
+def coerce_profile(profile):
+    """Copy of a customer profile with its model inputs as floats.
+
+    Raises ValueError/TypeError for a profile the model can't score.
+    """
+    if not isinstance(profile, dict):
+        raise TypeError("Customer profile must be an object")
+    coerced = dict(profile)
+    for key in PROFILE_FEATURE_MAPPING:
+        value = profile.get(key)
+        if value is None or value == '':
+            continue
+        if isinstance(value, str):
+            value = value.strip()
+        number = float(value)
+        if not math.isfinite(number):
+            raise ValueError(f"{key} must be a finite number")
+        coerced[key] = number
+    return coerced
+
+def build_segmentation_artifact(scaler, kmeans, features=SEGMENTATION_FEATURES):
+    """Bundle the fitted scaler and KMeans centroids into one plain-array artifact"""
+    return {
+        'features': list(features),
+        'mean': np.asarray(scaler.mean_, dtype=np.float64),
+        'scale': np.asarray(scaler.scale_, dtype=np.float64),
+        'centroids': np.asarray(kmeans.cluster_centers_, dtype=np.float64),
+        'created_at': datetime.now().isoformat()
+    }
+
+def assign_segments(artifact, X):
+    """Nearest-centroid segment index for each row of raw (unscaled) features"""
+    Z = (np.asarray(X, dtype=np.float64) - artifact['mean']) / artifact['scale']
+    centroids = artifact['centroids']
+    # ||z - c||^2 = ||z||^2 - 2 z.c + ||c||^2; ||z||^2 is constant per row
+    distances = (centroids ** 2).sum(axis=1) - 2.0 * Z @ centroids.T
+    return distances.argmin(axis=1)
+
+# Model files loaded by AIModels, mapped to ModelSet attributes
+MODEL_FILES = {
+    'recommendation_model.pkl': 'recommendation_model',
+    'pricing_model.pkl': 'pricing_model',
+    'segmentation_model.pkl': 'segmentation_model',
+    'segmentation_artifact.pkl': 'segmentation_artifact',
+    'similarity_model.pkl': 'similarity_model',
+    'scaler.pkl': 'scaler',
+    'label_encoders.pkl': 'label_encoders'
+}
+
+# Prebuilt CompiledForest artifacts (see forest_engine) in a release
+COMPILED_MODEL_FILES = {
+    'recommendation_model_compiled.pkl': 'recommendation_model',
+    'pricing_model_compiled.pkl': 'pricing_model'
+}
+
+DEFAULT_MODELS_DIR = os.environ.get(
+    'AI_MODELS_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'models')
+)
+
+class ModelSet:
+    """One consistent generation of loaded models.
+
+    A ModelSet is built completely before AIModels publishes it and is never
+    mutated afterwards, so a prediction that reads `ai_models.models` once
+    sees matching models, scaler and feature list even during a hot reload.
+    """
+
+    def __init__(self, version=None, source=None, recommendation_features=None,
+                 training_results=None, compiled_models=None, **models):
+        self.version = version
+        self.source = source
+        self.recommendation_model = models.get('recommendation_model')
+        self.pricing_model = models.get('pricing_model')
+        self.segmentation_model = models.get('segmentation_model')
+        self.segmentation_artifact = models.get('segmentation_artifact')
+        self.similarity_model = models.get('similarity_model')
+        self.scaler = models.get('scaler')
+        self.label_encoders = models.get('label_encoders') or {}
+        self.recommendation_features = list(recommendation_features or [])
+        self.training_results = training_results or {}
+        self.loaded_at = datetime.now().isoformat()
+
+        feature_positions = {feature: idx for idx, feature in enumerate(self.recommendation_features)}
+        # Precomputed (profile key, column) pairs for building feature matrices
+        self.profile_columns = [
+            (profile_key, feature_positions[feature_key])
+            for profile_key, feature_key in PROFILE_FEATURE_MAPPING.items()
+            if feature_key in feature_positions
+        ]
+        self.compiled_models = dict(compiled_models or {})
+        self._compile_forests()
+
+    def _compile_forests(self):
+        """Flatten loaded random forests for low-latency small-batch inference"""
+        for name in ('recommendation_model', 'pricing_model'):
+            model = getattr(self, name)
+            if name in self.compiled_models or model is None or not hasattr(model, 'estimators_'):
+                continue
+            try:
+                self.compiled_models[name] = compile_forest(model)
+                logger.info(f"Compiled {name}: {self.compiled_models[name].n_trees} trees")
+            except Exception as e:
+                logger.warning(f"Could not compile {name}, using sklearn: {str(e)}")
+
+    def has_model(self, name):
+        return getattr(self, name, None) is not None
+
+    def describe(self):
+        return {
+            'version': self.version,
+            'source': self.source,
+            'loaded_at': self.loaded_at,
+            'models': {name: self.has_model(name) for name in MODEL_FILES.values()},
+            'compiled_models': sorted(self.compiled_models),
+            'feature_count': len(self.recommendation_features)
+        }
+
+def _model_property(name):
+    return property(lambda self: getattr(self.models, name))
+
 # AI Models Storage
 class AIModels:
-    def __init__(self):
-        self.recommendation_model = None
-        self.pricing_model = None
-        self.segmentation_model = None
-        self.similarity_model = None
-        self.scaler = None
-        self.label_encoders = {}
-        self.recommendation_features = []
+    # Read-only views of the current ModelSet
+    recommendation_model = _model_property('recommendation_model')
+    pricing_model = _model_property('pricing_model')
+    segmentation_model = _model_property('segmentation_model')
+    segmentation_artifact = _model_property('segmentation_artifact')
+    similarity_model = _model_property('similarity_model')
+    scaler = _model_property('scaler')
+    label_encoders = _model_property('label_encoders')
+    recommendation_features = _model_property('recommendation_features')
+    profile_columns = _model_property('profile_columns')
+    compiled_models = _model_property('compiled_models')
+    training_results = _model_property('training_results')
+
+    def __init__(self, models_dir=None):
+        self.models_dir = models_dir or DEFAULT_MODELS_DIR
+        self.models = ModelSet()
+        self.purchase_batcher = None
         self.is_loaded = False
-        self.training_results = {}
+        self._reload_lock = threading.Lock()
+        self._watcher_thread = None
+        self._watcher_stop = threading.Event()
+        self.reload_stats = {'reloads': 0, 'failures': 0, 'last_error': None, 'last_reload_at': None}
         
-    def load_models(self):
+    def load_models(self, parallel=True):
         """Load pre-trained models from files"""
         try:
-            models_dir = 'models'
-            if not os.path.exists(models_dir):
-                logger.warning("Models directory not found. Please train models first.")
-                return False
-            
-            # Load models
-            model_files = {
-                'recommendation_model.pkl': 'recommendation_model',
-                'pricing_model.pkl': 'pricing_model', 
-                'segmentation_model.pkl': 'segmentation_model',
-                'similarity_model.pkl': 'similarity_model',
-                'scaler.pkl': 'scaler',
-                'label_encoders.pkl': 'label_encoders'
-            }
-            
-            for filename, attr_name in model_files.items():
-                filepath = os.path.join(models_dir, filename)
-                if os.path.exists(filepath):
-                    setattr(self, attr_name, joblib.load(filepath))
-                    logger.info(f"Loaded {filename}")
-                else:
-                    logger.warning(f"Model file not found: {filename}")
-            
-            # Load features
-            features_file = os.path.join(models_dir, 'features.txt')
-            if os.path.exists(features_file):
-                with open(features_file, 'r') as f:
-                    content = f.read()
-                    if "Recommendation Features:" in content:
-                        lines = content.split('\n')
-                        in_rec_section = False
-                        for line in lines:
-                            if "Recommendation Features:" in line:
-                                in_rec_section = True
-                                continue
-                            if in_rec_section and line.startswith('- '):
-                                feature = line.replace('- ', '').strip()
-                                if feature:
-                                    self.recommendation_features.append(feature)
-            
-            # Load training results
-            results_file = os.path.join(models_dir, 'training_results.json')
-            if os.path.exists(results_file):
-                with open(results_file, 'r') as f:
-                    self.training_results = json.load(f)
-            
+            self.models = self._load_model_set(parallel)
             self.is_loaded = True
-            logger.info("All AI models loaded successfully!")
+            logger.info(f"All AI models loaded successfully! (version {self.models.version})")
             return True
             
         except Exception as e:
@@ -83,66 +209,264 @@ class AIModels:
             self.is_loaded = False
             return False
     
+    def _load_model_set(self, parallel=True):
+        """Build a ModelSet from the current release, or the legacy flat layout"""
+        if not os.path.exists(self.models_dir):
+            raise FileNotFoundError(f"Models directory {self.models_dir} not found. Please train models first.")
+        
+        version = current_release(self.models_dir)
+        if version is not None:
+            return self._load_release(version)
+        return self._load_legacy(parallel)
+    
+    def _load_release(self, version):
+        """Load a versioned release; large arrays are memory-mapped read-only"""
+        manifest, artifacts = load_release(self.models_dir, version, mmap_mode='r')
+        models = {attr: artifacts.get(filename) for filename, attr in MODEL_FILES.items()}
+        compiled = {
+            name: artifacts[filename]
+            for filename, name in COMPILED_MODEL_FILES.items() if filename in artifacts
+        }
+        logger.info(f"Loaded model release {version}: {', '.join(sorted(artifacts))}")
+        return ModelSet(
+            version=version,
+            source='release',
+            recommendation_features=manifest['features'].get('recommendation', []),
+            training_results=manifest['metadata'].get('training_results', {}),
+            compiled_models=compiled,
+            **models
+        )
+    
+    def _load_legacy(self, parallel=True):
+        """Load the flat models/*.pkl layout written by older training runs"""
+        models_dir = self.models_dir
+        
+        def load_one(filename):
+            filepath = os.path.join(models_dir, filename)
+            if not os.path.exists(filepath):
+                return filename, None, False
+            return filename, joblib.load(filepath), True
+        
+        # Unpickling is mostly file I/O and numpy buffer copies, so the
+        # files load concurrently in threads
+        if parallel:
+            with ThreadPoolExecutor(max_workers=len(MODEL_FILES)) as executor:
+                loaded = list(executor.map(load_one, MODEL_FILES))
+        else:
+            loaded = [load_one(filename) for filename in MODEL_FILES]
+        
+        models = {}
+        for filename, obj, found in loaded:
+            if found:
+                models[MODEL_FILES[filename]] = obj
+                logger.info(f"Loaded {filename}")
+            else:
+                logger.warning(f"Model file not found: {filename}")
+        
+        # Load features
+        recommendation_features = []
+        features_file = os.path.join(models_dir, 'features.txt')
+        if os.path.exists(features_file):
+            with open(features_file, 'r') as f:
+                content = f.read()
+                if "Recommendation Features:" in content:
+                    lines = content.split('\n')
+                    in_rec_section = False
+                    for line in lines:
+                        if "Recommendation Features:" in line:
+                            in_rec_section = True
+                            continue
+                        if in_rec_section and line.startswith('- '):
+                            feature = line.replace('- ', '').strip()
+                            if feature:
+                                recommendation_features.append(feature)
+        
+        # Load training results
+        training_results = {}
+        results_file = os.path.join(models_dir, 'training_results.json')
+        if os.path.exists(results_file):
+            with open(results_file, 'r') as f:
+                training_results = json.load(f)
+        
+        return ModelSet(
+            version='legacy',
+            source='legacy',
+            recommendation_features=recommendation_features,
+            training_results=training_results,
+            **models
+        )
+    
+    def reload_models(self, background=True):
+        """Build a new ModelSet off-thread and swap it in atomically.
+
+        Requests keep using the previous set until the swap; if loading
+        fails the previous set stays active. Returns False if a reload is
+        already running.
+        """
+        if not self._reload_lock.acquire(blocking=False):
+            return False
+        
+        def run():
+            try:
+                start = time.perf_counter()
+                new_models = self._load_model_set(parallel=True)
+                self.models = new_models
+                self.is_loaded = True
+                self.reload_stats['reloads'] += 1
+                self.reload_stats['last_error'] = None
+                self.reload_stats['last_reload_at'] = datetime.now().isoformat()
+                logger.info(f"Hot-reloaded models version {new_models.version} "
+                            f"in {(time.perf_counter() - start) * 1000:.0f} ms")
+            except Exception as e:
+                self.reload_stats['failures'] += 1
+                self.reload_stats['last_error'] = str(e)
+                logger.error(f"Model reload failed, keeping version {self.models.version}: {str(e)}")
+            finally:
+                self._reload_lock.release()
+        
+        if background:
+            threading.Thread(target=run, name='model-reloader', daemon=True).start()
+        else:
+            run()
+        return True
+    
+    def start_release_watcher(self, interval=30):
+        """Poll the CURRENT release pointer and hot-reload when it changes"""
+        if self._watcher_thread is not None and self._watcher_thread.is_alive():
+            return
+        self._watcher_stop.clear()
+        
+        def watch():
+            while not self._watcher_stop.wait(interval):
+                try:
+                    version = current_release(self.models_dir)
+                    if version is not None and version != self.models.version:
+                        logger.info(f"Model release changed to {version}, reloading")
+                        self.reload_models(background=False)
+                except Exception as e:
+                    logger.error(f"Model release watcher error: {str(e)}")
+        
+        self._watcher_thread = threading.Thread(target=watch, name='model-release-watcher', daemon=True)
+        self._watcher_thread.start()
+    
+    def stop_release_watcher(self):
+        self._watcher_stop.set()
+    
+    def get_model_info(self):
+        info = self.models.describe()
+        info.update({
+            'is_loaded': self.is_loaded,
+            'models_dir': self.models_dir,
+            'current_release': current_release(self.models_dir) if os.path.exists(self.models_dir) else None,
+            'reload': dict(self.reload_stats),
+            'reload_in_progress': self._reload_lock.locked()
+        })
+        return info
+    
+    def warm_up(self):
+        """Run synthetic predictions so first real requests skip lazy init costs"""
+        sample_profile = {
+            'age': 35, 'city_tier': 2, 'guests': 2, 'children': 0,
+            'income': 50000, 'owns_car': 1, 'has_passport': 1,
+            'trips': 2, 'satisfaction': 3
+        }
+        start = time.perf_counter()
+        self.predict_purchase_probability(sample_profile)
+        self.get_customer_segment(sample_profile)
+        self.predict_optimal_price(sample_profile, 1000)
+        elapsed = time.perf_counter() - start
+        logger.info(f"AI models warmed up in {elapsed * 1000:.1f} ms")
+        return elapsed
+    
+    def enable_micro_batching(self, max_batch_size=64, max_wait_ms=2.0):
+        """Coalesce concurrent single-profile predictions into batched model calls"""
+        self.disable_micro_batching()
+        self.purchase_batcher = MicroBatcher(
+            self.predict_purchase_probability_batch,
+            max_batch_size=max_batch_size,
+            max_wait_ms=max_wait_ms,
+            name='purchase-probability-batcher',
+            prepare_fn=coerce_profile
+        ).start()
+        logger.info(f"Micro-batching enabled ({max_batch_size} rows / {max_wait_ms} ms window)")
+        return self.purchase_batcher
+    
+    def disable_micro_batching(self):
+        if self.purchase_batcher is not None:
+            self.purchase_batcher.stop()
+            self.purchase_batcher = None
+    
+    def get_batcher_metrics(self):
+        batcher = self.purchase_batcher
+        return batcher.get_metrics() if batcher else {'running': False}
+    
+    def has_model(self, name):
+        return self.models.has_model(name)
+    
+    @staticmethod
+    def _forest_predict_proba(models, name, X):
+        """predict_proba through the compiled forest for small batches, sklearn otherwise"""
+        compiled = models.compiled_models.get(name)
+        if compiled is not None and (len(X) <= COMPILED_FOREST_MAX_BATCH or getattr(models, name) is None):
+            return compiled.predict_proba(X)
+        return getattr(models, name).predict_proba(X)
+    
+    def build_feature_matrix(self, customer_profiles, models=None):
+        """Feature matrix (n_profiles x n_features) with unmapped features left at zero"""
+        models = models or self.models
+        X = np.zeros((len(customer_profiles), len(models.recommendation_features)))
+        for profile_key, col in models.profile_columns:
+            X[:, col] = [profile.get(profile_key) or 0 for profile in customer_profiles]
+        return X
+    
+    def predict_purchase_probability_batch(self, customer_profiles):
+        """Predict purchase probabilities for many customers in one vectorized call"""
+        models = self.models
+        if not self.is_loaded or models.recommendation_model is None:
+            return np.full(len(customer_profiles), 0.5)
+        if not customer_profiles:
+            return np.zeros(0)
+        
+        X = self.build_feature_matrix([coerce_profile(profile) for profile in customer_profiles], models)
+        X_scaled = models.scaler.transform(X)
+        return self._forest_predict_proba(models, 'recommendation_model', X_scaled)[:, 1]
+    
     def predict_purchase_probability(self, customer_profile):
         """Predict purchase probability for a customer"""
         if not self.is_loaded or self.recommendation_model is None:
             return 0.5
         
         try:
-            # Prepare feature vector
-            feature_vector = np.zeros(len(self.recommendation_features))
-            
-            # Map customer profile to features
-            profile_mapping = {
-                'age': 'Age',
-                'city_tier': 'CityTier',
-                'guests': 'NumberOfPersonVisiting',
-                'children': 'NumberOfChildrenVisiting', 
-                'income': 'MonthlyIncome',
-                'owns_car': 'OwnCar',
-                'has_passport': 'Passport',
-                'trips': 'NumberOfTrips',
-                'satisfaction': 'PitchSatisfactionScore'
-            }
-            
-            for profile_key, feature_key in profile_mapping.items():
-                if profile_key in customer_profile and feature_key in self.recommendation_features:
-                    idx = self.recommendation_features.index(feature_key)
-                    feature_vector[idx] = customer_profile[profile_key]
-            
-            # Scale features
-            feature_vector_scaled = self.scaler.transform([feature_vector])
-            
-            # Predict probability
-            probability = self.recommendation_model.predict_proba(feature_vector_scaled)[0][1]
-            return probability
+            # predict_optimal_price goes through here too, so both share the batcher
+            batcher = self.purchase_batcher
+            if batcher is not None and batcher.running:
+                return float(batcher.submit(customer_profile).result(timeout=BATCH_RESULT_TIMEOUT))
+            return float(self.predict_purchase_probability_batch([customer_profile])[0])
             
+        except (ValueError, TypeError) as e:
+            logger.warning(f"Invalid customer profile, using default purchase probability: {str(e)}")
+            return 0.5
         except Exception as e:
             logger.error(f"Error predicting purchase probability: {str(e)}")
             return 0.5
     
+    def get_customer_segments(self, customer_profiles):
+        """Assign segments for many profiles with a NumPy nearest-centroid search"""
+        artifact = self.segmentation_artifact
+        X = np.array([
+            [profile.get(key, default) for key, default in SEGMENTATION_PROFILE_DEFAULTS]
+            for profile in customer_profiles
+        ], dtype=np.float64).reshape(len(customer_profiles), len(SEGMENTATION_PROFILE_DEFAULTS))
+        segments = assign_segments(artifact, X)
+        return [f"Segment_{segment}" for segment in segments]
+    
     def get_customer_segment(self, customer_profile):
         """Get customer segment for a profile"""
-        if not self.is_loaded or self.segmentation_model is None:
+        if not self.is_loaded or self.segmentation_artifact is None:
             return "Unknown"
         
         try:
-            # Prepare features for segmentation
-            features = [
-                customer_profile.get('age', 35),
-                customer_profile.get('income', 50000),
-                customer_profile.get('guests', 2),
-                customer_profile.get('trips', 1),
-                customer_profile.get('satisfaction', 3),
-                customer_profile.get('city_tier', 2)
-            ]
-            
-            from sklearn.preprocessing import StandardScaler
-            scaler = StandardScaler()
-            features_scaled = scaler.fit_transform([features])
-            
-            segment = self.segmentation_model.predict(features_scaled)[0]
-            return f"Segment_{segment}"
+            return self.get_customer_segments([customer_profile])[0]
             
         except Exception as e:
             logger.error(f"Error getting customer segment: {str(e)}")
@@ -179,64 +503,281 @@ class AIModels:
             logger.error(f"Error predicting optimal price: {str(e)}")
             return base_price
 
+class NeighbourTable:
+    """Precomputed top-K neighbours and ranked candidate packages per user.
+
+    Candidates are stored CSR-style: the packages for user u are
+    candidate_indices[candidate_indptr[u]:candidate_indptr[u + 1]], best first.
+    """
+
+    def __init__(self, matrix, neighbours, candidate_indptr, candidate_indices, build_seconds):
+        self.matrix = matrix
+        self.neighbours = neighbours
+        self.candidate_indptr = candidate_indptr
+        self.candidate_indices = candidate_indices
+        self.n_users = matrix.shape[0]
+        self.build_seconds = build_seconds
+        self.built_at = time.time()
+
+    def candidates(self, user_idx):
+        return self.candidate_indices[self.candidate_indptr[user_idx]:self.candidate_indptr[user_idx + 1]]
+
+    def booked(self, user_idx):
+        return self.matrix.indices[self.matrix.indptr[user_idx]:self.matrix.indptr[user_idx + 1]]
+
+    def nbytes(self):
+        return (self.neighbours.nbytes + self.candidate_indptr.nbytes +
+                self.candidate_indices.nbytes)
+
 # Original ML Models (keeping for backward compatibility)
 class RecommendationEngine:
+    """User-based collaborative filtering over a sparse user x package count matrix.
+
+    Bookings are kept as COO triplets that grow with add_booking(); the CSR
+    matrix used for neighbour search is rebuilt lazily (O(nnz)) only when
+    new bookings arrived since the last query.
+    """
+
     def __init__(self):
         self.model = NearestNeighbors(metric='cosine', algorithm='brute')
         self.user_item_matrix = None
         self.user_ids = []
         self.package_ids = []
+        self.user_index = {}
+        self.package_index = {}
+        self.package_counts = np.zeros(0)
+        self._rows = array('i')
+        self._cols = array('i')
+        self._dirty = False
+        self._lock = threading.RLock()
+        
+        # Precomputed neighbour table and bookings made since it was built
+        self.neighbour_table = None
+        self.refresh_interval = None
+        self._recent = {}
+        self._recent_prev = {}
+        self._bookings_since_build = 0
+        self._refresh_thread = None
+        self._stop_refresh = threading.Event()
         
     def fit(self, bookings, users, packages):
         try:
-            self.user_ids = [user['id'] for user in users]
-            self.package_ids = [pkg['id'] for pkg in packages]
-            
-            if not self.user_ids or not self.package_ids:
-                logger.warning("No users or packages for recommendation engine")
-                return
+            with self._lock:
+                self.user_ids = [user['id'] for user in users]
+                self.package_ids = [pkg['id'] for pkg in packages]
+                self.user_index = {user_id: idx for idx, user_id in enumerate(self.user_ids)}
+                self.package_index = {pkg_id: idx for idx, pkg_id in enumerate(self.package_ids)}
+                self.package_counts = np.zeros(len(self.package_ids))
+                self._rows = array('i')
+                self._cols = array('i')
+                self.user_item_matrix = None
+                self.neighbour_table = None
+                self._recent = {}
+                self._recent_prev = {}
                 
-            self.user_item_matrix = np.zeros((len(self.user_ids), len(self.package_ids)))
-            
-            for booking in bookings:
-                try:
-                    user_idx = self.user_ids.index(booking['user_id'])
-                    package_idx = self.package_ids.index(booking['tour_id'])
-                    self.user_item_matrix[user_idx, package_idx] += 1
-                except (ValueError, IndexError):
-                    continue
-            
-            if np.sum(self.user_item_matrix) > 0:
-                self.model.fit(self.user_item_matrix)
-                logger.info("Recommendation engine trained successfully")
-            else:
-                logger.warning("Not enough data to train recommendation engine")
+                if not self.user_ids or not self.package_ids:
+                    logger.warning("No users or packages for recommendation engine")
+                    return
+                
+                for booking in bookings:
+                    user_idx = self.user_index.get(booking['user_id'])
+                    package_idx = self.package_index.get(booking['tour_id'])
+                    if user_idx is None or package_idx is None:
+                        continue
+                    self._rows.append(user_idx)
+                    self._cols.append(package_idx)
+                
+                np.add.at(self.package_counts, np.array(self._cols, dtype=np.int32), 1)
+                self._dirty = True
+                
+                if self._materialize().nnz > 0:
+                    logger.info("Recommendation engine trained successfully")
+                else:
+                    logger.warning("Not enough data to train recommendation engine")
                 
         except Exception as e:
             logger.error(f"Error training recommendation engine: {str(e)}")
     
+    def add_booking(self, user_id, tour_id):
+        """Record one committed booking without refitting from scratch"""
+        with self._lock:
+            user_idx = self.user_index.get(user_id)
+            if user_idx is None:
+                user_idx = len(self.user_ids)
+                self.user_ids.append(user_id)
+                self.user_index[user_id] = user_idx
+            
+            package_idx = self.package_index.get(tour_id)
+            if package_idx is None:
+                package_idx = len(self.package_ids)
+                self.package_ids.append(tour_id)
+                self.package_index[tour_id] = package_idx
+                self.package_counts = np.append(self.package_counts, 0.0)
+            
+            self._rows.append(user_idx)
+            self._cols.append(package_idx)
+            self.package_counts[package_idx] += 1
+            self._dirty = True
+            self._recent.setdefault(user_idx, set()).add(package_idx)
+            self._bookings_since_build += 1
+    
+    def _materialize(self):
+        """Rebuild the CSR matrix (duplicate bookings are summed) if stale"""
+        with self._lock:
+            if self._dirty or self.user_item_matrix is None:
+                rows = np.array(self._rows, dtype=np.int32)
+                cols = np.array(self._cols, dtype=np.int32)
+                self.user_item_matrix = sparse.coo_matrix(
+                    (np.ones(len(rows), dtype=np.float32), (rows, cols)),
+                    shape=(len(self.user_ids), len(self.package_ids))
+                ).tocsr()
+                if self.user_item_matrix.nnz > 0:
+                    self.model.fit(self.user_item_matrix)
+                self._dirty = False
+            return self.user_item_matrix
+    
     def recommend(self, user_id, n_recommendations=5):
-        if not self.user_ids or user_id not in self.user_ids:
+        user_idx = self.user_index.get(user_id)
+        if user_idx is None:
             return self.get_popular_packages(n_recommendations)
+        
+        table = self.neighbour_table
+        if table is None or user_idx >= table.n_users:
+            return self._recommend_live(user_idx, n_recommendations)
+        
+        # O(1) lookup; only bookings made after the build need filtering here
+        booked = self._recent.get(user_idx, ())
+        booked_prev = self._recent_prev.get(user_idx, ())
+        recommended_packages = [
+            self.package_ids[pkg_idx] for pkg_idx in table.candidates(user_idx)
+            if pkg_idx not in booked and pkg_idx not in booked_prev
+        ][:n_recommendations]
+        
+        if not recommended_packages and table.booked(user_idx).size == 0 and (booked or booked_prev):
+            # First booking happened after the build: no neighbours yet
+            return self._recommend_live(user_idx, n_recommendations)
+        return recommended_packages or self.get_popular_packages(n_recommendations)
+    
+    def precompute_neighbours(self, k=5, max_candidates=20, batch_size=1024):
+        """Build the top-K neighbour table off the request path"""
+        start = time.perf_counter()
+        with self._lock:
+            matrix = self._materialize()
+            # Bookings from here on are not in `matrix`; track them separately
+            self._recent_prev = self._recent
+            self._recent = {}
+            self._bookings_since_build = 0
+        
+        n_users = matrix.shape[0]
+        neighbours = np.full((n_users, k), -1, dtype=np.int32)
+        candidate_indptr = np.zeros(n_users + 1, dtype=np.int64)
+        candidate_chunks = []
+        
+        if matrix.nnz > 0 and n_users > 1:
+            model = NearestNeighbors(metric='cosine', algorithm='brute').fit(matrix)
+            n_neighbors = min(k + 1, n_users)
+            active = np.flatnonzero(np.diff(matrix.indptr))
             
+            for batch_start in range(0, len(active), batch_size):
+                batch = active[batch_start:batch_start + batch_size]
+                _, indices = model.kneighbors(matrix[batch], n_neighbors=n_neighbors)
+                for user_idx, row in zip(batch, indices):
+                    row = row[row != user_idx][:k]
+                    neighbours[user_idx, :len(row)] = row
+            
+        # Ranked candidates: neighbour packages in neighbour order, unbooked, deduplicated
+        indptr, indices = matrix.indptr, matrix.indices
+        total = 0
+        for user_idx in range(n_users):
+            seen = set(indices[indptr[user_idx]:indptr[user_idx + 1]].tolist())
+            ranked = []
+            for neighbour_idx in neighbours[user_idx]:
+                if neighbour_idx < 0 or len(ranked) >= max_candidates:
+                    break
+                for pkg_idx in indices[indptr[neighbour_idx]:indptr[neighbour_idx + 1]].tolist():
+                    if pkg_idx not in seen:
+                        seen.add(pkg_idx)
+                        ranked.append(pkg_idx)
+            ranked = ranked[:max_candidates]
+            candidate_chunks.append(ranked)
+            total += len(ranked)
+            candidate_indptr[user_idx + 1] = total
+        
+        candidate_indices = np.fromiter(
+            (pkg_idx for chunk in candidate_chunks for pkg_idx in chunk), dtype=np.int32, count=total
+        )
+        
+        table = NeighbourTable(matrix, neighbours, candidate_indptr, candidate_indices,
+                               time.perf_counter() - start)
+        with self._lock:
+            self.neighbour_table = table
+            self._recent_prev = {}
+        
+        logger.info(f"Precomputed neighbours for {n_users} users in {table.build_seconds:.2f}s "
+                    f"({table.nbytes() / 1024:.1f} KB)")
+        return table
+    
+    def start_background_refresh(self, interval=300, **precompute_kwargs):
+        """Rebuild the neighbour table every `interval` seconds when bookings changed"""
+        self.refresh_interval = interval
+        if self._refresh_thread is not None and self._refresh_thread.is_alive():
+            return
+        
+        def refresh_loop():
+            while not self._stop_refresh.wait(self.refresh_interval):
+                if self._bookings_since_build == 0 and self.neighbour_table is not None:
+                    continue
+                try:
+                    self.precompute_neighbours(**precompute_kwargs)
+                except Exception as e:
+                    logger.error(f"Error refreshing neighbour table: {str(e)}")
+        
+        self._stop_refresh.clear()
+        self._refresh_thread = threading.Thread(target=refresh_loop, name='neighbour-refresh', daemon=True)
+        self._refresh_thread.start()
+    
+    def stop_background_refresh(self):
+        self._stop_refresh.set()
+    
+    def get_staleness_metrics(self):
+        """How old the neighbour table is and how much has changed since"""
+        table = self.neighbour_table
+        return {
+            'table_built': table is not None,
+            'built_at': datetime.fromtimestamp(table.built_at).isoformat() if table else None,
+            'age_seconds': round(time.time() - table.built_at, 1) if table else None,
+            'build_seconds': round(table.build_seconds, 3) if table else None,
+            'users_covered': table.n_users if table else 0,
+            'users_total': len(self.user_ids),
+            'bookings_since_build': self._bookings_since_build,
+            'table_kb': round(table.nbytes() / 1024, 1) if table else 0,
+            'refresh_interval_seconds': self.refresh_interval
+        }
+    
+    def _recommend_live(self, user_idx, n_recommendations):
+        """Brute-force neighbour search, used when no precomputed entry exists"""
         try:
-            user_idx = self.user_ids.index(user_id)
-            if np.sum(self.user_item_matrix[user_idx]) == 0:
-                return self.get_popular_packages(n_recommendations)
-                
-            distances, indices = self.model.kneighbors(
-                [self.user_item_matrix[user_idx]], 
-                n_neighbors=min(6, len(self.user_ids))
-            )
+            # Hold the lock so a concurrent add_booking cannot refit the
+            # neighbour model between materializing and querying it
+            with self._lock:
+                matrix = self._materialize()
+                user_row = matrix[user_idx]
+                if user_row.nnz == 0:
+                    return self.get_popular_packages(n_recommendations)
+                    
+                distances, indices = self.model.kneighbors(
+                    user_row, 
+                    n_neighbors=min(6, matrix.shape[0])
+                )
             
+            booked = set(user_row.indices.tolist())
             similar_users = indices[0][1:]
             recommended_packages = []
             
             for similar_user_idx in similar_users:
-                user_packages = np.where(self.user_item_matrix[similar_user_idx] > 0)[0]
-                for pkg_idx in user_packages:
-                    if (self.user_item_matrix[similar_user_idx, pkg_idx] > 0 and 
-                        self.user_item_matrix[user_idx, pkg_idx] == 0):
+                start, end = matrix.indptr[similar_user_idx], matrix.indptr[similar_user_idx + 1]
+                for pkg_idx in matrix.indices[start:end]:
+                    if pkg_idx not in booked:
                         recommended_packages.append(self.package_ids[pkg_idx])
                         if len(recommended_packages) >= n_recommendations:
                             break
@@ -250,12 +791,11 @@ class RecommendationEngine:
             return self.get_popular_packages(n_recommendations)
     
     def get_popular_packages(self, n=5):
-        if not self.package_ids or self.user_item_matrix is None:
+        if not self.package_ids or not self.package_counts.any():
             return []
             
         try:
-            package_sums = np.sum(self.user_item_matrix, axis=0)
-            popular_indices = np.argsort(package_sums)[::-1][:n]
+            popular_indices = np.argsort(self.package_counts)[::-1][:n]
             return [self.package_ids[i] for i in popular_indices if i < len(self.package_ids)]
         except:
             return []
@@ -263,6 +803,7 @@ class RecommendationEngine:
 class PricingOptimizer:
     def __init__(self):
         self.model = RandomForestRegressor(n_estimators=50, random_state=42)
+        self.compiled_model = None
         self.is_trained = False
         
     def prepare_data(self, bookings, tours):
@@ -300,6 +841,7 @@ class PricingOptimizer:
             
             X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
             self.model.fit(X_train, y_train)
+            self.compiled_model = compile_forest(self.model)
             self.is_trained = True
             logger.info("Pricing optimizer trained successfully")
             
@@ -313,15 +855,16 @@ class PricingOptimizer:
             
         try:
             travel_date = datetime.strptime(travel_date, '%Y-%m-%d')
-            features = pd.DataFrame([{
-                'month': travel_date.month,
-                'day_of_week': travel_date.weekday(),
-                'duration': 7,
-                'guests': guests,
-                'advance_booking': (travel_date - datetime.now()).days
-            }])
+            # Same column order as the training DataFrame
+            features = np.array([[
+                travel_date.month,
+                travel_date.weekday(),
+                7,
+                guests,
+                (travel_date - datetime.now()).days
+            ]], dtype=np.float64)
             
-            predicted_price = self.model.predict(features)[0]
+            predicted_price = self.compiled_model.predict(features)[0]
             return max(base_price * 0.5, min(base_price * 2, predicted_price))
             
         except Exception as e:
@@ -0,0 +1,207 @@
+# preprocessing_cache.py
+import hashlib
+import inspect
+import json
+import logging
+import os
+import shutil
+import time
+import uuid
+
+import joblib
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# Bump when the on-disk layout below changes
+CACHE_FORMAT = 2
+
+DEFAULT_CACHE_DIR = os.environ.get(
+    'PREPROCESS_CACHE_DIR',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), 'cache', 'preprocessed')
+)
+
+def file_digest(path, chunk_size=1024 * 1024):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def code_digest(*functions):
+    """Hash of the preprocessing source, so editing it invalidates the cache"""
+    digest = hashlib.sha256(str(CACHE_FORMAT).encode())
+    for fn in functions:
+        digest.update(inspect.getsource(fn).encode('utf-8'))
+    return digest.hexdigest()
+
+def smallest_int_dtype(values):
+    lo, hi = values.min(), values.max()
+    for dtype in (np.int8, np.int16, np.int32, np.int64):
+        info = np.iinfo(dtype)
+        if info.min <= lo and hi <= info.max:
+            return dtype
+    return np.int64
+
+def _compact(series):
+    """(array, column meta) using the smallest dtype that round-trips exactly"""
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        codes = series.cat.codes.to_numpy()
+        return codes.astype(smallest_int_dtype(codes)), {
+            'kind': 'category',
+            'categories': [str(c) for c in series.cat.categories],
+            'ordered': bool(series.cat.ordered)
+        }
+    if pd.api.types.is_bool_dtype(series):
+        return series.to_numpy(dtype=bool), {'kind': 'bool'}
+    if pd.api.types.is_integer_dtype(series):
+        values = series.to_numpy()
+        return values.astype(smallest_int_dtype(values)), {'kind': 'int', 'dtype': str(series.dtype)}
+    if pd.api.types.is_float_dtype(series):
+        values = series.to_numpy(dtype=np.float64)
+        as_float32 = values.astype(np.float32)
+        if np.array_equal(as_float32.astype(np.float64), values, equal_nan=True):
+            return as_float32, {'kind': 'float', 'dtype': str(series.dtype)}
+        return values, {'kind': 'float', 'dtype': str(series.dtype)}
+    # Strings: dictionary-encode, -1 marks missing
+    codes, uniques = pd.factorize(series, use_na_sentinel=True)
+    return codes.astype(smallest_int_dtype(codes)), {
+        'kind': 'string',
+        'categories': [str(u) for u in uniques],
+        'dtype': str(series.dtype)
+    }
+
+def _restore(values, meta):
+    kind = meta['kind']
+    if kind == 'category':
+        return pd.Categorical.from_codes(np.asarray(values), meta['categories'], ordered=meta['ordered'])
+    if kind == 'string':
+        categories = np.array(meta['categories'] + [np.nan], dtype=object)
+        restored = categories[np.asarray(values)]  # code -1 picks the trailing NaN
+        dtype = meta.get('dtype', 'object')
+        return restored if dtype == 'object' else pd.array(restored, dtype=dtype)
+    if kind == 'int':
+        return np.asarray(values).astype(meta['dtype'])
+    if kind == 'float':
+        return np.asarray(values, dtype=meta.get('dtype', 'float64'))
+    return np.asarray(values)
+
+class PreprocessingCache:
+    """Content-addressed cache of preprocessed training DataFrames.
+
+    Entries are keyed by sha256(input file) + sha256(preprocessing source)
+    and stored as one compact-dtype .npy per column plus meta.json, so a
+    repeat run memory-maps the columns instead of parsing the CSV and
+    re-running encoding, binning and imputation. Fitted state (such as
+    label encoders) is stored alongside with joblib.
+    """
+
+    def __init__(self, cache_dir=None, enabled=True):
+        self.cache_dir = cache_dir or DEFAULT_CACHE_DIR
+        self.enabled = enabled and os.environ.get('PREPROCESS_CACHE', '1') == '1'
+
+    def entry_dir(self, name, key):
+        return os.path.join(self.cache_dir, f"{name}-{key[:24]}")
+
+    def key(self, csv_path, *functions):
+        return hashlib.sha256(
+            (file_digest(csv_path) + code_digest(*functions)).encode()
+        ).hexdigest()
+
+    def load_arrays(self, name, key):
+        """(meta, {column: memmap}) for a cached entry, or None"""
+        entry = self.entry_dir(name, key)
+        meta_path = os.path.join(entry, 'meta.json')
+        if not os.path.exists(meta_path):
+            return None
+        with open(meta_path, 'r') as f:
+            meta = json.load(f)
+        arrays = {
+            column['name']: np.load(os.path.join(entry, column['file']), mmap_mode='r')
+            for column in meta['columns']
+        }
+        return meta, arrays
+
+    def load_index(self, name, key):
+        return np.load(os.path.join(self.entry_dir(name, key), 'index.npy'))
+
+    def load(self, name, key):
+        """(DataFrame, state) for a cached entry, or None on a miss"""
+        if not self.enabled:
+            return None
+        loaded = self.load_arrays(name, key)
+        if loaded is None:
+            return None
+        meta, arrays = loaded
+        df = pd.DataFrame(
+            {column['name']: _restore(arrays[column['name']], column) for column in meta['columns']},
+            index=pd.Index(self.load_index(name, key))
+        )
+        state_path = os.path.join(self.entry_dir(name, key), 'state.pkl')
+        state = joblib.load(state_path) if os.path.exists(state_path) else {}
+        return df, state
+
+    def store(self, name, key, df, state=None):
+        """Write an entry atomically (temp dir + rename); returns bytes written"""
+        if not self.enabled:
+            return 0
+        final_dir = self.entry_dir(name, key)
+        if os.path.exists(final_dir):
+            return 0
+        os.makedirs(self.cache_dir, exist_ok=True)
+        tmp_dir = os.path.join(self.cache_dir, f".tmp-{uuid.uuid4().hex}")
+        os.makedirs(tmp_dir)
+
+        try:
+            columns = []
+            np.save(os.path.join(tmp_dir, 'index.npy'), df.index.to_numpy(dtype=np.int64))
+            for idx, column in enumerate(df.columns):
+                values, column_meta = _compact(df[column])
+                filename = f"c{idx:03d}.npy"
+                np.save(os.path.join(tmp_dir, filename), values)
+                columns.append(dict(column_meta, name=column, file=filename))
+            with open(os.path.join(tmp_dir, 'meta.json'), 'w') as f:
+                json.dump({
+                    'format': CACHE_FORMAT,
+                    'rows': len(df),
+                    'columns': columns,
+                    'created_at': time.time()
+                }, f, indent=2)
+            if state:
+                joblib.dump(state, os.path.join(tmp_dir, 'state.pkl'))
+            size = sum(os.path.getsize(os.path.join(tmp_dir, f)) for f in os.listdir(tmp_dir))
+            os.rename(tmp_dir, final_dir)
+        except OSError:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+            if os.path.exists(final_dir):
+                # Another process stored the same entry first
+                return 0
+            raise
+        except Exception:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+            raise
+        return size
+
+    def get_or_build(self, name, csv_path, build_fn, *code):
+        """Cached (DataFrame, state) for csv_path, calling build_fn(csv_path) on a miss.
+
+        `code` lists extra functions whose source is part of the key
+        (build_fn itself always is).
+        """
+        if not self.enabled:
+            return build_fn(csv_path)
+
+        start = time.perf_counter()
+        key = self.key(csv_path, build_fn, *code)
+        cached = self.load(name, key)
+        if cached is not None:
+            logger.info(f"Preprocessing cache hit for {name} ({len(cached[0])} rows) "
+                        f"in {(time.perf_counter() - start) * 1000:.1f} ms")
+            return cached
+
+        df, state = build_fn(csv_path)
+        size = self.store(name, key, df, state)
+        logger.info(f"Preprocessing cache miss for {name}; built in "
+                    f"{(time.perf_counter() - start) * 1000:.1f} ms, stored {size / 1024:.0f} KB")
+        return df, state
@@ -6,9 +6,90 @@ import jwt
 import json
 import pandas as pd
 import os
+import time
+import base64
+from decimal import Decimal
+from logging_config import LazyJson
+from http_cache import bump_content_version, make_etag, not_modified, with_cache_headers
+from catalogue_cache import CatalogueCache
+
+# Upper bound on profiles accepted by one batch scoring request
+MAX_SCORING_BATCH = 10000
+
+# Keyset pagination limits for list endpoints
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+def encode_cursor(sort_value, row_id):
+    """Encode the (sort key, id) of the last row on a page as an opaque cursor"""
+    if isinstance(sort_value, datetime):
+        sort_value = sort_value.strftime('%Y-%m-%d %H:%M:%S.%f')
+    elif isinstance(sort_value, Decimal):
+        sort_value = str(sort_value)
+    payload = json.dumps([sort_value, row_id], separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode('utf-8')).decode('ascii').rstrip('=')
+
+def decode_cursor(cursor):
+    """Decode a cursor produced by encode_cursor into (sort key, id)"""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        sort_value, row_id = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+        return sort_value, int(row_id)
+    except (ValueError, TypeError):
+        raise ValueError("Invalid pagination cursor")
+
+def parse_page_args(args):
+    """Read ?limit=&after= from the query string, clamped to MAX_PAGE_SIZE"""
+    try:
+        limit = int(args.get('limit', DEFAULT_PAGE_SIZE))
+    except (ValueError, TypeError):
+        raise ValueError("limit must be an integer")
+    if limit < 1:
+        raise ValueError("limit must be at least 1")
+    limit = min(limit, MAX_PAGE_SIZE)
+
+    after = args.get('after')
+    return limit, (decode_cursor(after) if after else None)
+
+def keyset_clause(sort_column, id_column, after, descending=True):
+    """SQL predicate and params selecting rows strictly after the cursor"""
+    if after is None:
+        return "", []
+    op = '<' if descending else '>'
+    sort_value, row_id = after
+    clause = f" AND ({sort_column} {op} %s OR ({sort_column} = %s AND {id_column} {op} %s))"
+    return clause, [sort_value, sort_value, row_id]
+
+def paginated_response(rows, limit, sort_key):
+    """Trim the limit+1 probe row and build the list payload with next_cursor"""
+    has_more = len(rows) > limit
+    page = [dict(row) for row in rows[:limit]]
+    next_cursor = None
+    if has_more and page:
+        next_cursor = encode_cursor(page[-1][sort_key], page[-1]['id'])
+    return jsonify({
+        "status": "success",
+        "data": page,
+        "count": len(page),
+        "limit": limit,
+        "has_more": has_more,
+        "next_cursor": next_cursor
+    })
 
 def register_routes(app, mysql, ai_models, recommender, pricing_optimizer, chatbot, 
-                   token_required, get_db_cursor, close_db_cursor, logger):
+                   token_required, get_db_cursor, close_db_cursor, logger, admin_required,
+                   training_jobs=None):
+    
+    # In-process catalogue caches; loaded at startup by initialize_app()
+    tours_cache = CatalogueCache('tours', 'tours', 'name, id', 'name',
+                                 get_db_cursor, close_db_cursor)
+    guides_cache = CatalogueCache('guides', 'guides', 'rating DESC, id DESC', 'rating',
+                                  get_db_cursor, close_db_cursor)
+    app.extensions['catalogue_cache'] = {'tours': tours_cache, 'guides': guides_cache}
+    
+    def json_response(body, status=200):
+        """Response from an already-serialized JSON string"""
+        return app.response_class(body, status=status, mimetype='application/json')
     
     # Health check endpoint
     @app.route('/api/health', methods=['GET'])
@@ -155,6 +236,14 @@ def register_routes(app, mysql, ai_models, recommender, pricing_optimizer, chatb
     def get_bookings():
         cur = None
         try:
+            try:
+                limit, after = parse_page_args(request.args)
+            except ValueError as e:
+                return jsonify({
+                    "status": "error",
+                    "message": str(e)
+                }), 400
+            
             cur = get_db_cursor()
             
             # Get query parameters for filtering
@@ -177,17 +266,18 @@ def register_routes(app, mysql, ai_models, recommender, pricing_optimizer, chatb
             if status:
                 query += " AND b.status = %s"
                 params.append(status)
+            
+            clause, clause_params = keyset_clause('b.booking_date', 'b.id', after)
+            query += clause
+            params.extend(clause_params)
                 
-            query += " ORDER BY b.booking_date DESC"
+            query += " ORDER BY b.booking_date DESC, b.id DESC LIMIT %s"
+            params.append(limit + 1)
             
             cur.execute(query, params)
             bookings = cur.fetchall()
             
-            return jsonify({
-                "status": "success",
-                "data": [dict(booking) for booking in bookings],
-                "count": len(bookings)
-            })
+            return paginated_response(bookings, limit, 'booking_date')
             
         except Exception as e:
             logger.error(f"Error fetching bookings: {str(e)}")
@@ -203,7 +293,7 @@ def register_routes(app, mysql, ai_models, recommender, pricing_optimizer, chatb
         cur = None
         try:
             data = request.get_json()
-            logger.info(f"Received booking data: {json.dumps(data, indent=2, default=str)}")
+            logger.debug("Received booking data: %s", LazyJson(data, indent=2))
             
             # Validate required fields
             required_fields = ['tour_id', 'travel_date', 'guests', 'total_price', 
@@ -263,9 +353,12 @@ def register_routes(app, mysql, ai_models, recommender, pricing_optimizer, chatb
             
             cur = get_db_cursor()
             
-            # Verify tour exists
-            cur.execute("SELECT id, name, price FROM tours WHERE id = %s", (tour_id,))
-            tour = cur.fetchone()
+            # Verify tour exists; fall back to the database for tours added
+            # by another worker since this cache last checked its version
+            tour = tours_cache.get(tour_id)
+            if not tour:
+                cur.execute("SELECT id, name, price FROM tours WHERE id = %s", (tour_id,))
+                tour = cur.fetchone()
             if not tour:
                 return jsonify({
                     "status": "error",
@@ -314,6 +407,10 @@ def register_routes(app, mysql, ai_models, recommender, pricing_optimizer, chatb
             booking_id = cur.lastrowid
             mysql.connection.commit()
             
+            # Keep collaborative-filtering counts fresh without a refit
+            if user_id is not None:
+                recommender.add_booking(user_id, tour_id)
+            
             # Fetch the created booking with tour info
             cur.execute("""
                 SELECT b.*, t.name as tour_name, t.image_url as tour_image, t.description as tour_description
@@ -477,45 +574,45 @@ def register_routes(app, mysql, ai_models, recommender, pricing_optimizer, chatb
     # Guides Routes
     @app.route('/api/guides', methods=['GET'])
     def get_guides():
-        cur = None
         try:
-            cur = get_db_cursor()
-            cur.execute("SELECT * FROM guides ORDER BY rating DESC")
-            guides = cur.fetchall()
+            try:
+                limit, after = parse_page_args(request.args)
+            except ValueError as e:
+                return jsonify({
+                    "status": "error",
+                    "message": str(e)
+                }), 400
             
-            return jsonify({
-                "status": "success",
-                "data": [dict(guide) for guide in guides],
-                "count": len(guides)
-            })
+            snapshot = guides_cache.snapshot()
+            etag = make_etag('guides', snapshot.version, request)
+            if request.if_none_match.contains(etag):
+                return not_modified(etag)
+            
+            body = snapshot.page_json(limit, after, True, encode_cursor)
+            return with_cache_headers(json_response(body), etag)
         except Exception as e:
             logger.error(f"Error fetching guides: {str(e)}")
             return jsonify({
                 "status": "error",
                 "message": str(e)
             }), 500
-        finally:
-            if cur:
-                close_db_cursor(cur)
 
     @app.route('/api/guides/<int:guide_id>', methods=['GET'])
     def get_guide_details(guide_id):
-        cur = None
         try:
-            cur = get_db_cursor()
-            cur.execute("SELECT * FROM guides WHERE id = %s", (guide_id,))
-            guide = cur.fetchone()
+            snapshot = guides_cache.snapshot()
+            etag = make_etag('guides', snapshot.version, request)
+            if request.if_none_match.contains(etag):
+                return not_modified(etag)
             
-            if not guide:
+            row_json = snapshot.json_by_id.get(guide_id)
+            if row_json is None:
                 return jsonify({
                     "status": "error",
                     "message": "Guide not found"
                 }), 404
             
-            return jsonify({
-                "status": "success",
-                "data": dict(guide)
-            })
+            return with_cache_headers(json_response('{"data":%s,"status":"success"}' % row_json), etag)
             
         except Exception as e:
             logger.error(f"Error fetching guide details: {str(e)}")
@@ -523,9 +620,6 @@ def register_routes(app, mysql, ai_models, recommender, pricing_optimizer, chatb
                 "status": "error",
                 "message": str(e)
             }), 500
-        finally:
-            if cur:
-                close_db_cursor(cur)
 
     # Guide Requests Routes
     @app.route('/api/guide-requests', methods=['GET', 'POST'])
@@ -538,6 +632,14 @@ def register_routes(app, mysql, ai_models, recommender, pricing_optimizer, chatb
     def get_guide_requests():
         cur = None
         try:
+            try:
+                limit, after = parse_page_args(request.args)
+            except ValueError as e:
+                return jsonify({
+                    "status": "error",
+                    "message": str(e)
+                }), 400
+            
             cur = get_db_cursor()
             
             # Get query parameters for filtering
@@ -562,17 +664,18 @@ def register_routes(app, mysql, ai_models, recommender, pricing_optimizer, chatb
             if guide_id:
                 query += " AND gr.guide_id = %s"
                 params.append(guide_id)
+            
+            clause, clause_params = keyset_clause('gr.created_at', 'gr.id', after)
+            query += clause
+            params.extend(clause_params)
                 
-            query += " ORDER BY gr.created_at DESC"
+            query += " ORDER BY gr.created_at DESC, gr.id DESC LIMIT %s"
+            params.append(limit + 1)
             
             cur.execute(query, params)
             requests = cur.fetchall()
             
-            return jsonify({
-                "status": "success",
-                "data": [dict(req) for req in requests],
-                "count": len(requests)
-            })
+            return paginated_response(requests, limit, 'created_at')
             
         except Exception as e:
             logger.error(f"Error fetching guide requests: {str(e)}")
@@ -588,7 +691,7 @@ def register_routes(app, mysql, ai_models, recommender, pricing_optimizer, chatb
         cur = None
         try:
             data = request.get_json()
-            logger.info(f"Received guide request data: {json.dumps(data, indent=2, default=str)}")
+            logger.debug("Received guide request data: %s", LazyJson(data, indent=2))
             
             # Validate required fields
             required_fields = ['guide_id', 'request_type', 'customer_name', 'customer_email', 'message']
@@ -867,7 +970,9 @@ def register_routes(app, mysql, ai_models, recommender, pricing_optimizer, chatb
                     guide['price_range']
                 ))
             
+            bump_content_version(cur, 'guides')
             mysql.connection.commit()
+            guides_cache.reload()
             
             # Verify insertion
             cur.execute("SELECT COUNT(*) as count FROM guides")
@@ -901,7 +1006,7 @@ def register_routes(app, mysql, ai_models, recommender, pricing_optimizer, chatb
         cur = None
         try:
             data = request.get_json()
-            logger.info(f"Received custom tour request data: {json.dumps(data, indent=2, default=str)}")
+            logger.debug("Received custom tour request data: %s", LazyJson(data, indent=2))
             
             # Validate required fields
             required_fields = ['customer_name', 'customer_email', 'customer_phone', 
@@ -1050,15 +1155,24 @@ def register_routes(app, mysql, ai_models, recommender, pricing_optimizer, chatb
     def get_custom_tour_requests():
         cur = None
         try:
+            try:
+                limit, after = parse_page_args(request.args)
+            except ValueError as e:
+                return jsonify({
+                    "status": "error",
+                    "message": str(e)
+                }), 400
+            
             cur = get_db_cursor()
-            cur.execute("SELECT * FROM custom_tour_requests ORDER BY created_at DESC")
+            clause, params = keyset_clause('created_at', 'id', after)
+            cur.execute(
+                "SELECT * FROM custom_tour_requests WHERE 1=1" + clause +
+                " ORDER BY created_at DESC, id DESC LIMIT %s",
+                params + [limit + 1]
+            )
             requests = cur.fetchall()
             
-            return jsonify({
-                "status": "success",
-                "data": [dict(req) for req in requests],
-                "count": len(requests)
-            })
+            return paginated_response(requests, limit, 'created_at')
             
         except Exception as e:
             logger.error(f"Error fetching custom tour requests: {str(e)}")
@@ -1126,45 +1240,45 @@ def register_routes(app, mysql, ai_models, recommender, pricing_optimizer, chatb
     # Tours Routes
     @app.route('/api/tours', methods=['GET'])
     def get_tours():
-        cur = None
         try:
-            cur = get_db_cursor()
-            cur.execute("SELECT * FROM tours ORDER BY name")
-            tours = cur.fetchall()
+            try:
+                limit, after = parse_page_args(request.args)
+            except ValueError as e:
+                return jsonify({
+                    "status": "error",
+                    "message": str(e)
+                }), 400
             
-            return jsonify({
-                "status": "success",
-                "data": [dict(tour) for tour in tours],
-                "count": len(tours)
-            })
+            snapshot = tours_cache.snapshot()
+            etag = make_etag('tours', snapshot.version, request)
+            if request.if_none_match.contains(etag):
+                return not_modified(etag)
+            
+            body = snapshot.page_json(limit, after, False, encode_cursor)
+            return with_cache_headers(json_response(body), etag)
         except Exception as e:
             logger.error(f"Error fetching tours: {str(e)}")
             return jsonify({
                 "status": "error",
                 "message": str(e)
             }), 500
-        finally:
-            if cur:
-                close_db_cursor(cur)
 
     @app.route('/api/tours/<int:tour_id>', methods=['GET'])
     def get_tour_details(tour_id):
-        cur = None
         try:
-            cur = get_db_cursor()
-            cur.execute("SELECT * FROM tours WHERE id = %s", (tour_id,))
-            tour = cur.fetchone()
+            snapshot = tours_cache.snapshot()
+            etag = make_etag('tours', snapshot.version, request)
+            if request.if_none_match.contains(etag):
+                return not_modified(etag)
             
-            if not tour:
+            row_json = snapshot.json_by_id.get(tour_id)
+            if row_json is None:
                 return jsonify({
                     "status": "error",
                     "message": "Tour not found"
                 }), 404
             
-            return jsonify({
-                "status": "success",
-                "data": dict(tour)
-            })
+            return with_cache_headers(json_response('{"data":%s,"status":"success"}' % row_json), etag)
             
         except Exception as e:
             logger.error(f"Error fetching tour details: {str(e)}")
@@ -1172,9 +1286,6 @@ def register_routes(app, mysql, ai_models, recommender, pricing_optimizer, chatb
                 "status": "error",
                 "message": str(e)
             }), 500
-        finally:
-            if cur:
-                close_db_cursor(cur)
 
     # Utility Routes
     @app.route('/api/seed-sri-lanka', methods=['GET'])
@@ -1205,7 +1316,9 @@ def register_routes(app, mysql, ai_models, recommender, pricing_optimizer, chatb
                     ('Sinharaja Rainforest Trek', 'UNESCO Biosphere Reserve trekking with endemic wildlife, bird watching, and nature conservation experiences', 580.00, 4, 'Nature', '/images/yala.webp')
             """)
             
+            bump_content_version(cur, 'tours')
             mysql.connection.commit()
+            tours_cache.reload()
             
             # Verify insertion
             cur.execute("SELECT COUNT(*) as count FROM tours")
@@ -1306,4 +1419,203 @@ def register_routes(app, mysql, ai_models, recommender, pricing_optimizer, chatb
             return jsonify({
                 "status": "error",
                 "message": f"Chat service error: {str(e)}"
-            }), 500
\ No newline at end of file
+            }), 500
+
+    # AI Routes
+    @app.route('/api/ai/purchase-probability/batch', methods=['POST', 'OPTIONS'])
+    def batch_purchase_probability():
+        if request.method == 'OPTIONS':
+            return '', 200
+            
+        try:
+            data = request.get_json()
+            profiles = data.get('profiles') if isinstance(data, dict) else None
+            
+            if not isinstance(profiles, list) or not profiles:
+                return jsonify({
+                    "status": "error",
+                    "message": "profiles must be a non-empty list"
+                }), 400
+            
+            if len(profiles) > MAX_SCORING_BATCH:
+                return jsonify({
+                    "status": "error",
+                    "message": f"At most {MAX_SCORING_BATCH} profiles per request"
+                }), 400
+            
+            if not all(isinstance(profile, dict) for profile in profiles):
+                return jsonify({
+                    "status": "error",
+                    "message": "Each profile must be an object"
+                }), 400
+            
+            start = time.perf_counter()
+            probabilities = ai_models.predict_purchase_probability_batch(profiles)
+            elapsed = time.perf_counter() - start
+            
+            return jsonify({
+                "status": "success",
+                "data": {
+                    "probabilities": [round(float(p), 6) for p in probabilities],
+                    "count": len(profiles),
+                    "model_loaded": ai_models.is_loaded and ai_models.has_model('recommendation_model'),
+                    "elapsed_ms": round(elapsed * 1000, 3),
+                    "profiles_per_second": round(len(profiles) / elapsed, 1) if elapsed > 0 else None
+                }
+            })
+            
+        except (ValueError, TypeError) as e:
+            return jsonify({
+                "status": "error",
+                "message": f"Invalid profile data: {str(e)}"
+            }), 400
+        except Exception as e:
+            logger.error(f"Batch scoring error: {str(e)}")
+            return jsonify({
+                "status": "error",
+                "message": f"Batch scoring failed: {str(e)}"
+            }), 500
+
+    @app.route('/api/ai/models', methods=['GET'])
+    def ai_model_info():
+        try:
+            return jsonify({
+                "status": "success",
+                "data": ai_models.get_model_info()
+            })
+        except Exception as e:
+            logger.error(f"Model info error: {str(e)}")
+            return jsonify({
+                "status": "error",
+                "message": f"Model info unavailable: {str(e)}"
+            }), 500
+
+    @app.route('/api/ai/models/reload', methods=['POST'])
+    @token_required
+    @admin_required
+    def reload_ai_models(current_user):
+        try:
+            started = ai_models.reload_models(background=True)
+            if not started:
+                return jsonify({
+                    "status": "error",
+                    "message": "A model reload is already in progress"
+                }), 409
+            
+            logger.info(f"Model reload requested by user {current_user}")
+            return jsonify({
+                "status": "success",
+                "message": "Model reload started; poll GET /api/ai/models for the active version"
+            }), 202
+        except Exception as e:
+            logger.error(f"Model reload error: {str(e)}")
+            return jsonify({
+                "status": "error",
+                "message": f"Model reload failed: {str(e)}"
+            }), 500
+
+    @app.route('/api/train-models', methods=['POST'])
+    @token_required
+    @admin_required
+    def start_training_job(current_user):
+        if training_jobs is None:
+            return jsonify({
+                "status": "error",
+                "message": "Training jobs are not enabled on this server"
+            }), 503
+        try:
+            options = request.get_json(silent=True) or {}
+            job = training_jobs.start(options)
+            if job is None:
+                return jsonify({
+                    "status": "error",
+                    "message": "A training job is already running",
+                    "data": training_jobs.active_job()
+                }), 409
+            
+            logger.info(f"Training job {job['job_id']} started by user {current_user}")
+            return jsonify({
+                "status": "success",
+                "message": f"Training started; poll GET /api/train-models/{job['job_id']} for progress",
+                "data": job
+            }), 202
+        except ValueError as e:
+            return jsonify({
+                "status": "error",
+                "message": str(e)
+            }), 400
+        except Exception as e:
+            logger.error(f"Training job start error: {str(e)}")
+            return jsonify({
+                "status": "error",
+                "message": f"Failed to start training: {str(e)}"
+            }), 500
+
+    @app.route('/api/train-models', methods=['GET'])
+    @token_required
+    @admin_required
+    def list_training_jobs(current_user):
+        if training_jobs is None:
+            return jsonify({"status": "success", "data": []})
+        try:
+            return jsonify({
+                "status": "success",
+                "data": training_jobs.list_jobs()
+            })
+        except Exception as e:
+            logger.error(f"Training job list error: {str(e)}")
+            return jsonify({
+                "status": "error",
+                "message": f"Failed to list training jobs: {str(e)}"
+            }), 500
+
+    @app.route('/api/train-models/<job_id>', methods=['GET'])
+    @token_required
+    @admin_required
+    def get_training_job(current_user, job_id):
+        job = training_jobs.get(job_id) if training_jobs is not None else None
+        if job is None:
+            return jsonify({
+                "status": "error",
+                "message": "Training job not found"
+            }), 404
+        return jsonify({
+            "status": "success",
+            "data": job
+        })
+
+    @app.route('/api/train-models/<job_id>/cancel', methods=['POST'])
+    @token_required
+    @admin_required
+    def cancel_training_job(current_user, job_id):
+        try:
+            job = training_jobs.cancel(job_id) if training_jobs is not None else None
+            if job is None:
+                return jsonify({
+                    "status": "error",
+                    "message": "Training job not found"
+                }), 404
+            if not job.get('cancel_requested'):
+                return jsonify({
+                    "status": "error",
+                    "message": f"Training job already {job['state']}",
+                    "data": job
+                }), 409
+            
+            logger.info(f"Training job {job_id} cancelled by user {current_user}")
+            return jsonify({
+                "status": "success",
+                "message": "Cancellation requested",
+                "data": job
+            }), 202
+        except RuntimeError as e:
+            return jsonify({
+                "status": "error",
+                "message": str(e)
+            }), 409
+        except Exception as e:
+            logger.error(f"Training job cancel error: {str(e)}")
+            return jsonify({
+                "status": "error",
+                "message": f"Failed to cancel training job: {str(e)}"
+            }), 500
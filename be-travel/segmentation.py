@@ -0,0 +1,215 @@
+# segmentation.py
+import argparse
+import logging
+import time
+
+import numpy as np
+import pandas as pd
+from sklearn.cluster import KMeans, MiniBatchKMeans
+from sklearn.metrics import adjusted_rand_score, silhouette_score
+from sklearn.preprocessing import StandardScaler
+
+from models import SEGMENTATION_FEATURES
+
+logger = logging.getLogger(__name__)
+
+SEGMENT_CHUNK_ROWS = 100_000
+
+def segment_analysis(df, segments):
+    """Per-segment size, conversion, averages and top-3 products in one groupby pass"""
+    segments = np.asarray(segments)
+    columns = ['ProdTaken', 'Age', 'MonthlyIncome', 'PitchSatisfactionScore']
+    stats = df[columns].astype(np.float64).groupby(segments).agg(
+        size=('ProdTaken', 'size'),
+        conversion_rate=('ProdTaken', 'mean'),
+        avg_age=('Age', 'mean'),
+        avg_income=('MonthlyIncome', 'mean'),
+        avg_satisfaction=('PitchSatisfactionScore', 'mean')
+    )
+
+    product_counts = df.groupby([segments, df['ProductPitched']], observed=True).size()
+    top_products = product_counts.sort_values(ascending=False, kind='stable').groupby(level=0).head(3)
+    popular = {}
+    for (segment, product), count in top_products.items():
+        popular.setdefault(segment, {})[product] = int(count)
+
+    return {
+        f'Segment_{segment}': {
+            'size': int(row['size']),
+            'conversion_rate': float(row['conversion_rate']),
+            'avg_age': float(row['avg_age']),
+            'avg_income': float(row['avg_income']),
+            'avg_satisfaction': float(row['avg_satisfaction']),
+            'popular_products': popular.get(segment, {})
+        }
+        for segment, row in stats.iterrows()
+    }
+
+class MiniBatchSegmenter:
+    """Streaming k-means segmentation for large customer frames.
+
+    The scaler and MiniBatchKMeans are fitted with partial_fit over row
+    chunks, so the standardized matrix never exists in full. With
+    n_clusters=None, k is chosen by silhouette score on a random sample.
+    Exposes `scaler` and `model` like the full KMeans path, so
+    build_segmentation_artifact and predict() work unchanged.
+    """
+
+    def __init__(self, n_clusters=None, k_candidates=range(3, 9), batch_size=4096, n_passes=1,
+                 silhouette_sample=5_000, chunk_rows=SEGMENT_CHUNK_ROWS, features=SEGMENTATION_FEATURES,
+                 random_state=42):
+        self.n_clusters = n_clusters
+        self.k_candidates = list(k_candidates)
+        self.batch_size = batch_size
+        self.n_passes = n_passes
+        self.silhouette_sample = silhouette_sample
+        self.chunk_rows = chunk_rows
+        self.features = list(features)
+        self.random_state = random_state
+        self.scaler = StandardScaler()
+        self.model = None
+        self.medians = None
+        self.silhouette_scores = {}
+        self.fit_seconds = {}
+
+    def _chunks(self, df):
+        """Median-filled float64 feature chunks, in row order"""
+        for start in range(0, len(df), self.chunk_rows):
+            chunk = df[self.features].iloc[start:start + self.chunk_rows].to_numpy(dtype=np.float64)
+            missing = np.isnan(chunk)
+            if missing.any():
+                chunk[missing] = np.take(self.medians, np.nonzero(missing)[1])
+            yield chunk
+
+    def _sample(self, df, rng):
+        rows = np.sort(rng.choice(len(df), size=min(len(df), self.silhouette_sample), replace=False))
+        sample = df[self.features].iloc[rows].to_numpy(dtype=np.float64)
+        missing = np.isnan(sample)
+        sample[missing] = np.take(self.medians, np.nonzero(missing)[1])
+        return self.scaler.transform(sample)
+
+    def choose_k(self, sample):
+        """k with the best silhouette score on the (already scaled) sample"""
+        scores = {}
+        for k in self.k_candidates:
+            labels = MiniBatchKMeans(
+                n_clusters=k, batch_size=self.batch_size, n_init=3, random_state=self.random_state
+            ).fit_predict(sample)
+            scores[k] = float(silhouette_score(sample, labels))
+        self.silhouette_scores = scores
+        best = max(scores, key=lambda k: (scores[k], -k))
+        logger.info(f"Silhouette scores {', '.join(f'k={k}: {s:.3f}' for k, s in scores.items())}; chose k={best}")
+        return best
+
+    def fit(self, df):
+        rng = np.random.default_rng(self.random_state)
+        start = time.perf_counter()
+        self.medians = df[self.features].median().to_numpy(dtype=np.float64)
+        for chunk in self._chunks(df):
+            self.scaler.partial_fit(chunk)
+        self.fit_seconds['scaler'] = time.perf_counter() - start
+
+        start = time.perf_counter()
+        sample = self._sample(df, rng)
+        if self.n_clusters is None:
+            self.n_clusters = self.choose_k(sample)
+        self.fit_seconds['choose_k'] = time.perf_counter() - start
+
+        start = time.perf_counter()
+        self.model = MiniBatchKMeans(
+            n_clusters=self.n_clusters, batch_size=self.batch_size, n_init=3, random_state=self.random_state
+        )
+        # Seed the centroids from the random sample rather than the first rows of the file
+        self.model.partial_fit(sample)
+        for _ in range(self.n_passes):
+            for chunk in self._chunks(df):
+                chunk = self.scaler.transform(chunk)[rng.permutation(len(chunk))]
+                for batch_start in range(0, len(chunk), self.batch_size):
+                    self.model.partial_fit(chunk[batch_start:batch_start + self.batch_size])
+        self.fit_seconds['kmeans'] = time.perf_counter() - start
+        logger.info(f"MiniBatch segmentation fitted: k={self.n_clusters}, {len(df)} rows, "
+                    f"{self.n_passes} passes in {self.fit_seconds['kmeans']:.2f}s")
+        return self
+
+    def predict(self, df):
+        return np.concatenate([
+            self.model.predict(self.scaler.transform(chunk)) for chunk in self._chunks(df)
+        ]) if len(df) else np.empty(0, dtype=np.int32)
+
+    def fit_predict(self, df):
+        return self.fit(df).predict(df)
+
+    @property
+    def cluster_centers_(self):
+        return self.model.cluster_centers_
+
+def make_synthetic_customers(n_rows, source_csv='tour_package.csv', random_state=42):
+    """Resample real rows with small jitter on the continuous features"""
+    rng = np.random.default_rng(random_state)
+    source = pd.read_csv(source_csv).dropna(subset=['ProdTaken'])
+    rows = rng.integers(0, len(source), size=n_rows)
+    columns = SEGMENTATION_FEATURES + ['ProdTaken', 'ProductPitched']
+    df = source[columns].iloc[rows].reset_index(drop=True)
+    df['Age'] = (df['Age'] + rng.normal(0, 2, n_rows)).round()
+    df['MonthlyIncome'] = (df['MonthlyIncome'] * rng.normal(1, 0.05, n_rows)).round()
+    return df
+
+def benchmark_segmentation(n_rows=1_000_000, n_clusters=5, random_state=42):
+    """Full-batch KMeans vs MiniBatchSegmenter on the same synthetic frame"""
+    df = make_synthetic_customers(n_rows, random_state=random_state)
+    results = {'rows': n_rows}
+
+    start = time.perf_counter()
+    X = df[SEGMENTATION_FEATURES].astype(np.float64)
+    X_scaled = StandardScaler().fit_transform(X.fillna(X.median()))
+    full = KMeans(n_clusters=n_clusters, random_state=random_state).fit(X_scaled)
+    results['kmeans'] = {'seconds': round(time.perf_counter() - start, 2), 'inertia': float(full.inertia_)}
+
+    start = time.perf_counter()
+    segmenter = MiniBatchSegmenter(n_clusters=n_clusters, random_state=random_state)
+    labels = segmenter.fit_predict(df)
+    seconds = time.perf_counter() - start
+    # Inertia of the mini-batch centroids measured on the full data, comparable to KMeans
+    inertia = float(-segmenter.model.score(X_scaled))
+    results['minibatch'] = {
+        'seconds': round(seconds, 2),
+        'inertia': inertia,
+        'inertia_ratio': round(inertia / full.inertia_, 4),
+        'adjusted_rand_vs_kmeans': round(float(adjusted_rand_score(full.labels_, labels)), 4)
+    }
+
+    start = time.perf_counter()
+    auto = MiniBatchSegmenter(random_state=random_state).fit(df)
+    results['minibatch_auto_k'] = {
+        'seconds': round(time.perf_counter() - start, 2),
+        'choose_k_seconds': round(auto.fit_seconds['choose_k'], 2),
+        'n_clusters': auto.n_clusters,
+        'silhouette_scores': auto.silhouette_scores
+    }
+
+    start = time.perf_counter()
+    segment_analysis(df, labels)
+    results['analysis_seconds'] = round(time.perf_counter() - start, 2)
+    return results
+
+def main():
+    """Benchmark: python segmentation.py [--rows 1000000]"""
+    parser = argparse.ArgumentParser(description="Compare full KMeans with mini-batch segmentation")
+    parser.add_argument('--rows', type=int, default=1_000_000)
+    parser.add_argument('--clusters', type=int, default=5)
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    results = benchmark_segmentation(args.rows, args.clusters)
+    print(f"Rows: {results['rows']}")
+    print(f"KMeans:          {results['kmeans']['seconds']:6.2f}s  inertia {results['kmeans']['inertia']:.0f}")
+    minibatch = results['minibatch']
+    print(f"MiniBatch:       {minibatch['seconds']:6.2f}s  inertia {minibatch['inertia']:.0f} "
+          f"({minibatch['inertia_ratio']:.3f}x), ARI vs KMeans {minibatch['adjusted_rand_vs_kmeans']:.3f}")
+    auto = results['minibatch_auto_k']
+    print(f"MiniBatch auto k: {auto['seconds']:5.2f}s  (k selection {auto['choose_k_seconds']:.2f}s) "
+          f"-> k={auto['n_clusters']}")
+    print(f"Segment analysis: {results['analysis_seconds']:.2f}s")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,183 @@
+# similarity_index.py
+import numpy as np
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+def _normalize(X):
+    """Row-normalize to unit length as float32 so cosine similarity is a dot product"""
+    X = np.asarray(X, dtype=np.float32)
+    if X.ndim == 1:
+        X = X.reshape(1, -1)
+    norms = np.linalg.norm(X, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return X / norms
+
+def _top_k(similarities, k):
+    """Indices of the k largest similarities per row, best first"""
+    k = min(k, similarities.shape[1])
+    if k == similarities.shape[1]:
+        part = np.broadcast_to(np.arange(k), similarities.shape[:1] + (k,))
+    else:
+        part = np.argpartition(-similarities, k - 1, axis=1)[:, :k]
+    part_sims = np.take_along_axis(similarities, part, axis=1)
+    order = np.argsort(-part_sims, axis=1, kind='stable')
+    return np.take_along_axis(part, order, axis=1)
+
+class ExactCosineIndex:
+    """Brute-force cosine search; drop-in for NearestNeighbors(metric='cosine')"""
+
+    def __init__(self, n_neighbors=10, chunk_size=65536):
+        self.n_neighbors = n_neighbors
+        self.chunk_size = chunk_size
+        self.vectors = None
+
+    def fit(self, X):
+        self.vectors = _normalize(X)
+        return self
+
+    def kneighbors(self, X, n_neighbors=None):
+        k = min(n_neighbors or self.n_neighbors, len(self.vectors))
+        Q = _normalize(X)
+        distances = np.empty((len(Q), k), dtype=np.float64)
+        indices = np.empty((len(Q), k), dtype=np.int64)
+        for start in range(0, len(Q), self.chunk_size):
+            sims = Q[start:start + self.chunk_size] @ self.vectors.T
+            top = _top_k(sims, k)
+            indices[start:start + len(top)] = top
+            distances[start:start + len(top)] = 1.0 - np.take_along_axis(sims, top, axis=1)
+        return distances, indices
+
+class IVFCosineIndex:
+    """Inverted-file approximate cosine search over unit-length float32 vectors.
+
+    A spherical k-means coarse quantizer splits the data into `n_lists`
+    cells; a query scans only the `n_probe` cells whose centroids are most
+    similar to it. Raising `n_probe` trades latency for recall
+    (n_probe == n_lists is exact search).
+    """
+
+    def __init__(self, n_neighbors=10, n_lists=None, n_probe=8, train_iterations=10,
+                 max_train_points=262144, random_state=42):
+        self.n_neighbors = n_neighbors
+        self.n_lists = n_lists
+        self.n_probe = n_probe
+        self.train_iterations = train_iterations
+        self.max_train_points = max_train_points
+        self.random_state = random_state
+        self.centroids = None
+        self.vectors = None
+        self.ids = None
+        self.list_offsets = None
+
+    def _assign(self, X, batch_size=65536):
+        labels = np.empty(len(X), dtype=np.int32)
+        for start in range(0, len(X), batch_size):
+            labels[start:start + batch_size] = (X[start:start + batch_size] @ self.centroids.T).argmax(axis=1)
+        return labels
+
+    def fit(self, X):
+        Xn = _normalize(X)
+        n = len(Xn)
+        n_lists = self.n_lists or max(1, int(np.sqrt(n)))
+        n_lists = min(n_lists, n)
+        rng = np.random.default_rng(self.random_state)
+
+        # Spherical k-means on a sample
+        sample = Xn[rng.choice(n, size=min(n, self.max_train_points), replace=False)]
+        self.centroids = sample[rng.choice(len(sample), size=n_lists, replace=False)].copy()
+        for _ in range(self.train_iterations):
+            labels = self._assign(sample)
+            sums = np.zeros_like(self.centroids)
+            np.add.at(sums, labels, sample)
+            empty = np.bincount(labels, minlength=n_lists) == 0
+            # Re-seed empty cells with random points so every list is used
+            sums[empty] = sample[rng.choice(len(sample), size=int(empty.sum()))]
+            self.centroids = _normalize(sums)
+
+        # Store vectors grouped by cell so each probe is one contiguous slice
+        labels = self._assign(Xn)
+        order = np.argsort(labels, kind='stable')
+        self.vectors = Xn[order]
+        self.ids = order.astype(np.int64)
+        self.list_offsets = np.concatenate(([0], np.cumsum(np.bincount(labels, minlength=n_lists))))
+        self.n_lists = n_lists
+        return self
+
+    def kneighbors(self, X, n_neighbors=None, n_probe=None):
+        k = min(n_neighbors or self.n_neighbors, len(self.vectors))
+        n_probe = min(n_probe or self.n_probe, self.n_lists)
+        Q = _normalize(X)
+        list_order = np.argsort(-(Q @ self.centroids.T), axis=1)
+        sizes = np.diff(self.list_offsets)
+
+        distances = np.empty((len(Q), k), dtype=np.float64)
+        indices = np.empty((len(Q), k), dtype=np.int64)
+        for qi, q in enumerate(Q):
+            # Probe at least n_probe cells, and more if they hold fewer than k points
+            probe_count = n_probe
+            while probe_count < self.n_lists and sizes[list_order[qi, :probe_count]].sum() < k:
+                probe_count += 1
+            cells = list_order[qi, :probe_count]
+            rows = np.concatenate([
+                np.arange(self.list_offsets[c], self.list_offsets[c + 1]) for c in cells
+            ])
+            sims = (self.vectors[rows] @ q)[None, :]
+            top = _top_k(sims, k)[0]
+            indices[qi] = self.ids[rows[top]]
+            distances[qi] = 1.0 - sims[0, top]
+        return distances, indices
+
+def make_similarity_index(kind='exact', n_neighbors=10, **kwargs):
+    """Factory for the similarity index used by TourPackageRecommendationEngine"""
+    if kind == 'exact':
+        return ExactCosineIndex(n_neighbors=n_neighbors, **kwargs)
+    if kind == 'ivf':
+        return IVFCosineIndex(n_neighbors=n_neighbors, **kwargs)
+    raise ValueError(f"Unknown similarity index: {kind}")
+
+def make_synthetic_profiles(n, dim=23, n_clusters=50, random_state=0):
+    """Clustered Gaussian vectors shaped like scaled customer feature rows"""
+    rng = np.random.default_rng(random_state)
+    centers = rng.normal(0, 1.0, size=(n_clusters, dim)).astype(np.float32)
+    labels = rng.integers(0, n_clusters, size=n)
+    return centers[labels] + rng.normal(0, 0.5, size=(n, dim)).astype(np.float32)
+
+def benchmark_similarity_indexes(sizes=(10_000, 100_000, 1_000_000), n_queries=200, k=10,
+                                 probes=(1, 4, 8, 16, 32)):
+    """Compare IVF recall/latency against exact search on synthetic profiles"""
+    results = []
+    for n in sizes:
+        data = make_synthetic_profiles(n)
+        queries = make_synthetic_profiles(n_queries, random_state=1)
+
+        exact = ExactCosineIndex(n_neighbors=k).fit(data)
+        start = time.perf_counter()
+        truth = np.vstack([exact.kneighbors(q)[1] for q in queries])
+        exact_ms = (time.perf_counter() - start) / n_queries * 1000
+
+        start = time.perf_counter()
+        ivf = IVFCosineIndex(n_neighbors=k).fit(data)
+        build_s = time.perf_counter() - start
+
+        for n_probe in probes:
+            if n_probe > ivf.n_lists:
+                continue
+            start = time.perf_counter()
+            found = np.vstack([ivf.kneighbors(q, n_probe=n_probe)[1] for q in queries])
+            ivf_ms = (time.perf_counter() - start) / n_queries * 1000
+            recall = np.mean([len(set(a) & set(b)) / k for a, b in zip(found, truth)])
+            results.append({
+                'n': n, 'n_lists': ivf.n_lists, 'n_probe': n_probe,
+                'recall_at_k': round(float(recall), 4),
+                'exact_ms': round(exact_ms, 3), 'ivf_ms': round(ivf_ms, 3),
+                'speedup': round(exact_ms / ivf_ms, 1), 'ivf_build_s': round(build_s, 2)
+            })
+            print(f"n={n:>9,} lists={ivf.n_lists:>5} probe={n_probe:>3} "
+                  f"recall@{k}={recall:.3f} exact={exact_ms:.3f}ms ivf={ivf_ms:.3f}ms "
+                  f"speedup={exact_ms / ivf_ms:.1f}x build={build_s:.1f}s")
+    return results
+
+if __name__ == "__main__":
+    benchmark_similarity_indexes()
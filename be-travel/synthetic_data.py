@@ -0,0 +1,598 @@
+# synthetic_data.py
+import argparse
+import hashlib
+import json
+import logging
+import os
+import time
+from datetime import date
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# Rows per generated block. Every block draws from its own random stream,
+# keyed by (seed, table, block), so output depends only on the seed, the base
+# date and the row counts - not on the writer or how the rows are batched.
+BLOCK_ROWS = 100_000
+DB_BATCH_ROWS = 5_000
+FIRST_CUSTOMER_ID = 200000
+
+TABLE_STREAMS = {
+    'customers': 1, 'users': 2, 'tours': 3, 'guides': 4,
+    'bookings': 5, 'guide_requests': 6, 'custom_tour_requests': 7
+}
+# Insert order respects the foreign keys created in init_db
+DB_TABLES = ['users', 'tours', 'guides', 'bookings', 'guide_requests', 'custom_tour_requests']
+
+# Every synthetic user can log in with this password, so no admins are generated
+SYNTHETIC_PASSWORD = 'synthetic-pass'
+
+# The app's own database (app.config['MYSQL_DB']); writing there needs an explicit opt-in
+APP_DATABASE = 'tour_system'
+
+CUSTOMER_COLUMNS = [
+    'CustomerID', 'ProdTaken', 'Age', 'TypeofContact', 'CityTier', 'DurationOfPitch', 'Occupation',
+    'Gender', 'NumberOfPersonVisiting', 'NumberOfFollowups', 'ProductPitched', 'PreferredPropertyStar',
+    'MaritalStatus', 'NumberOfTrips', 'Passport', 'PitchSatisfactionScore', 'OwnCar',
+    'NumberOfChildrenVisiting', 'Designation', 'MonthlyIncome'
+]
+# Drawn from their empirical distribution within each ProductPitched group;
+# Designation is fixed by the product and ProdTaken by product and passport
+SAMPLED_COLUMNS = [
+    'Age', 'TypeofContact', 'CityTier', 'DurationOfPitch', 'Occupation', 'Gender',
+    'NumberOfPersonVisiting', 'NumberOfFollowups', 'PreferredPropertyStar', 'MaritalStatus',
+    'NumberOfTrips', 'Passport', 'PitchSatisfactionScore', 'OwnCar', 'NumberOfChildrenVisiting',
+    'MonthlyIncome'
+]
+STRING_COLUMNS = ['TypeofContact', 'Occupation', 'Gender', 'MaritalStatus']
+
+# Catalogue vocabulary, following the seed endpoints and the custom tour page
+TOUR_TYPES = {'Beach': 4, 'Cultural': 3, 'Hill Country': 2, 'Wildlife': 1, 'Heritage': 1, 'Nature': 1}
+TOUR_IMAGES = {
+    'Beach': '/images/mirrisa1.jpg', 'Cultural': '/images/kandy1.jpg', 'Hill Country': '/images/tea1.jpg',
+    'Wildlife': '/images/safari.jpg', 'Heritage': '/images/galle.jpg', 'Nature': '/images/yala.webp'
+}
+DESTINATIONS = [
+    'Sigiriya Rock Fortress', 'Ella Rock & Nine Arch Bridge', 'Mirissa Beach', 'Kandy Temple of the Tooth',
+    'Yala National Park', 'Nuwara Eliya Tea Country', 'Galle Dutch Fort', 'Arugam Bay',
+    'Anuradhapura Ancient City', 'Trincomalee', 'Jaffna Peninsula', 'Sinharaja Rainforest',
+    'Polonnaruwa Ancient City', 'Unawatuna Bay', 'Dambulla Cave Temple'
+]
+GUIDE_SPECIALTIES = [
+    'Cultural Heritage Tours', 'Wildlife & Nature Tours', 'Tea Country & Hill Station Tours',
+    'Coastal & Adventure Tours', 'Culinary & Village Tours', 'Adventure & Pilgrimage Tours'
+]
+GUIDE_IMAGES = [
+    '/images/guide1.webp', '/images/guide7.jpg', '/images/guide12.webp',
+    '/images/guide14.webp', '/images/guide5.webp', '/images/guide8.jpeg'
+]
+EXTRA_LANGUAGES = ['German', 'French', 'Japanese', 'Hindi', 'Chinese', 'Russian']
+FIRST_NAMES = [
+    'Chaminda', 'Nimal', 'Priya', 'Ruwan', 'Kumari', 'Mahinda', 'Anjali', 'Kasun', 'Dilani', 'Tharindu',
+    'Sanjeewa', 'Ishara', 'Lahiru', 'Nadeesha', 'Arjun', 'Emma', 'Liam', 'Sophie', 'Lukas', 'Yuki'
+]
+LAST_NAMES = [
+    'Perera', 'Fernando', 'Wickramasinghe', 'Jayasuriya', 'Silva', 'Rathnayake', 'Bandara', 'Dissanayake',
+    'Gunawardena', 'Herath', 'Kumar', 'Smith', 'Muller', 'Martin', 'Tanaka', 'Brown'
+]
+
+# Package options of the booking page: (weight, per-person surcharge)
+PACKAGE_TYPES = {'standard': (0.55, 100), 'premium': (0.3, 200), 'deluxe': (0.15, 350)}
+BOOKING_STATUSES = {'pending': 0.3, 'confirmed': 0.6, 'cancelled': 0.1}
+GUIDE_REQUEST_STATUSES = {'pending': 0.45, 'contacted': 0.3, 'confirmed': 0.2, 'cancelled': 0.05}
+CUSTOM_TOUR_STATUSES = {'pending': 0.4, 'reviewed': 0.2, 'quoted': 0.2, 'confirmed': 0.15, 'cancelled': 0.05}
+BUDGET_MULTIPLIERS = {'low': 0.8, 'medium': 1.0, 'high': 1.3, 'luxury': 1.6}
+BUDGET_WEIGHTS = [0.2, 0.45, 0.25, 0.1]
+SPECIAL_REQUESTS = [
+    'Vegetarian meals please', 'Travelling with an infant', 'Wheelchair access needed',
+    'Early morning pickup', 'Honeymoon trip', 'Prefer an English speaking guide'
+]
+USER_ROLES = {'customer': 0.985, 'guide': 0.015}
+
+def _weights(mapping):
+    keys = list(mapping)
+    weights = np.array([mapping[key] for key in keys], dtype=np.float64)
+    return np.array(keys, dtype=object), weights / weights.sum()
+
+def _empirical(series):
+    """(values, probabilities) of a column, missing values included"""
+    counts = series.value_counts(normalize=True, dropna=False, sort=False).sort_index(na_position='last')
+    values = counts.index.to_numpy(dtype=object if series.dtype == object or pd.api.types.is_string_dtype(series)
+                                   else np.float64, na_value=np.nan)
+    return values, counts.to_numpy(dtype=np.float64)
+
+def _destination_sets():
+    """JSON id and name lists for every subset of DESTINATIONS, indexed by bitmask"""
+    selected, names = [], []
+    for mask in range(1 << len(DESTINATIONS)):
+        members = [i for i in range(len(DESTINATIONS)) if mask >> i & 1]
+        selected.append(json.dumps([i + 1 for i in members]))
+        names.append(json.dumps([DESTINATIONS[i] for i in members]))
+    return np.array(selected, dtype=object), np.array(names, dtype=object)
+
+def password_hash(password=SYNTHETIC_PASSWORD):
+    """Werkzeug-compatible pbkdf2 hash with a fixed salt, so output is reproducible"""
+    salt = 'synthetic'
+    iterations = 600000
+    digest = hashlib.pbkdf2_hmac('sha256', password.encode('utf-8'), salt.encode('utf-8'), iterations).hex()
+    return f"pbkdf2:sha256:{iterations}${salt}${digest}"
+
+def fit_customer_profile(source_csv='tour_package.csv'):
+    """Per-product empirical column distributions of the customer pitch export"""
+    source = pd.read_csv(source_csv).dropna(subset=['ProdTaken', 'ProductPitched'])
+    products, product_weights = _empirical(source['ProductPitched'])
+    groups = {}
+    for product in products:
+        group = source[source['ProductPitched'] == product]
+        conversion = group.groupby('Passport')['ProdTaken'].mean()
+        groups[product] = {
+            'columns': {column: _empirical(group[column]) for column in SAMPLED_COLUMNS},
+            'designation': group['Designation'].mode().iloc[0],
+            'conversion': [float(conversion.get(passport, group['ProdTaken'].mean())) for passport in (0, 1)]
+        }
+    return {
+        'rows': len(source),
+        'products': (products, product_weights),
+        'groups': groups,
+        'columns': {column: _empirical(source[column]) for column in SAMPLED_COLUMNS}
+    }
+
+class SyntheticDataGenerator:
+    """Seeded generator for the customer export and the init_db tables.
+
+    Each table method yields DataFrames of at most BLOCK_ROWS rows with an
+    explicit id column, so the same blocks can be appended to CSV files or
+    bulk inserted. Foreign keys are passed in (id ranges, or the generated
+    tours and guides), so bookings and requests always point at real rows.
+    """
+
+    def __init__(self, seed=42, source_csv='tour_package.csv', base_date=None):
+        self.seed = seed
+        self.base_date = np.datetime64(base_date or date.today(), 'D')
+        self.profile = fit_customer_profile(source_csv)
+        self._password = None
+
+    def _blocks(self, table, n_rows, start_id):
+        for block, offset in enumerate(range(0, n_rows, BLOCK_ROWS)):
+            size = min(BLOCK_ROWS, n_rows - offset)
+            rng = np.random.default_rng([self.seed, TABLE_STREAMS[table], block])
+            yield rng, np.arange(start_id + offset, start_id + offset + size, dtype=np.int64)
+
+    def _marginal(self, rng, column, size):
+        values, weights = self.profile['columns'][column]
+        return rng.choice(values, size=size, p=weights)
+
+    def _dates(self, rng, size, low, high):
+        return (self.base_date + rng.integers(low, high, size)).astype(str)
+
+    @staticmethod
+    def _pick(rng, mapping, size):
+        keys, weights = _weights(mapping)
+        return rng.choice(keys, size=size, p=weights)
+
+    @staticmethod
+    def _names(rng, size):
+        first = np.array(FIRST_NAMES, dtype=object)[rng.integers(0, len(FIRST_NAMES), size)]
+        last = np.array(LAST_NAMES, dtype=object)[rng.integers(0, len(LAST_NAMES), size)]
+        return first + ' ' + last
+
+    @staticmethod
+    def _phones(rng, size):
+        digits = rng.integers(0, 10, size)
+        numbers = rng.integers(0, 10_000_000, size)
+        return [f"+94 7{d} {n // 10000:03d} {n % 10000:04d}" for d, n in zip(digits, numbers)]
+
+    def _sample_customers(self, rng, size):
+        """Customer attributes with the per-product distributions of the source file"""
+        products, product_weights = self.profile['products']
+        product = rng.choice(products, size=size, p=product_weights)
+        data = {column: np.empty(size, dtype=object if column in STRING_COLUMNS else np.float64)
+                for column in SAMPLED_COLUMNS}
+        data['Designation'] = np.empty(size, dtype=object)
+        data['ProdTaken'] = np.empty(size, dtype=np.int64)
+        data['conversion'] = np.empty(size, dtype=np.float64)
+        for name, group in self.profile['groups'].items():
+            rows = np.flatnonzero(product == name)
+            for column in SAMPLED_COLUMNS:
+                values, weights = group['columns'][column]
+                data[column][rows] = rng.choice(values, size=len(rows), p=weights)
+            data['Designation'][rows] = group['designation']
+            conversion = np.asarray(group['conversion'])[data['Passport'][rows].astype(np.int64)]
+            data['conversion'][rows] = conversion
+            data['ProdTaken'][rows] = rng.random(len(rows)) < conversion
+        data['ProductPitched'] = product
+
+        # Jitter the continuous columns so millions of rows aren't 4,888 repeated values
+        data['Age'] = np.clip(data['Age'] + rng.integers(-2, 3, size), 18, 61)
+        data['MonthlyIncome'] = np.round(data['MonthlyIncome'] * rng.normal(1, 0.03, size))
+        return data
+
+    def customers(self, n_rows, start_id=FIRST_CUSTOMER_ID):
+        """Rows in the tour_package.csv format"""
+        for rng, ids in self._blocks('customers', n_rows, start_id):
+            data = self._sample_customers(rng, len(ids))
+            data['CustomerID'] = ids
+            # Whole numbers with gaps, written like the source file (41, not 41.0)
+            yield pd.DataFrame({
+                column: data[column] if column in STRING_COLUMNS + ['CustomerID', 'ProductPitched', 'Designation']
+                else pd.array(data[column], dtype='Int64')
+                for column in CUSTOMER_COLUMNS
+            })
+
+    def users(self, n_rows, start_id=1):
+        if self._password is None:
+            self._password = password_hash()
+        for rng, ids in self._blocks('users', n_rows, start_id):
+            data = self._sample_customers(rng, len(ids))
+            names = pd.Series(ids).astype(str)
+            yield pd.DataFrame({
+                'id': ids,
+                'username': ('synthetic' + names).to_numpy(),
+                'email': ('synthetic' + names + '@example.com').to_numpy(),
+                'password': self._password,
+                'role': self._pick(rng, USER_ROLES, len(ids)),
+                'age': pd.array(data['Age'], dtype='Int64'),
+                'city_tier': data['CityTier'].astype(np.int64),
+                'monthly_income': pd.array(data['MonthlyIncome'], dtype='Int64'),
+                'occupation': data['Occupation'],
+                'gender': np.where(data['Gender'] == 'Fe Male', 'Female', data['Gender']),
+                'marital_status': data['MaritalStatus'],
+                'owns_car': data['OwnCar'].astype(np.int64),
+                'has_passport': data['Passport'].astype(np.int64),
+                'number_of_trips': np.nan_to_num(data['NumberOfTrips']).astype(np.int64),
+                'customer_segment': None,
+                'purchase_probability': np.round(data['conversion'], 4)
+            })
+
+    def tours(self, n_rows, start_id=1):
+        for rng, ids in self._blocks('tours', n_rows, start_id):
+            tour_type = self._pick(rng, TOUR_TYPES, len(ids))
+            destination = np.array(DESTINATIONS, dtype=object)[rng.integers(0, len(DESTINATIONS), len(ids))]
+            duration = rng.integers(3, 9, len(ids))
+            yield pd.DataFrame({
+                'id': ids,
+                'name': destination + ' ' + tour_type + ' Tour',
+                'description': [f"{days}-day {kind.lower()} tour around {place}"
+                                for days, kind, place in zip(duration, tour_type, destination)],
+                'price': rng.integers(48, 121, len(ids)) * 10.0,
+                'duration_days': duration,
+                'tour_type': tour_type,
+                'image_url': [TOUR_IMAGES[kind] for kind in tour_type]
+            })
+
+    def guides(self, n_rows, start_id=1):
+        for rng, ids in self._blocks('guides', n_rows, start_id):
+            size = len(ids)
+            specialty = rng.integers(0, len(GUIDE_SPECIALTIES), size)
+            years = rng.integers(3, 21, size)
+            low = rng.integers(8, 12, size) * 500
+            languages = [
+                ['Sinhala', 'Tamil', 'English'] + ([EXTRA_LANGUAGES[extra]] if extra < len(EXTRA_LANGUAGES) else [])
+                for extra in rng.integers(0, 2 * len(EXTRA_LANGUAGES), size)
+            ]
+            specialities = [
+                [DESTINATIONS[i] for i in rng.choice(len(DESTINATIONS), size=4, replace=False)] for _ in range(size)
+            ]
+            yield pd.DataFrame({
+                'id': ids,
+                'name': self._names(rng, size),
+                'specialty': np.array(GUIDE_SPECIALTIES, dtype=object)[specialty],
+                'experience': [f"{n} years" for n in years],
+                'rating': np.round(rng.uniform(4.0, 5.0, size), 1),
+                'languages': [json.dumps(value) for value in languages],
+                'image_url': np.array(GUIDE_IMAGES, dtype=object)[specialty],
+                'bio': [f"Licensed guide with {n} years of experience in {GUIDE_SPECIALTIES[s].lower()}."
+                        for n, s in zip(years, specialty)],
+                'tours_completed': years * rng.integers(20, 45, size),
+                'specialities': [json.dumps(value) for value in specialities],
+                'phone': self._phones(rng, size),
+                'email': [f"guide{guide_id}@example.com" for guide_id in ids],
+                'price_range': [f"Rs.{lo:,}-{lo + step:,}/day"
+                                for lo, step in zip(low, rng.integers(4, 8, size) * 500)]
+            })
+
+    def _customer_contact(self, rng, size, user_ids, guest_rate):
+        """user_id (None for guests), name, email and phone for a request"""
+        first_user, n_users = user_ids
+        user_id = pd.array(first_user + rng.integers(0, max(n_users, 1), size), dtype='Int64')
+        if n_users == 0:
+            guest_rate = 1.0
+        guest = rng.random(size) < guest_rate
+        user_id[guest] = pd.NA
+        emails = [
+            f"guest{n}@example.com" if is_guest else f"synthetic{u}@example.com"
+            for u, n, is_guest in zip(user_id.to_numpy(dtype=np.int64, na_value=0),
+                                      rng.integers(0, 10_000_000, size), guest)
+        ]
+        return user_id, self._names(rng, size), emails, self._phones(rng, size)
+
+    def bookings(self, n_rows, user_ids, tours, start_id=1):
+        """user_ids is (first id, count); tours the generated tours frame"""
+        tour_ids = tours['id'].to_numpy()
+        tour_prices = tours['price'].to_numpy(dtype=np.float64)
+        package_names, package_weights = _weights({key: value[0] for key, value in PACKAGE_TYPES.items()})
+        surcharge = np.array([PACKAGE_TYPES[key][1] for key in package_names], dtype=np.float64)
+        for rng, ids in self._blocks('bookings', n_rows, start_id):
+            size = len(ids)
+            user_id, names, emails, phones = self._customer_contact(rng, size, user_ids, guest_rate=0.1)
+            tour = rng.integers(0, len(tour_ids), size)
+            guests = self._marginal(rng, 'NumberOfPersonVisiting', size).astype(np.int64)
+            package = rng.choice(len(package_names), size=size, p=package_weights)
+            total = (tour_prices[tour] + surcharge[package]) * guests
+            suggested = np.round(total * rng.normal(1, 0.05, size), 2)
+            children = np.nan_to_num(self._marginal(rng, 'NumberOfChildrenVisiting', size)).astype(np.int64)
+            stars = np.nan_to_num(self._marginal(rng, 'PreferredPropertyStar', size), nan=3).astype(np.int64)
+            yield pd.DataFrame({
+                'id': ids,
+                'user_id': user_id,
+                'tour_id': tour_ids[tour],
+                'travel_date': self._dates(rng, size, -180, 365),
+                'guests': guests,
+                'total_price': total,
+                'ai_suggested_price': np.where(rng.random(size) < 0.6, suggested, np.nan),
+                'customer_name': names,
+                'customer_email': emails,
+                'customer_phone': phones,
+                'special_requests': self._special_requests(rng, size, 0.2),
+                'status': self._pick(rng, BOOKING_STATUSES, size),
+                'package_type': package_names[package],
+                'preferred_star_rating': stars,
+                'number_of_children': np.minimum(children, guests)
+            })
+
+    @staticmethod
+    def _special_requests(rng, size, rate):
+        requests = np.array(SPECIAL_REQUESTS, dtype=object)[rng.integers(0, len(SPECIAL_REQUESTS), size)]
+        return np.where(rng.random(size) < rate, requests, None)
+
+    def guide_requests(self, n_rows, guides, start_id=1):
+        guide_ids = guides['id'].to_numpy()
+        specialties = guides['specialty'].to_numpy(dtype=object)
+        for rng, ids in self._blocks('guide_requests', n_rows, start_id):
+            size = len(ids)
+            _, names, emails, phones = self._customer_contact(rng, size, (0, 0), guest_rate=1.0)
+            guide = rng.integers(0, len(guide_ids), size)
+            booking = rng.random(size) < 0.4
+            days = rng.integers(1, 8, size)
+            group = self._marginal(rng, 'NumberOfPersonVisiting', size).astype(np.int64)
+            yield pd.DataFrame({
+                'id': ids,
+                'guide_id': guide_ids[guide],
+                'request_type': np.where(booking, 'booking', 'contact'),
+                'customer_name': names,
+                'customer_email': emails,
+                'customer_phone': phones,
+                'preferred_date': np.where(booking, self._dates(rng, size, 7, 365), None),
+                'duration': np.where(booking, [f"{n} days" for n in days], ''),
+                'group_size': np.where(booking, group.astype(str), ''),
+                'tour_type': np.where(booking, specialties[guide], ''),
+                'message': [f"Hi, I'd like to plan a {n}-day trip for {g} with you." for n, g in zip(days, group)],
+                'status': self._pick(rng, GUIDE_REQUEST_STATUSES, size)
+            })
+
+    def custom_tour_requests(self, n_rows, user_ids, start_id=1):
+        budgets = np.array(list(BUDGET_MULTIPLIERS), dtype=object)
+        multipliers = np.array(list(BUDGET_MULTIPLIERS.values()))
+        selected_json, names_json = _destination_sets()
+        for rng, ids in self._blocks('custom_tour_requests', n_rows, start_id):
+            size = len(ids)
+            user_id, names, emails, phones = self._customer_contact(rng, size, user_ids, guest_rate=0.3)
+            # A random subset of 1-5 destinations, as a bitmask into the precomputed JSON lists
+            count = rng.integers(1, 6, size)
+            order = rng.random((size, len(DESTINATIONS))).argsort(axis=1)
+            masks = np.take_along_axis(np.cumsum(1 << order, axis=1), (count - 1)[:, None], axis=1)[:, 0]
+            duration = rng.integers(3, 15, size)
+            budget = rng.choice(len(budgets), size=size, p=BUDGET_WEIGHTS)
+
+            # The custom tour page's estimate, kept within Rs 4,000-10,000
+            cost = (count * 500 + duration * 400) * multipliers[budget]
+            cost = np.where(cost < 4000, 4000 + count * 200 + duration * 100, cost)
+            cost = np.where(cost > 10000, 10000 - rng.random(size) * 1000, cost)
+            travellers = self._marginal(rng, 'NumberOfPersonVisiting', size) + \
+                np.nan_to_num(self._marginal(rng, 'NumberOfChildrenVisiting', size))
+            yield pd.DataFrame({
+                'id': ids,
+                'user_id': user_id,
+                'customer_name': names,
+                'customer_email': emails,
+                'customer_phone': phones,
+                'travel_date': self._dates(rng, size, 14, 365),
+                'number_of_travelers': travellers.astype(np.int64),
+                'duration_days': duration,
+                'budget_level': budgets[budget],
+                'selected_destinations': selected_json[masks],
+                'destination_names': names_json[masks],
+                'estimated_cost': np.round(cost),
+                'special_requests': self._special_requests(rng, size, 0.3),
+                'status': self._pick(rng, CUSTOM_TOUR_STATUSES, size)
+            })
+
+class CsvWriter:
+    """Appends each table's blocks to <out_dir>/<table>.csv"""
+
+    def __init__(self, out_dir):
+        self.out_dir = out_dir
+        os.makedirs(out_dir, exist_ok=True)
+
+    def next_id(self, table):
+        return 1
+
+    def write(self, table, blocks):
+        path = os.path.join(self.out_dir, f"{table}.csv")
+        rows = 0
+        with open(path, 'w', newline='') as f:
+            for df in blocks:
+                df.to_csv(f, header=rows == 0, index=False)
+                rows += len(df)
+        return rows
+
+    def close(self):
+        pass
+
+class MySQLWriter:
+    """Bulk inserts blocks with executemany, one transaction per block.
+
+    Ids continue after the current MAX(id), so generated rows can be added
+    to a database that already has data. Tours and guides bump their
+    content version like the seed endpoints, invalidating catalogue caches.
+    """
+
+    def __init__(self, connection, batch_rows=DB_BATCH_ROWS):
+        self.connection = connection
+        self.batch_rows = batch_rows
+
+    @classmethod
+    def connect(cls, database, allow_app_database=False, **overrides):
+        """Connect to a scratch database; refuses the app's own unless allowed"""
+        if database == APP_DATABASE and not allow_app_database:
+            raise ValueError(f"Refusing to write synthetic data into the app database '{APP_DATABASE}'; "
+                             f"use a separate database or pass --allow-app-database")
+        import pymysql
+        settings = {
+            'host': os.environ.get('MYSQL_HOST', 'localhost'),
+            'user': os.environ.get('MYSQL_USER', 'root'),
+            'password': os.environ.get('MYSQL_PASSWORD', ''),
+            'database': database,
+            'charset': 'utf8mb4',
+            'cursorclass': pymysql.cursors.DictCursor
+        }
+        settings.update(overrides)
+        return cls(pymysql.connect(**settings))
+
+    def next_id(self, table):
+        with self.connection.cursor() as cur:
+            cur.execute(f"SELECT COALESCE(MAX(id), 0) + 1 AS next_id FROM {table}")
+            return int(cur.fetchone()['next_id'])
+
+    def write(self, table, blocks):
+        from http_cache import bump_content_version
+        rows = 0
+        for df in blocks:
+            columns = ', '.join(df.columns)
+            placeholders = ', '.join(['%s'] * len(df.columns))
+            sql = f"INSERT INTO {table} ({columns}) VALUES ({placeholders})"
+            values = list(df.astype(object).where(df.notna(), None).itertuples(index=False, name=None))
+            try:
+                with self.connection.cursor() as cur:
+                    for start in range(0, len(values), self.batch_rows):
+                        cur.executemany(sql, values[start:start + self.batch_rows])
+                    if table in ('tours', 'guides'):
+                        bump_content_version(cur, table)
+                self.connection.commit()
+            except Exception:
+                self.connection.rollback()
+                raise
+            rows += len(df)
+            logger.info(f"Inserted {rows} rows into {table}")
+        return rows
+
+    def close(self):
+        self.connection.close()
+
+def generate_dataset(generator, writer, customers_writer=None, customers=0, users=0, tours=12, guides=6,
+                     bookings=0, guide_requests=0, custom_tour_requests=0):
+    """Generate and write every table in foreign key order; returns per-table rows and timings"""
+    counts = {
+        'users': users, 'tours': tours, 'guides': guides, 'bookings': bookings,
+        'guide_requests': guide_requests, 'custom_tour_requests': custom_tour_requests
+    }
+    if bookings and not tours:
+        raise ValueError("Bookings need at least one tour")
+    if guide_requests and not guides:
+        raise ValueError("Guide requests need at least one guide")
+
+    results = {}
+
+    def emit(table, target, blocks):
+        start = time.perf_counter()
+        rows = target.write(table, blocks)
+        seconds = time.perf_counter() - start
+        results[table] = {'rows': rows, 'seconds': round(seconds, 2),
+                          'rows_per_second': round(rows / seconds) if seconds else None}
+        logger.info(f"{table}: {rows} rows in {seconds:.2f}s")
+
+    if customers:
+        emit('customers', customers_writer or writer, generator.customers(customers))
+
+    start_ids = {table: writer.next_id(table) for table in DB_TABLES if counts[table]}
+    if users:
+        emit('users', writer, generator.users(users, start_ids['users']))
+    user_ids = (start_ids.get('users', 1), users)
+
+    # Tours and guides are small; keep them for the foreign keys of the big tables
+    tours_df = pd.concat(generator.tours(tours, start_ids['tours'])) if tours else None
+    guides_df = pd.concat(generator.guides(guides, start_ids['guides'])) if guides else None
+    if tours:
+        emit('tours', writer, [tours_df])
+    if guides:
+        emit('guides', writer, [guides_df])
+    if bookings:
+        emit('bookings', writer, generator.bookings(bookings, user_ids, tours_df, start_ids['bookings']))
+    if guide_requests:
+        emit('guide_requests', writer, generator.guide_requests(guide_requests, guides_df,
+                                                                start_ids['guide_requests']))
+    if custom_tour_requests:
+        emit('custom_tour_requests', writer, generator.custom_tour_requests(
+            custom_tour_requests, user_ids, start_ids['custom_tour_requests']))
+    return results
+
+def main():
+    """python synthetic_data.py --seed 7 --customers 1000000 --users 1000000 --bookings 2000000 [--database NAME]"""
+    parser = argparse.ArgumentParser(description="Generate seeded synthetic data for scale and load testing")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--source', default='tour_package.csv')
+    parser.add_argument('--base-date', type=date.fromisoformat, default=None,
+                        help="Day travel dates are relative to (default today); fix it to reproduce a run")
+    parser.add_argument('--customers', type=int, default=0)
+    parser.add_argument('--users', type=int, default=0)
+    parser.add_argument('--tours', type=int, default=12)
+    parser.add_argument('--guides', type=int, default=6)
+    parser.add_argument('--bookings', type=int, default=0)
+    parser.add_argument('--guide-requests', type=int, default=0)
+    parser.add_argument('--custom-tour-requests', type=int, default=0)
+    parser.add_argument('--out-dir', default='synthetic_data',
+                        help="CSV output directory (customers always go here)")
+    parser.add_argument('--database', default=None, metavar='NAME',
+                        help="Bulk insert the init_db tables into this (scratch) database instead of writing CSVs")
+    parser.add_argument('--allow-app-database', action='store_true',
+                        help=f"Allow --database {APP_DATABASE}, the app's own database")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    generator = SyntheticDataGenerator(args.seed, args.source, args.base_date)
+    csv_writer = CsvWriter(args.out_dir)
+    if args.database:
+        try:
+            writer = MySQLWriter.connect(args.database, args.allow_app_database)
+        except ValueError as e:
+            parser.error(str(e))
+    else:
+        writer = csv_writer
+    try:
+        results = generate_dataset(
+            generator, writer, customers_writer=csv_writer,
+            customers=args.customers, users=args.users, tours=args.tours, guides=args.guides,
+            bookings=args.bookings, guide_requests=args.guide_requests,
+            custom_tour_requests=args.custom_tour_requests
+        )
+    finally:
+        writer.close()
+
+    with open(os.path.join(args.out_dir, 'manifest.json'), 'w') as f:
+        json.dump({
+            'seed': args.seed,
+            'base_date': str(generator.base_date),
+            'source_rows': generator.profile['rows'],
+            'target': f"database {args.database}" if args.database else 'csv',
+            'tables': results
+        }, f, indent=2)
+
+    print(f"Seed {args.seed}, base date {generator.base_date}")
+    for table, result in results.items():
+        print(f"{table:>22}: {result['rows']:>10} rows  {result['seconds']:7.2f}s  "
+              f"{result['rows_per_second'] or 0:>9} rows/s")
+
+if __name__ == "__main__":
+    main()
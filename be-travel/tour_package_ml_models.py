@@ -5,65 +5,85 @@ from sklearn.ensemble import RandomForestClassifier, RandomForestRegressor
 from sklearn.model_selection import train_test_split
 from sklearn.preprocessing import StandardScaler, LabelEncoder
 from sklearn.metrics import accuracy_score, classification_report
-from sklearn.neighbors import NearestNeighbors
 import joblib
 import logging
 from datetime import datetime
 import warnings
+
+from preprocessing_cache import PreprocessingCache
+from segmentation import MiniBatchSegmenter, segment_analysis as build_segment_analysis
+from similarity_index import make_similarity_index
 warnings.filterwarnings('ignore')
 
 logger = logging.getLogger(__name__)
 
 class TourPackageRecommendationEngine:
-    def __init__(self):
+    def __init__(self, similarity_index='exact', **index_params):
+        """similarity_index: 'exact' (brute-force cosine) or 'ivf' (approximate;
+        pass n_lists/n_probe to trade recall for latency on large datasets)"""
         self.recommendation_model = RandomForestClassifier(n_estimators=100, random_state=42)
-        self.similarity_model = NearestNeighbors(n_neighbors=10, metric='cosine')
+        self.similarity_model = make_similarity_index(similarity_index, n_neighbors=10, **index_params)
         self.scaler = StandardScaler()
         self.label_encoders = {}
         self.is_trained = False
         self.feature_columns = []
         self.customer_profiles = None
+        self.product_names = None
+        self.product_codes = None
+        self.prod_taken = None
+        
+    @staticmethod
+    def preprocess_tour_package_csv(csv_path):
+        """Parse and preprocess the dataset; returns (df, {'label_encoders': ...})"""
+        df = pd.read_csv(csv_path)
+        label_encoders = {}
+        
+        # Basic data cleaning
+        df = df.dropna(subset=['CustomerID', 'ProdTaken'])
+        
+        # Convert categorical variables
+        categorical_columns = ['TypeofContact', 'Occupation', 'Gender', 
+                             'ProductPitched', 'MaritalStatus', 'Designation']
+        
+        for col in categorical_columns:
+            if col in df.columns:
+                label_encoders[col] = LabelEncoder()
+                df[f'{col}_encoded'] = label_encoders[col].fit_transform(df[col].fillna('Unknown'))
+        
+        # Feature engineering
+        df['Age_Group'] = pd.cut(df['Age'], bins=[0, 30, 45, 60, 100], 
+                               labels=['Young', 'Middle', 'Senior', 'Elder'])
+        df['Age_Group_encoded'] = LabelEncoder().fit_transform(df['Age_Group'])
+        
+        df['Income_Group'] = pd.cut(df['MonthlyIncome'], 
+                                  bins=[0, 20000, 50000, 100000, float('inf')],
+                                  labels=['Low', 'Medium', 'High', 'Premium'])
+        df['Income_Group_encoded'] = LabelEncoder().fit_transform(df['Income_Group'].fillna('Low'))
+        
+        # Family size calculation
+        df['Family_Size'] = df['NumberOfPersonVisiting'] + df['NumberOfChildrenVisiting'].fillna(0)
         
-    def load_tour_package_data(self, csv_path):
-        """Load and preprocess tour package dataset"""
+        # Travel frequency
+        df['Travel_Frequency'] = pd.cut(df['NumberOfTrips'].fillna(0), 
+                                      bins=[-1, 0, 2, 5, float('inf')],
+                                      labels=['None', 'Occasional', 'Regular', 'Frequent'])
+        df['Travel_Frequency_encoded'] = LabelEncoder().fit_transform(df['Travel_Frequency'])
+        
+        # Satisfaction level
+        df['High_Satisfaction'] = (df['PitchSatisfactionScore'] >= 4).astype(int)
+        
+        return df, {'label_encoders': label_encoders}
+    
+    def load_tour_package_data(self, csv_path, use_cache=True):
+        """Load and preprocess tour package dataset, reusing the preprocessing cache when possible"""
         try:
-            df = pd.read_csv(csv_path)
+            df, state = PreprocessingCache(enabled=use_cache).get_or_build(
+                'tour_package_engine', csv_path,
+                TourPackageRecommendationEngine.preprocess_tour_package_csv
+            )
+            self.label_encoders = state['label_encoders']
             logger.info(f"Loaded tour package dataset: {len(df)} rows, {len(df.columns)} columns")
             
-            # Basic data cleaning
-            df = df.dropna(subset=['CustomerID', 'ProdTaken'])
-            
-            # Convert categorical variables
-            categorical_columns = ['TypeofContact', 'Occupation', 'Gender', 
-                                 'ProductPitched', 'MaritalStatus', 'Designation']
-            
-            for col in categorical_columns:
-                if col in df.columns:
-                    self.label_encoders[col] = LabelEncoder()
-                    df[f'{col}_encoded'] = self.label_encoders[col].fit_transform(df[col].fillna('Unknown'))
-            
-            # Feature engineering
-            df['Age_Group'] = pd.cut(df['Age'], bins=[0, 30, 45, 60, 100], 
-                                   labels=['Young', 'Middle', 'Senior', 'Elder'])
-            df['Age_Group_encoded'] = LabelEncoder().fit_transform(df['Age_Group'])
-            
-            df['Income_Group'] = pd.cut(df['MonthlyIncome'], 
-                                      bins=[0, 20000, 50000, 100000, float('inf')],
-                                      labels=['Low', 'Medium', 'High', 'Premium'])
-            df['Income_Group_encoded'] = LabelEncoder().fit_transform(df['Income_Group'].fillna('Low'))
-            
-            # Family size calculation
-            df['Family_Size'] = df['NumberOfPersonVisiting'] + df['NumberOfChildrenVisiting'].fillna(0)
-            
-            # Travel frequency
-            df['Travel_Frequency'] = pd.cut(df['NumberOfTrips'].fillna(0), 
-                                          bins=[-1, 0, 2, 5, float('inf')],
-                                          labels=['None', 'Occasional', 'Regular', 'Frequent'])
-            df['Travel_Frequency_encoded'] = LabelEncoder().fit_transform(df['Travel_Frequency'])
-            
-            # Satisfaction level
-            df['High_Satisfaction'] = (df['PitchSatisfactionScore'] >= 4).astype(int)
-            
             self.tour_data = df
             logger.info("Tour package data preprocessed successfully")
             return df
@@ -133,6 +153,7 @@ class TourPackageRecommendationEngine:
             
             # Store customer profiles
             self.customer_profiles = X_scaled
+            self._build_product_arrays()
             self.is_trained = True
             
             return True
@@ -141,63 +162,95 @@ class TourPackageRecommendationEngine:
             logger.error(f"Error training recommendation model: {str(e)}")
             return False
     
+    def _build_product_arrays(self):
+        """Integer-code ProductPitched/ProdTaken once so neighbour lookups avoid pandas"""
+        codes, names = pd.factorize(self.tour_data['ProductPitched'], sort=True)
+        self.product_names = np.asarray(names, dtype=object)
+        self.product_codes = codes.astype(np.int32)
+        self.prod_taken = self.tour_data['ProdTaken'].to_numpy() == 1
+
+    def _customer_feature_matrix(self, customers):
+        """Map customer feature dicts onto the training feature columns"""
+        feature_matrix = np.zeros((len(customers), len(self.feature_columns)))
+
+        # Map customer features to our feature columns
+        feature_mapping = {
+            'age': 'Age',
+            'city_tier': 'CityTier',
+            'guests': 'NumberOfPersonVisiting',
+            'children': 'NumberOfChildrenVisiting',
+            'income': 'MonthlyIncome',
+            'owns_car': 'OwnCar',
+            'has_passport': 'Passport'
+        }
+
+        for customer_key, model_key in feature_mapping.items():
+            if model_key not in self.feature_columns:
+                continue
+            idx = self.feature_columns.index(model_key)
+            for row, customer_features in enumerate(customers):
+                if customer_key in customer_features:
+                    feature_matrix[row, idx] = customer_features[customer_key]
+
+        return feature_matrix
+
     def get_customer_recommendations(self, customer_features):
         """Get recommendations for a customer based on their features"""
+        if not self.is_trained:
+            logger.warning("Model not trained")
+            return []
+
+        recommendations = self.get_customer_recommendations_batch([customer_features])
+        return recommendations[0] if recommendations else {}
+
+    def get_customer_recommendations_batch(self, customers, top_products=5):
+        """Recommendations for many customers with one predict_proba/kneighbors call"""
         try:
             if not self.is_trained:
                 logger.warning("Model not trained")
                 return []
-            
-            # Convert customer features to the expected format
-            feature_vector = np.zeros(len(self.feature_columns))
-            
-            # Map customer features to our feature columns
-            feature_mapping = {
-                'age': 'Age',
-                'city_tier': 'CityTier', 
-                'guests': 'NumberOfPersonVisiting',
-                'children': 'NumberOfChildrenVisiting',
-                'income': 'MonthlyIncome',
-                'owns_car': 'OwnCar',
-                'has_passport': 'Passport'
-            }
-            
-            for customer_key, model_key in feature_mapping.items():
-                if customer_key in customer_features and model_key in self.feature_columns:
-                    idx = self.feature_columns.index(model_key)
-                    feature_vector[idx] = customer_features[customer_key]
-            
+            if not customers:
+                return []
+            if getattr(self, 'product_codes', None) is None:
+                # Models pickled before the arrays existed
+                self._build_product_arrays()
+
             # Scale the features
-            feature_vector_scaled = self.scaler.transform([feature_vector])
-            
-            # Get purchase probability
-            purchase_probability = self.recommendation_model.predict_proba(feature_vector_scaled)[0][1]
-            
+            features_scaled = self.scaler.transform(self._customer_feature_matrix(customers))
+
+            # Get purchase probabilities
+            purchase_probabilities = self.recommendation_model.predict_proba(features_scaled)[:, 1]
+
             # Find similar customers
-            distances, indices = self.similarity_model.kneighbors(feature_vector_scaled)
-            
-            # Get recommendations based on similar customers
-            similar_customers = indices[0]
-            similar_customer_data = self.tour_data.iloc[similar_customers]
-            
-            # Analyze popular products among similar customers
-            product_recommendations = similar_customer_data[
-                similar_customer_data['ProdTaken'] == 1
-            ]['ProductPitched'].value_counts().head(5)
-            
-            recommendations = {
-                'purchase_probability': purchase_probability,
-                'recommended_products': product_recommendations.to_dict(),
-                'similar_customers_count': len(similar_customers),
-                'confidence_score': 1 - np.mean(distances[0])
-            }
-            
+            distances, indices = self.similarity_model.kneighbors(features_scaled)
+
+            # Count products taken among each customer's neighbours in one bincount
+            n_products = len(self.product_names)
+            taken = self.prod_taken[indices]
+            flat_codes = (np.arange(len(customers))[:, None] * n_products + self.product_codes[indices])[taken]
+            counts = np.bincount(flat_codes, minlength=len(customers) * n_products).reshape(len(customers), n_products)
+            top = np.argsort(-counts, axis=1, kind='stable')[:, :top_products]
+            confidence = 1 - distances.mean(axis=1)
+
+            recommendations = []
+            for row in range(len(customers)):
+                recommended_products = {
+                    self.product_names[code]: int(counts[row, code])
+                    for code in top[row] if counts[row, code] > 0
+                }
+                recommendations.append({
+                    'purchase_probability': float(purchase_probabilities[row]),
+                    'recommended_products': recommended_products,
+                    'similar_customers_count': indices.shape[1],
+                    'confidence_score': float(confidence[row])
+                })
+
             return recommendations
-            
+
         except Exception as e:
             logger.error(f"Error getting customer recommendations: {str(e)}")
-            return {}
-    
+            return []
+
     def predict_tour_preference(self, user_profile):
         """Predict which tour types a user might prefer"""
         try:
@@ -400,7 +453,10 @@ class TourPackagePricingOptimizer:
             return {'optimal_price': base_price, 'demand_probability': 0.5}
 
 class CustomerSegmentationEngine:
-    def __init__(self):
+    def __init__(self, mode='kmeans'):
+        """mode: 'kmeans' (5 clusters, full batch) or 'minibatch' (streaming
+        MiniBatchKMeans with k chosen by sampled silhouette, for large frames)"""
+        self.mode = mode
         self.segmentation_model = None
         self.scaler = StandardScaler()
         self.is_trained = False
@@ -414,33 +470,28 @@ class CustomerSegmentationEngine:
             features = ['Age', 'MonthlyIncome', 'NumberOfPersonVisiting', 
                        'NumberOfTrips', 'PitchSatisfactionScore', 'CityTier']
             
-            X = tour_package_df[features].fillna(tour_package_df[features].median())
-            X_scaled = self.scaler.fit_transform(X)
-            
-            # Determine optimal number of clusters
-            optimal_clusters = 5
-            
-            # Create segments
-            self.segmentation_model = KMeans(n_clusters=optimal_clusters, random_state=42)
-            segments = self.segmentation_model.fit_predict(X_scaled)
+            if getattr(self, 'mode', 'kmeans') == 'minibatch':
+                segmenter = MiniBatchSegmenter(features=features).fit(tour_package_df)
+                segments = segmenter.predict(tour_package_df)
+                self.scaler = segmenter.scaler
+                self.segmentation_model = segmenter.model
+                optimal_clusters = segmenter.n_clusters
+            else:
+                X = tour_package_df[features].fillna(tour_package_df[features].median())
+                X_scaled = self.scaler.fit_transform(X)
+                
+                # Determine optimal number of clusters
+                optimal_clusters = 5
+                
+                # Create segments
+                self.segmentation_model = KMeans(n_clusters=optimal_clusters, random_state=42)
+                segments = self.segmentation_model.fit_predict(X_scaled)
             
             # Add segments to dataframe
-            df_with_segments = tour_package_df.copy()
-            df_with_segments['Customer_Segment'] = segments
+            df_with_segments = tour_package_df.assign(Customer_Segment=segments)
             
-            # Analyze segments
-            segment_analysis = {}
-            for segment in range(optimal_clusters):
-                segment_data = df_with_segments[df_with_segments['Customer_Segment'] == segment]
-                
-                segment_analysis[f'Segment_{segment}'] = {
-                    'size': len(segment_data),
-                    'avg_age': segment_data['Age'].mean(),
-                    'avg_income': segment_data['MonthlyIncome'].mean(),
-                    'avg_satisfaction': segment_data['PitchSatisfactionScore'].mean(),
-                    'conversion_rate': segment_data['ProdTaken'].mean(),
-                    'popular_products': segment_data['ProductPitched'].value_counts().head(3).to_dict()
-                }
+            # Analyze segments in a single groupby pass
+            segment_analysis = build_segment_analysis(df_with_segments, segments)
             
             self.segment_data = df_with_segments
             self.segment_analysis = segment_analysis
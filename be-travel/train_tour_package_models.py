@@ -5,25 +5,148 @@ from sklearn.ensemble import RandomForestClassifier, RandomForestRegressor
 from sklearn.model_selection import train_test_split, cross_val_score
 from sklearn.preprocessing import StandardScaler, LabelEncoder
 from sklearn.metrics import accuracy_score, mean_squared_error, r2_score
+from sklearn.utils.class_weight import compute_class_weight
 from sklearn.cluster import KMeans
 import joblib
 import logging
 import os
 import json
+import signal
+import time
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime
+from threadpoolctl import threadpool_limits
 import matplotlib.pyplot as plt
 import seaborn as sns
 
+from models import SEGMENTATION_FEATURES, build_segmentation_artifact
+from forest_engine import compile_forest, check_parity
+from model_artifacts import publish_release
+from preprocessing_cache import PreprocessingCache
+import dataset_loader
+from dataset_loader import DEFAULT_CHUNK_ROWS, load_training_csv
+from segmentation import MiniBatchSegmenter, segment_analysis as build_segment_analysis
+
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
+CV_FOLDS = 5
+
+# Inputs at least this large are read with the streaming dataset loader
+CHUNKED_LOAD_MIN_BYTES = 64 * 1024 * 1024
+
+# Frames at least this long are segmented with MiniBatchSegmenter
+MINIBATCH_SEGMENTATION_MIN_ROWS = 250_000
+
+# Successive halving: smallest share of trees/data a configuration is tried with
+HALVING_MIN_FRACTION = 0.25
+HALVING_MIN_TREES = 10
+
+# Incremental forest: stop once held-out accuracy hasn't improved by
+# INCREMENTAL_MIN_DELTA for INCREMENTAL_PATIENCE consecutive epochs
+INCREMENTAL_PATIENCE = 3
+INCREMENTAL_MIN_DELTA = 0.001
+
+# Training data for the current process; set once per pool worker
+_epoch_data = None
+
+def _set_epoch_data(data):
+    global _epoch_data
+    _epoch_data = data
+
+def _init_epoch_worker(data):
+    """Pool initializer: receive the training arrays once and pin BLAS/OpenMP to
+    one thread so concurrent epochs don't oversubscribe the core budget"""
+    # A forked worker inherits the job's SIGTERM handler, whose exception the
+    # pool would return as a task result; exit instead, so cancelling the job
+    # stops its epochs
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    _set_epoch_data(data)
+    threadpool_limits(1)
+
+def epoch_config(epoch):
+    """Random forest hyperparameters for one epoch of the sweep"""
+    return {
+        'n_estimators': 100 + (epoch * 10),  # Increase trees each epoch
+        'random_state': 42 + epoch,  # Different random state each epoch
+        'class_weight': 'balanced',
+        'max_depth': 10 + epoch,  # Gradually increase complexity
+        'min_samples_split': 2 + (epoch % 3)
+    }
+
+def _train_epoch(epoch, cv_jobs=1):
+    """Train and evaluate one epoch's hyperparameter configuration"""
+    X_train, y_train, X_test, y_test, X_scaled, y = _epoch_data
+    wall_start = time.perf_counter()
+    cpu_start = time.process_time()
+    
+    # Train recommendation model with different random states for variation
+    model = RandomForestClassifier(n_jobs=1, **epoch_config(epoch))
+    
+    model.fit(X_train, y_train)
+    
+    # Evaluate
+    y_pred = model.predict(X_test)
+    accuracy = accuracy_score(y_test, y_pred)
+    
+    # Cross-validation
+    cv_scores = cross_val_score(model, X_scaled, y, cv=CV_FOLDS, n_jobs=cv_jobs)
+    
+    return {
+        'epoch': epoch,
+        'model': model,
+        'accuracy': accuracy,
+        'cv_mean': cv_scores.mean(),
+        'cv_std': cv_scores.std(),
+        'wall_seconds': time.perf_counter() - wall_start,
+        'cpu_seconds': time.process_time() - cpu_start
+    }
+
 class EpochBasedTrainer:
-    def __init__(self, csv_path, epochs=10):
+    def __init__(self, csv_path, epochs=10, n_jobs=1, search='sweep', time_budget=None,
+                 halving_factor=2, final_cv=True, use_cache=True, chunk_size=None, segmentation=None,
+                 output_dir='models', plots_dir='training_plots', publish_dir=None,
+                 progress_callback=None):
+        """n_jobs: core budget for training (-1 = all cores); epochs run in
+        parallel processes and any spare cores go to their CV folds.
+        search: 'sweep' trains every epoch configuration in full; 'halving'
+        runs successive halving over the same configurations, optionally
+        within time_budget seconds; 'incremental' grows a single warm-started
+        forest by each epoch's tree increment and stops on a plateau.
+        chunk_size: rows per chunk for the streaming loader; None picks it
+        for files of CHUNKED_LOAD_MIN_BYTES or more, 0 disables it.
+        segmentation: 'kmeans' (5 clusters, full batch) or 'minibatch'
+        (streaming, k chosen by silhouette); None picks minibatch from
+        MINIBATCH_SEGMENTATION_MIN_ROWS rows.
+        output_dir/plots_dir: where model files and plots are written;
+        publish_dir: models directory the release is published to
+        (defaults to output_dir).
+        progress_callback(event, details): called at each pipeline step
+        and after each epoch, e.g. by training_jobs."""
+        if segmentation not in (None, 'kmeans', 'minibatch'):
+            raise ValueError(f"Unknown segmentation mode: {segmentation}")
+        if search not in ('sweep', 'halving', 'incremental'):
+            raise ValueError(f"Unknown search mode: {search}")
         self.csv_path = csv_path
         self.epochs = epochs
-        self.raw_data = None
+        self.search = search
+        self.time_budget = time_budget
+        self.halving_factor = halving_factor
+        self.final_cv = final_cv
+        self.best_cv = (None, None)
+        self.pricing_metrics = {}
+        self.n_jobs = (os.cpu_count() or 1) if n_jobs == -1 else max(1, n_jobs)
+        self.epoch_workers = 1
+        self.cv_jobs = 1
         self.processed_data = None
+        self.preprocessing_cache = PreprocessingCache(enabled=use_cache)
+        self.chunk_size = chunk_size
+        self.segmentation = segmentation
+        self.output_dir = output_dir
+        self.plots_dir = plots_dir
+        self.publish_dir = publish_dir or output_dir
+        self.progress_callback = progress_callback
         self.label_encoders = {}
         self.scaler = StandardScaler()
         
@@ -31,74 +154,112 @@ class EpochBasedTrainer:
         self.recommendation_model = None
         self.pricing_model = None
         self.segmentation_model = None
+        self.segmentation_scaler = None
+        
+        # Scaled training inputs, kept for compiled-forest parity checks
+        self.model_inputs = {}
+        self.release_version = None
         
         # Training history
         self.training_history = {
             'recommendation_accuracy': [],
             'pricing_r2': [],
             'epoch_times': [],
+            'epoch_cpu_times': [],
             'best_epoch': 0,
             'best_accuracy': 0
         }
         
+    @staticmethod
+    def preprocess_csv(csv_path):
+        """Parse and preprocess the dataset; returns (processed_data, {'label_encoders': ...})"""
+        processed_data = pd.read_csv(csv_path)
+        label_encoders = {}
+        
+        # Handle missing values
+        processed_data = processed_data.dropna(subset=['CustomerID', 'ProdTaken'])
+        
+        # Encode categorical variables
+        categorical_columns = ['TypeofContact', 'Occupation', 'Gender', 
+                             'ProductPitched', 'MaritalStatus', 'Designation']
+        
+        for col in categorical_columns:
+            if col in processed_data.columns:
+                label_encoders[col] = LabelEncoder()
+                processed_data[f'{col}_encoded'] = label_encoders[col].fit_transform(
+                    processed_data[col].fillna('Unknown')
+                )
+        
+        # Feature engineering
+        processed_data['Age_Group'] = pd.cut(
+            processed_data['Age'], 
+            bins=[0, 30, 45, 60, 100], 
+            labels=['Young', 'Middle', 'Senior', 'Elder']
+        )
+        processed_data['Age_Group_encoded'] = LabelEncoder().fit_transform(
+            processed_data['Age_Group'].fillna('Middle')
+        )
+        
+        processed_data['Income_Group'] = pd.cut(
+            processed_data['MonthlyIncome'], 
+            bins=[0, 20000, 50000, 100000, float('inf')],
+            labels=['Low', 'Medium', 'High', 'Premium']
+        )
+        processed_data['Income_Group_encoded'] = LabelEncoder().fit_transform(
+            processed_data['Income_Group'].fillna('Low')
+        )
+        
+        processed_data['Family_Size'] = (
+            processed_data['NumberOfPersonVisiting'] + 
+            processed_data['NumberOfChildrenVisiting'].fillna(0)
+        )
+        
+        # Fill missing numeric values
+        numeric_columns = ['Age', 'DurationOfPitch', 'NumberOfFollowups', 
+                         'PreferredPropertyStar', 'NumberOfTrips', 'MonthlyIncome']
+        
+        for col in numeric_columns:
+            if col in processed_data.columns:
+                median_val = processed_data[col].median()
+                processed_data[col] = processed_data[col].fillna(median_val)
+        
+        return processed_data, {'label_encoders': label_encoders}
+    
+    def _report(self, event, **details):
+        if self.progress_callback is not None:
+            self.progress_callback(event, details)
+    
+    def use_minibatch_segmentation(self):
+        if self.segmentation is not None:
+            return self.segmentation == 'minibatch'
+        return len(self.processed_data) >= MINIBATCH_SEGMENTATION_MIN_ROWS
+    
+    def use_chunked_loader(self):
+        if self.chunk_size is not None:
+            return self.chunk_size > 0
+        return os.path.getsize(self.csv_path) >= CHUNKED_LOAD_MIN_BYTES
+    
     def load_and_preprocess_data(self):
-        """Load and preprocess the dataset"""
+        """Load and preprocess the dataset, reusing the preprocessing cache when possible"""
         try:
             logger.info("Loading dataset...")
-            self.raw_data = pd.read_csv(self.csv_path)
-            
-            logger.info(f"Dataset shape: {self.raw_data.shape}")
-            logger.info(f"Conversion rate: {self.raw_data['ProdTaken'].mean():.2%}")
-            
-            # Preprocessing
-            self.processed_data = self.raw_data.copy()
-            
-            # Handle missing values
-            self.processed_data = self.processed_data.dropna(subset=['CustomerID', 'ProdTaken'])
-            
-            # Encode categorical variables
-            categorical_columns = ['TypeofContact', 'Occupation', 'Gender', 
-                                 'ProductPitched', 'MaritalStatus', 'Designation']
-            
-            for col in categorical_columns:
-                if col in self.processed_data.columns:
-                    self.label_encoders[col] = LabelEncoder()
-                    self.processed_data[f'{col}_encoded'] = self.label_encoders[col].fit_transform(
-                        self.processed_data[col].fillna('Unknown')
-                    )
-            
-            # Feature engineering
-            self.processed_data['Age_Group'] = pd.cut(
-                self.processed_data['Age'], 
-                bins=[0, 30, 45, 60, 100], 
-                labels=['Young', 'Middle', 'Senior', 'Elder']
-            )
-            self.processed_data['Age_Group_encoded'] = LabelEncoder().fit_transform(
-                self.processed_data['Age_Group'].fillna('Middle')
-            )
-            
-            self.processed_data['Income_Group'] = pd.cut(
-                self.processed_data['MonthlyIncome'], 
-                bins=[0, 20000, 50000, 100000, float('inf')],
-                labels=['Low', 'Medium', 'High', 'Premium']
-            )
-            self.processed_data['Income_Group_encoded'] = LabelEncoder().fit_transform(
-                self.processed_data['Income_Group'].fillna('Low')
-            )
-            
-            self.processed_data['Family_Size'] = (
-                self.processed_data['NumberOfPersonVisiting'] + 
-                self.processed_data['NumberOfChildrenVisiting'].fillna(0)
-            )
-            
-            # Fill missing numeric values
-            numeric_columns = ['Age', 'DurationOfPitch', 'NumberOfFollowups', 
-                             'PreferredPropertyStar', 'NumberOfTrips', 'MonthlyIncome']
+            if self.use_chunked_loader():
+                # Streaming two-pass loader for large exports
+                self.processed_data, state = self.preprocessing_cache.get_or_build(
+                    'epoch_trainer_chunked', self.csv_path,
+                    lambda path: load_training_csv(path, self.chunk_size or DEFAULT_CHUNK_ROWS),
+                    dataset_loader
+                )
+                if 'load_stats' in state:
+                    self.training_history['load_stats'] = state['load_stats']
+            else:
+                self.processed_data, state = self.preprocessing_cache.get_or_build(
+                    'epoch_trainer', self.csv_path, EpochBasedTrainer.preprocess_csv
+                )
+            self.label_encoders = state['label_encoders']
             
-            for col in numeric_columns:
-                if col in self.processed_data.columns:
-                    median_val = self.processed_data[col].median()
-                    self.processed_data[col] = self.processed_data[col].fillna(median_val)
+            logger.info(f"Dataset shape: {self.processed_data.shape}")
+            logger.info(f"Conversion rate: {self.processed_data['ProdTaken'].mean():.2%}")
             
             logger.info("Data preprocessing completed successfully!")
             return True
@@ -129,7 +290,9 @@ class EpochBasedTrainer:
             ]
             
             # Prepare feature matrix and target
-            self.X = self.processed_data[self.recommendation_features].fillna(0)
+            # float64 so compact (int8/float32) columns from the chunked loader
+            # train exactly like the in-memory path
+            self.X = self.processed_data[self.recommendation_features].fillna(0).astype(np.float64)
             self.y_purchase = self.processed_data['ProdTaken']
             
             logger.info(f"Feature matrix shape: {self.X.shape}")
@@ -148,61 +311,28 @@ class EpochBasedTrainer:
             
             # Scale features
             X_scaled = self.scaler.fit_transform(self.X)
+            self.model_inputs['recommendation_model'] = X_scaled
             
             # Split data
             X_train, X_test, y_train, y_test = train_test_split(
                 X_scaled, self.y_purchase, test_size=0.2, random_state=42, stratify=self.y_purchase
             )
             
-            best_accuracy = 0
-            best_model = None
-            
-            for epoch in range(self.epochs):
-                epoch_start = datetime.now()
-                logger.info(f"\n--- EPOCH {epoch + 1}/{self.epochs} ---")
-                
-                # Train recommendation model with different random states for variation
-                model = RandomForestClassifier(
-                    n_estimators=100 + (epoch * 10),  # Increase trees each epoch
-                    random_state=42 + epoch,  # Different random state each epoch
-                    class_weight='balanced',
-                    max_depth=10 + epoch,  # Gradually increase complexity
-                    min_samples_split=2 + (epoch % 3)
-                )
-                
-                model.fit(X_train, y_train)
-                
-                # Evaluate
-                y_pred = model.predict(X_test)
-                accuracy = accuracy_score(y_test, y_pred)
-                
-                # Cross-validation
-                cv_scores = cross_val_score(model, X_scaled, self.y_purchase, cv=5)
-                cv_mean = cv_scores.mean()
-                
-                # Store training history
-                self.training_history['recommendation_accuracy'].append(accuracy)
-                epoch_time = (datetime.now() - epoch_start).total_seconds()
-                self.training_history['epoch_times'].append(epoch_time)
-                
-                logger.info(f"Accuracy: {accuracy:.4f}")
-                logger.info(f"CV Score: {cv_mean:.4f} ± {cv_scores.std():.4f}")
-                logger.info(f"Epoch time: {epoch_time:.2f}s")
-                
-                # Keep best model
-                if accuracy > best_accuracy:
-                    best_accuracy = accuracy
-                    best_model = model
-                    self.training_history['best_epoch'] = epoch + 1
-                    self.training_history['best_accuracy'] = best_accuracy
-                    logger.info(f"🏆 New best model! Accuracy: {best_accuracy:.4f}")
+            if self.search == 'halving':
+                best_model = self._successive_halving(X_train, y_train, X_test, y_test, X_scaled)
+            elif self.search == 'incremental':
+                best_model = self._incremental_forest(X_train, y_train, X_test, y_test, X_scaled)
+            else:
+                best_model = self._sweep_epochs(X_train, y_train, X_test, y_test, X_scaled)
             
             self.recommendation_model = best_model
             
             # Train pricing model (single epoch as it's regression)
+            self._report('step', name='Training pricing model')
             self.train_pricing_model()
             
             # Train segmentation model
+            self._report('step', name='Training segmentation model')
             self.train_segmentation_model()
             
             logger.info(f"\n🎉 Training completed!")
@@ -215,6 +345,301 @@ class EpochBasedTrainer:
             logger.error(f"Error in epoch training: {str(e)}")
             return False
     
+    def _sweep_epochs(self, X_train, y_train, X_test, y_test, X_scaled):
+        """Linear sweep: every epoch configuration gets a full fit plus CV"""
+        start_wall = time.perf_counter()
+        start_cpu = time.process_time()
+        
+        best_accuracy = 0
+        best_model = None
+        
+        for result in self._run_epochs(X_train, y_train, X_test, y_test, X_scaled):
+            epoch = result['epoch']
+            logger.info(f"\n--- EPOCH {epoch + 1}/{self.epochs} ---")
+            
+            accuracy = result['accuracy']
+            
+            # Store training history
+            self.training_history['recommendation_accuracy'].append(accuracy)
+            self.training_history['epoch_times'].append(result['wall_seconds'])
+            self.training_history['epoch_cpu_times'].append(result['cpu_seconds'])
+            
+            logger.info(f"Accuracy: {accuracy:.4f}")
+            logger.info(f"CV Score: {result['cv_mean']:.4f} ± {result['cv_std']:.4f}")
+            logger.info(f"Epoch time: {result['wall_seconds']:.2f}s (CPU {result['cpu_seconds']:.2f}s)")
+            self._report('epoch', epoch=epoch + 1, epochs=self.epochs, accuracy=accuracy,
+                         seconds=result['wall_seconds'], cpu_seconds=result['cpu_seconds'])
+            
+            # Keep best model; results arrive in epoch order, so ties keep the earliest epoch
+            if accuracy > best_accuracy:
+                best_accuracy = accuracy
+                best_model = result['model']
+                self.best_cv = (result['cv_mean'], result['cv_std'])
+                self.training_history['best_epoch'] = epoch + 1
+                self.training_history['best_accuracy'] = best_accuracy
+                logger.info(f"🏆 New best model! Accuracy: {best_accuracy:.4f}")
+        
+        wall_seconds = time.perf_counter() - start_wall
+        # Parent CPU plus every epoch's own CPU (pool workers are separate processes)
+        cpu_seconds = sum(self.training_history['epoch_cpu_times'])
+        if self.epoch_workers > 1:
+            cpu_seconds += time.process_time() - start_cpu
+        self.training_history['training_summary'] = {
+            'mode': 'parallel' if self.epoch_workers > 1 else 'serial',
+            'core_budget': self.n_jobs,
+            'epoch_workers': self.epoch_workers,
+            'cv_jobs': self.cv_jobs,
+            'wall_seconds': round(wall_seconds, 2),
+            'cpu_seconds': round(cpu_seconds, 2),
+            'parallel_efficiency': round(cpu_seconds / (wall_seconds * self.n_jobs), 3) if wall_seconds else None
+        }
+        logger.info(f"Epochs finished in {wall_seconds:.2f}s wall / {cpu_seconds:.2f}s CPU "
+                    f"({self.epoch_workers} worker(s), {self.cv_jobs} CV job(s) each)")
+        
+        return best_model
+    
+    def _successive_halving(self, X_train, y_train, X_test, y_test, X_scaled):
+        """Successive halving over the epoch configurations.
+
+        Every configuration is first fit with a fraction of its trees on a
+        stratified subsample of the training split; only the best by
+        held-out accuracy are promoted to the next rung, where the tree and
+        data fractions grow by eta, until one configuration gets the full
+        budget. The first rung never starts below HALVING_MIN_FRACTION, so
+        when that caps the number of rungs each rung prunes harder than
+        1/eta instead. If `time_budget` seconds run out, the best
+        configuration so far is promoted straight to the full-budget fit.
+        """
+        start_wall = time.perf_counter()
+        start_cpu = time.process_time()
+        eta = self.halving_factor
+        # Enough rungs to halve down to one configuration, but no more than
+        # fit between HALVING_MIN_FRACTION and the full budget, so the
+        # fraction strictly grows from rung to rung
+        wanted_rungs = int(np.ceil(round(np.log(max(self.epochs, 1)) / np.log(eta), 9)))
+        fitting_rungs = int(np.floor(round(np.log(1 / HALVING_MIN_FRACTION) / np.log(eta), 9)))
+        n_rungs = min(wanted_rungs, fitting_rungs) + 1
+        # Pruning factor per rung, above eta when the rungs were capped
+        prune = max(eta, self.epochs ** (1 / (n_rungs - 1))) if n_rungs > 1 else eta
+        
+        candidates = list(range(self.epochs))
+        latest = {epoch: {'accuracy': 0.0, 'seconds': 0.0, 'cpu_seconds': 0.0} for epoch in candidates}
+        rungs = []
+        budget_exhausted = False
+        
+        def out_of_time():
+            return self.time_budget is not None and time.perf_counter() - start_wall > self.time_budget
+        
+        for rung in range(n_rungs):
+            final = rung == n_rungs - 1 or len(candidates) == 1 or budget_exhausted
+            fraction = 1.0 if final else eta ** (rung - n_rungs + 1)
+            if fraction < 1.0:
+                X_rung, _, y_rung, _ = train_test_split(
+                    X_train, y_train, train_size=fraction, random_state=42, stratify=y_train
+                )
+            else:
+                X_rung, y_rung = X_train, y_train
+            logger.info(f"\n--- RUNG {rung + 1}: {len(candidates)} configuration(s), "
+                        f"{fraction:.0%} of trees and data ---")
+            
+            scored = []
+            for epoch in candidates:
+                if not final and scored and out_of_time():
+                    budget_exhausted = True
+                    logger.info(f"⏱️ Time budget of {self.time_budget}s reached during rung {rung + 1}")
+                    break
+                params = epoch_config(epoch)
+                params['n_estimators'] = max(HALVING_MIN_TREES, int(round(params['n_estimators'] * fraction)))
+                wall_start, cpu_start = time.perf_counter(), time.process_time()
+                model = RandomForestClassifier(n_jobs=self.n_jobs, **params).fit(X_rung, y_rung)
+                accuracy = accuracy_score(y_test, model.predict(X_test))
+                seconds = time.perf_counter() - wall_start
+                
+                latest[epoch]['accuracy'] = accuracy
+                latest[epoch]['seconds'] += seconds
+                latest[epoch]['cpu_seconds'] += time.process_time() - cpu_start
+                scored.append((accuracy, epoch, model))
+                logger.info(f"Config {epoch + 1}: {params['n_estimators']} trees, accuracy {accuracy:.4f} ({seconds:.2f}s)")
+                self._report('epoch', epoch=epoch + 1, epochs=self.epochs, rung=rung + 1, accuracy=accuracy,
+                             seconds=seconds, n_estimators=params['n_estimators'])
+            
+            # Highest accuracy first; ties keep the earliest configuration
+            scored.sort(key=lambda item: (-item[0], item[1]))
+            rung_record = {
+                'rung': rung + 1,
+                'fraction': round(fraction, 4),
+                'evaluated': [{'epoch': epoch + 1, 'accuracy': accuracy} for accuracy, epoch, _ in scored]
+            }
+            
+            if final:
+                best_accuracy, best_epoch, best_model = scored[0]
+                rungs.append(rung_record)
+                break
+            
+            if not budget_exhausted and out_of_time():
+                budget_exhausted = True
+                logger.info(f"⏱️ Time budget of {self.time_budget}s reached after rung {rung + 1}")
+            # Survivors are counted from the configurations the search started
+            # with, so the last rung is reached with about one of them
+            survivors = int(np.ceil(round(self.epochs / prune ** (rung + 1), 9)))
+            keep = 1 if budget_exhausted else max(1, min(len(scored), survivors))
+            candidates = [epoch for _, epoch, _ in scored[:keep]]
+            rung_record['promoted'] = [epoch + 1 for epoch in candidates]
+            rungs.append(rung_record)
+        
+        # Same history layout as the sweep: one entry per configuration,
+        # holding its accuracy at the highest rung it reached
+        for epoch in range(self.epochs):
+            self.training_history['recommendation_accuracy'].append(latest[epoch]['accuracy'])
+            self.training_history['epoch_times'].append(latest[epoch]['seconds'])
+            self.training_history['epoch_cpu_times'].append(latest[epoch]['cpu_seconds'])
+        self.training_history['best_epoch'] = best_epoch + 1
+        self.training_history['best_accuracy'] = best_accuracy
+        logger.info(f"🏆 Best configuration {best_epoch + 1}: accuracy {best_accuracy:.4f}")
+        
+        if self.final_cv:
+            cv_scores = cross_val_score(best_model, X_scaled, self.y_purchase, cv=CV_FOLDS,
+                                        n_jobs=min(CV_FOLDS, self.n_jobs))
+            self.best_cv = (cv_scores.mean(), cv_scores.std())
+            logger.info(f"CV Score: {cv_scores.mean():.4f} ± {cv_scores.std():.4f}")
+        
+        wall_seconds = time.perf_counter() - start_wall
+        cpu_seconds = time.process_time() - start_cpu
+        self.training_history['search'] = {
+            'mode': 'successive_halving',
+            'eta': eta,
+            'time_budget': self.time_budget,
+            'budget_exhausted': budget_exhausted,
+            'rungs': rungs
+        }
+        self.training_history['training_summary'] = {
+            'mode': 'successive_halving',
+            'core_budget': self.n_jobs,
+            'wall_seconds': round(wall_seconds, 2),
+            'cpu_seconds': round(cpu_seconds, 2),
+            'parallel_efficiency': round(cpu_seconds / (wall_seconds * self.n_jobs), 3) if wall_seconds else None
+        }
+        logger.info(f"Search finished in {wall_seconds:.2f}s wall / {cpu_seconds:.2f}s CPU")
+        return best_model
+    
+    def _incremental_forest(self, X_train, y_train, X_test, y_test, X_scaled):
+        """Grow one forest across epochs with warm_start instead of refitting.
+
+        Epoch e adds trees until the forest has epoch_config(e)['n_estimators']
+        (100, 110, ...), using the final epoch's depth and split settings, and
+        records held-out accuracy after each step. Training stops early once
+        accuracy plateaus, and the forest is truncated back to the tree count
+        that scored best, so it is identical to the forest that was evaluated.
+        """
+        start_wall = time.perf_counter()
+        start_cpu = time.process_time()
+        
+        params = epoch_config(self.epochs - 1)
+        # Same weights as 'balanced', precomputed as sklearn advises for warm_start (it warns on the preset)
+        classes = np.unique(y_train)
+        params.update(random_state=42, n_estimators=0, class_weight=dict(zip(
+            classes, compute_class_weight('balanced', classes=classes, y=y_train)
+        )))
+        model = RandomForestClassifier(n_jobs=self.n_jobs, warm_start=True, **params)
+        
+        curve = []
+        best_accuracy, best_epoch, best_trees = -1.0, 0, 0
+        stale_epochs = 0
+        stopped_early = False
+        
+        for epoch in range(self.epochs):
+            n_trees = epoch_config(epoch)['n_estimators']
+            wall_start, cpu_start = time.perf_counter(), time.process_time()
+            model.set_params(n_estimators=n_trees)
+            model.fit(X_train, y_train)
+            accuracy = accuracy_score(y_test, model.predict(X_test))
+            seconds = time.perf_counter() - wall_start
+            
+            self.training_history['recommendation_accuracy'].append(accuracy)
+            self.training_history['epoch_times'].append(seconds)
+            self.training_history['epoch_cpu_times'].append(time.process_time() - cpu_start)
+            curve.append({'epoch': epoch + 1, 'n_estimators': n_trees, 'accuracy': accuracy,
+                          'seconds': round(seconds, 3)})
+            logger.info(f"Epoch {epoch + 1}/{self.epochs}: {n_trees} trees, accuracy {accuracy:.4f} ({seconds:.2f}s)")
+            self._report('epoch', epoch=epoch + 1, epochs=self.epochs, accuracy=accuracy,
+                         seconds=seconds, n_estimators=n_trees)
+            
+            if accuracy > best_accuracy + INCREMENTAL_MIN_DELTA or epoch == 0:
+                best_accuracy, best_epoch, best_trees = accuracy, epoch, n_trees
+                stale_epochs = 0
+            else:
+                if accuracy > best_accuracy:
+                    best_accuracy, best_epoch, best_trees = accuracy, epoch, n_trees
+                stale_epochs += 1
+                if stale_epochs >= INCREMENTAL_PATIENCE and epoch < self.epochs - 1:
+                    stopped_early = True
+                    logger.info(f"⏹️ Accuracy plateaued for {stale_epochs} epochs; stopping at {n_trees} trees")
+                    break
+        
+        # Keep the best prefix of trees; later trees are discarded
+        model.estimators_ = model.estimators_[:best_trees]
+        model.set_params(n_estimators=best_trees, warm_start=False)
+        
+        self.training_history['best_epoch'] = best_epoch + 1
+        self.training_history['best_accuracy'] = best_accuracy
+        self.training_history['tree_curve'] = curve
+        logger.info(f"🏆 Best forest: {best_trees} trees, accuracy {best_accuracy:.4f}")
+        
+        if self.final_cv:
+            cv_scores = cross_val_score(model, X_scaled, self.y_purchase, cv=CV_FOLDS,
+                                        n_jobs=min(CV_FOLDS, self.n_jobs))
+            self.best_cv = (cv_scores.mean(), cv_scores.std())
+            logger.info(f"CV Score: {cv_scores.mean():.4f} ± {cv_scores.std():.4f}")
+        
+        wall_seconds = time.perf_counter() - start_wall
+        cpu_seconds = time.process_time() - start_cpu
+        self.training_history['search'] = {
+            'mode': 'incremental',
+            'patience': INCREMENTAL_PATIENCE,
+            'min_delta': INCREMENTAL_MIN_DELTA,
+            'stopped_early': stopped_early,
+            'trees_grown': curve[-1]['n_estimators'],
+            'trees_kept': best_trees
+        }
+        self.training_history['training_summary'] = {
+            'mode': 'incremental',
+            'core_budget': self.n_jobs,
+            'wall_seconds': round(wall_seconds, 2),
+            'cpu_seconds': round(cpu_seconds, 2),
+            'parallel_efficiency': round(cpu_seconds / (wall_seconds * self.n_jobs), 3) if wall_seconds else None
+        }
+        logger.info(f"Incremental training finished in {wall_seconds:.2f}s wall / {cpu_seconds:.2f}s CPU "
+                    f"({curve[-1]['n_estimators']} trees grown)")
+        return model
+    
+    def _plan_workers(self):
+        """Split the core budget between concurrent epochs and CV folds per epoch"""
+        self.epoch_workers = max(1, min(self.n_jobs, self.epochs))
+        self.cv_jobs = max(1, min(CV_FOLDS, self.n_jobs // self.epoch_workers))
+    
+    def _run_epochs(self, X_train, y_train, X_test, y_test, X_scaled):
+        """Yield per-epoch results in epoch order, serially or from a process pool"""
+        self._plan_workers()
+        data = (X_train, y_train, X_test, y_test, X_scaled, self.y_purchase)
+        
+        if self.epoch_workers == 1:
+            _set_epoch_data(data)
+            for epoch in range(self.epochs):
+                yield _train_epoch(epoch, self.cv_jobs)
+            return
+        
+        logger.info(f"Training {self.epochs} epochs on {self.epoch_workers} processes "
+                    f"(core budget {self.n_jobs})")
+        executor = ProcessPoolExecutor(max_workers=self.epoch_workers,
+                                       initializer=_init_epoch_worker, initargs=(data,))
+        try:
+            futures = [executor.submit(_train_epoch, epoch, self.cv_jobs) for epoch in range(self.epochs)]
+            for future in futures:
+                yield future.result()
+        finally:
+            # On cancellation, an error or an abandoned generator, drop the queued epochs
+            executor.shutdown(wait=True, cancel_futures=True)
+    
     def train_pricing_model(self):
         """Train pricing model"""
         try:
@@ -226,7 +651,7 @@ class EpochBasedTrainer:
                 'Super Deluxe': 3500, 'King': 5000
             }
             
-            self.processed_data['Base_Price'] = self.processed_data['ProductPitched'].map(price_mapping).fillna(1000)
+            self.processed_data['Base_Price'] = self.processed_data['ProductPitched'].map(price_mapping).astype(float).fillna(1000)
             
             # Price adjustments
             income_adj = np.where(
@@ -249,10 +674,11 @@ class EpochBasedTrainer:
                 'PreferredPropertyStar', 'NumberOfTrips', 'PitchSatisfactionScore'
             ]
             
-            X_pricing = self.processed_data[pricing_features].fillna(0)
+            X_pricing = self.processed_data[pricing_features].fillna(0).astype(np.float64)
             y_pricing = self.processed_data['Price_Per_Person']
             
             X_pricing_scaled = StandardScaler().fit_transform(X_pricing)
+            self.model_inputs['pricing_model'] = X_pricing_scaled
             
             # Train model
             self.pricing_model = RandomForestRegressor(n_estimators=100, random_state=42)
@@ -263,6 +689,11 @@ class EpochBasedTrainer:
             r2 = r2_score(y_pricing, y_pred)
             
             self.training_history['pricing_r2'].append(r2)
+            self.pricing_metrics = {
+                'r2_score': r2,
+                'rmse': float(np.sqrt(mean_squared_error(y_pricing, y_pred))),
+                'features': pricing_features
+            }
             logger.info(f"Pricing model R² score: {r2:.4f}")
             
             return True
@@ -276,20 +707,32 @@ class EpochBasedTrainer:
         try:
             logger.info("Training segmentation model...")
             
-            segmentation_features = [
-                'Age', 'MonthlyIncome', 'NumberOfPersonVisiting', 
-                'NumberOfTrips', 'PitchSatisfactionScore', 'CityTier'
-            ]
-            
-            X_segment = self.processed_data[segmentation_features].fillna(
-                self.processed_data[segmentation_features].median()
-            )
-            
-            X_segment_scaled = StandardScaler().fit_transform(X_segment)
-            
-            # Train segmentation model
-            self.segmentation_model = KMeans(n_clusters=5, random_state=42)
-            segments = self.segmentation_model.fit_predict(X_segment_scaled)
+            if self.use_minibatch_segmentation():
+                # Streaming scaler + MiniBatchKMeans over row chunks; k by sampled silhouette
+                segmenter = MiniBatchSegmenter().fit(self.processed_data)
+                segments = segmenter.predict(self.processed_data)
+                self.segmentation_scaler = segmenter.scaler
+                self.segmentation_model = segmenter.model
+                self.training_history['segmentation'] = {
+                    'mode': 'minibatch',
+                    'n_clusters': segmenter.n_clusters,
+                    'silhouette_scores': segmenter.silhouette_scores,
+                    'seconds': {name: round(seconds, 2) for name, seconds in segmenter.fit_seconds.items()}
+                }
+            else:
+                segmentation_features = SEGMENTATION_FEATURES
+                
+                X_segment = self.processed_data[segmentation_features].astype(np.float64)
+                X_segment = X_segment.fillna(X_segment.median())
+                
+                # Keep the fitted scaler: serving must standardize with the
+                # training statistics, not refit on each request
+                self.segmentation_scaler = StandardScaler()
+                X_segment_scaled = self.segmentation_scaler.fit_transform(X_segment)
+                
+                # Train segmentation model
+                self.segmentation_model = KMeans(n_clusters=5, random_state=42)
+                segments = self.segmentation_model.fit_predict(X_segment_scaled)
             
             self.processed_data['Customer_Segment'] = segments
             
@@ -300,10 +743,40 @@ class EpochBasedTrainer:
             logger.error(f"Error training segmentation model: {str(e)}")
             return False
     
+    def build_training_results(self):
+        """Summary of the selected models in the training_results.json layout"""
+        results = {}
+        if self.recommendation_model is not None:
+            cv_mean, cv_std = self.best_cv
+            importances = sorted(
+                zip(self.recommendation_features, self.recommendation_model.feature_importances_),
+                key=lambda item: -item[1]
+            )
+            results['recommendation'] = {
+                'accuracy': self.training_history['best_accuracy'],
+                'cv_mean': cv_mean,
+                'cv_std': cv_std,
+                'feature_importance': [
+                    {'feature': feature, 'importance': float(importance)}
+                    for feature, importance in importances
+                ]
+            }
+        if self.pricing_metrics:
+            results['pricing'] = dict(self.pricing_metrics)
+        if 'Customer_Segment' in self.processed_data.columns:
+            segment_analysis = build_segment_analysis(
+                self.processed_data, self.processed_data['Customer_Segment']
+            )
+            results['segmentation'] = {
+                'n_clusters': len(segment_analysis),
+                'segment_analysis': segment_analysis
+            }
+        return results
+    
     def save_models_and_results(self):
         """Save models and training results"""
         try:
-            os.makedirs('models', exist_ok=True)
+            os.makedirs(self.output_dir, exist_ok=True)
             
             # Save models
             model_files = {
@@ -316,24 +789,68 @@ class EpochBasedTrainer:
             
             for filename, model in model_files.items():
                 if model is not None:
-                    joblib.dump(model, f'models/{filename}')
+                    joblib.dump(model, os.path.join(self.output_dir, filename))
                     logger.info(f"Saved {filename}")
+            release_artifacts = dict(model_files)
+            
+            # Flattened node arrays for the compiled inference engine, served
+            # from the release as *_compiled.pkl
+            for name in ('recommendation_model', 'pricing_model'):
+                model = getattr(self, name)
+                if model is None:
+                    continue
+                compiled = compile_forest(model)
+                parity = check_parity(model, compiled, self.model_inputs[name])
+                if not parity['ok']:
+                    logger.warning(f"Compiled {name} differs from sklearn by {parity['max_abs_diff']:.2e}")
+                release_artifacts[f'{name}_compiled.pkl'] = compiled
+                logger.info(f"Compiled {name} for the release ({compiled.nbytes() / 1e6:.1f} MB)")
+            
+            # Scaler statistics + centroids for NumPy segment assignment
+            if self.segmentation_model is not None and self.segmentation_scaler is not None:
+                segmentation_artifact = build_segmentation_artifact(
+                    self.segmentation_scaler, self.segmentation_model
+                )
+                joblib.dump(segmentation_artifact, os.path.join(self.output_dir, 'segmentation_artifact.pkl'))
+                release_artifacts['segmentation_artifact.pkl'] = segmentation_artifact
+                logger.info("Saved segmentation_artifact.pkl")
             
             # Save training history
-            with open('models/training_history.json', 'w') as f:
+            with open(os.path.join(self.output_dir, 'training_history.json'), 'w') as f:
                 json.dump(self.training_history, f, indent=2)
             
+            # Save training results
+            training_results = self.build_training_results()
+            with open(os.path.join(self.output_dir, 'training_results.json'), 'w') as f:
+                json.dump(training_results, f, indent=2)
+            
             # Save feature list
-            with open('models/features.txt', 'w') as f:
+            with open(os.path.join(self.output_dir, 'features.txt'), 'w') as f:
                 f.write("Recommendation Features:\n")
                 for feature in self.recommendation_features:
                     f.write(f"- {feature}\n")
             
             # Save processed data sample for React frontend
             sample_data = self.processed_data.head(100).to_dict('records')
-            with open('models/sample_data.json', 'w') as f:
+            with open(os.path.join(self.output_dir, 'sample_data.json'), 'w') as f:
                 json.dump(sample_data, f, indent=2, default=str)
             
+            # Immutable versioned release; running servers pick it up by hot reload
+            self.release_version = publish_release(
+                self.publish_dir,
+                release_artifacts,
+                features={
+                    'recommendation': self.recommendation_features,
+                    'segmentation': SEGMENTATION_FEATURES
+                },
+                metadata={
+                    'training_history': self.training_history,
+                    'training_results': training_results,
+                    'source': self.csv_path
+                }
+            )
+            logger.info(f"Published model release {self.release_version}")
+            
             logger.info("All models and results saved successfully!")
             return True
             
@@ -344,8 +861,7 @@ class EpochBasedTrainer:
     def generate_training_plots(self):
         """Generate training visualization plots"""
         try:
-            if not os.path.exists('training_plots'):
-                os.makedirs('training_plots')
+            os.makedirs(self.plots_dir, exist_ok=True)
             
             # Plot training accuracy over epochs
             plt.figure(figsize=(12, 4))
@@ -370,10 +886,10 @@ class EpochBasedTrainer:
             plt.grid(True, alpha=0.3)
             
             plt.tight_layout()
-            plt.savefig('training_plots/epoch_progress.png', dpi=300, bbox_inches='tight')
+            plt.savefig(os.path.join(self.plots_dir, 'epoch_progress.png'), dpi=300, bbox_inches='tight')
             plt.close()
             
-            logger.info("Training plots saved to training_plots/")
+            logger.info(f"Training plots saved to {self.plots_dir}/")
             return True
             
         except Exception as e:
@@ -389,15 +905,19 @@ class EpochBasedTrainer:
             ("Loading and Preprocessing Data", self.load_and_preprocess_data),
             ("Preparing Features", self.prepare_features),
             ("Training with Epochs", self.train_with_epochs),
-            ("Saving Models and Results", self.save_models_and_results),
-            ("Generating Training Plots", self.generate_training_plots)
+            ("Generating Training Plots", self.generate_training_plots),
+            # Last, so a release is only published once everything else succeeded
+            ("Saving Models and Results", self.save_models_and_results)
         ]
         
         for step_name, step_func in steps:
             logger.info(f"\n🔄 {step_name}...")
+            self._report('step', name=step_name)
+            step_start = time.perf_counter()
             if not step_func():
                 logger.error(f"❌ {step_name} failed! Training stopped.")
                 return False
+            self._report('step_done', name=step_name, seconds=time.perf_counter() - step_start)
         
         logger.info("\n🎉 EPOCH-BASED TRAINING COMPLETED SUCCESSFULLY!")
         return True
@@ -407,6 +927,11 @@ def main():
     # Configuration
     CSV_PATH = "tour_package.csv"
     EPOCHS = 15  # You can adjust this number
+    N_JOBS = int(os.environ.get('TRAIN_N_JOBS', -1))  # Core budget, -1 = all cores
+    SEARCH = os.environ.get('TRAIN_SEARCH', 'sweep')  # 'sweep', 'halving' or 'incremental'
+    TIME_BUDGET = float(os.environ['TRAIN_TIME_BUDGET']) if os.environ.get('TRAIN_TIME_BUDGET') else None
+    CHUNK_SIZE = int(os.environ['TRAIN_CHUNK_ROWS']) if os.environ.get('TRAIN_CHUNK_ROWS') else None  # None = by file size
+    SEGMENTATION = os.environ.get('TRAIN_SEGMENTATION') or None  # 'kmeans', 'minibatch' or by row count
     
     if not os.path.exists(CSV_PATH):
         print(f"❌ Error: {CSV_PATH} not found!")
@@ -414,7 +939,9 @@ def main():
         return
     
     # Initialize trainer
-    trainer = EpochBasedTrainer(CSV_PATH, epochs=EPOCHS)
+    trainer = EpochBasedTrainer(CSV_PATH, epochs=EPOCHS, n_jobs=N_JOBS,
+                                search=SEARCH, time_budget=TIME_BUDGET, chunk_size=CHUNK_SIZE,
+                                segmentation=SEGMENTATION)
     
     # Run training
     success = trainer.run_complete_training()
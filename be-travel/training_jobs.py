@@ -0,0 +1,351 @@
+# training_jobs.py
+import fcntl
+import json
+import logging
+import os
+import re
+import resource
+import shutil
+import signal
+import subprocess
+import sys
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from datetime import datetime
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_JOBS_DIR = os.environ.get(
+    'TRAINING_JOBS_DIR',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), 'training_jobs')
+)
+
+STATUS_FILE = 'status.json'
+JOB_FILE = 'job.json'
+LOG_FILE = 'train.log'
+# Held while checking for a running job and creating a new one, by every web worker
+LOCK_FILE = '.lock'
+FINAL_STATES = {'succeeded', 'failed', 'cancelled'}
+PUBLISH_STEP = 'Saving Models and Results'
+
+# Trainer options a job request may set, with their validators
+JOB_OPTIONS = {
+    'epochs': lambda v: type(v) is int and 1 <= v <= 50,
+    'search': lambda v: v in ('sweep', 'halving', 'incremental'),
+    'n_jobs': lambda v: type(v) is int and (v == -1 or 1 <= v <= 64),
+    'time_budget': lambda v: v is None or (type(v) in (int, float) and v > 0),
+    'segmentation': lambda v: v in (None, 'kmeans', 'minibatch'),
+    'final_cv': lambda v: type(v) is bool
+}
+DEFAULT_JOB_OPTIONS = {'epochs': 15, 'n_jobs': -1}
+
+_JOB_ID = re.compile(r'^[0-9a-f]{12}$')
+
+class JobCancelled(BaseException):
+    """Raised in the job process on SIGTERM; BaseException so the trainer's
+    `except Exception` handlers don't swallow it"""
+
+def validate_options(options):
+    """Trainer keyword arguments from a request body; raises ValueError"""
+    options = options or {}
+    if not isinstance(options, dict):
+        raise ValueError("Training options must be an object")
+    unknown = set(options) - set(JOB_OPTIONS)
+    if unknown:
+        raise ValueError(f"Unknown training options: {', '.join(sorted(unknown))}")
+    for name, value in options.items():
+        if not JOB_OPTIONS[name](value):
+            raise ValueError(f"Invalid value for {name}: {value!r}")
+    return dict(DEFAULT_JOB_OPTIONS, **options)
+
+def _write_json(path, data):
+    """Atomic replace so readers never see a half-written status"""
+    tmp_path = f"{path}.tmp-{os.getpid()}"
+    with open(tmp_path, 'w') as f:
+        json.dump(data, f, indent=2, default=str)
+    os.replace(tmp_path, path)
+
+def _read_json(path):
+    try:
+        with open(path, 'r') as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+
+def _rss_mb():
+    """Current resident set size (Linux), or None"""
+    try:
+        with open('/proc/self/statm', 'r') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / 1e6
+    except (OSError, ValueError, IndexError):
+        return None
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except (OSError, TypeError):
+        return False
+    return True
+
+class JobReporter:
+    """progress_callback for EpochBasedTrainer that keeps status.json current"""
+
+    def __init__(self, job_dir, status):
+        self.path = os.path.join(job_dir, STATUS_FILE)
+        self.status = status
+        self.started = time.perf_counter()
+        self.publishing = False
+
+    def __call__(self, event, details):
+        status = self.status
+        if event == 'step':
+            status['stage'] = details['name']
+            self.publishing = details['name'] == PUBLISH_STEP
+        elif event == 'step_done':
+            status['timings'][details['name']] = round(details['seconds'], 3)
+        elif event == 'epoch':
+            status['epochs'].append({
+                key: round(value, 4) if isinstance(value, float) else value
+                for key, value in details.items() if key != 'epochs'
+            })
+            status['progress'] = {
+                'epochs_completed': len(status['epochs']),
+                'epochs_total': details['epochs'],
+                'best_accuracy': max(epoch['accuracy'] for epoch in status['epochs'])
+            }
+        self.write()
+
+    def write(self, **fields):
+        self.status.update(fields)
+        usage = resource.getrusage(resource.RUSAGE_SELF)
+        children = resource.getrusage(resource.RUSAGE_CHILDREN)
+        rss = _rss_mb()
+        self.status['memory'] = {
+            'rss_mb': round(rss, 1) if rss is not None else None,
+            'peak_rss_mb': round(usage.ru_maxrss / 1024, 1),
+            # Largest exited child process (e.g. an epoch worker)
+            'children_peak_rss_mb': round(children.ru_maxrss / 1024, 1)
+        }
+        self.status['cpu_seconds'] = round(usage.ru_utime + usage.ru_stime +
+                                           children.ru_utime + children.ru_stime, 2)
+        self.status['elapsed_seconds'] = round(time.perf_counter() - self.started, 2)
+        self.status['updated_at'] = datetime.now().isoformat()
+        _write_json(self.path, self.status)
+
+def run_job(job_dir):
+    """Job process entry point: train, then publish a release to the serving models directory"""
+    # stdout/stderr (and so the trainer's logging) already go to train.log
+    job = _read_json(os.path.join(job_dir, JOB_FILE))
+
+    status = _read_json(os.path.join(job_dir, STATUS_FILE))
+    reporter = JobReporter(job_dir, status)
+
+    def on_sigterm(signum, frame):
+        # A release being published is finished rather than left half-written
+        if reporter.publishing:
+            logger.warning("Cancellation ignored: release is being published")
+            return
+        raise JobCancelled()
+
+    signal.signal(signal.SIGTERM, on_sigterm)
+    reporter.write(state='running', pid=os.getpid(), started_at=datetime.now().isoformat())
+
+    try:
+        from train_tour_package_models import EpochBasedTrainer
+        trainer = EpochBasedTrainer(
+            job['csv_path'],
+            output_dir=os.path.join(job_dir, 'models'),
+            plots_dir=os.path.join(job_dir, 'training_plots'),
+            publish_dir=job['publish_dir'],
+            progress_callback=reporter,
+            **job['options']
+        )
+        ok = trainer.run_complete_training()
+    except JobCancelled:
+        logger.info(f"Training job {job['job_id']} cancelled")
+        reporter.write(state='cancelled', finished_at=datetime.now().isoformat())
+        return 1
+    except Exception as e:
+        logger.error(f"Training job {job['job_id']} failed: {str(e)}")
+        reporter.write(state='failed', error=str(e), finished_at=datetime.now().isoformat())
+        return 1
+
+    if not ok:
+        reporter.write(state='failed', error=f"{status.get('stage')} failed; see {LOG_FILE}",
+                       finished_at=datetime.now().isoformat())
+        return 1
+    reporter.write(
+        state='succeeded',
+        stage='done',
+        release_version=trainer.release_version,
+        result={
+            'best_epoch': trainer.training_history['best_epoch'],
+            'best_accuracy': trainer.training_history['best_accuracy'],
+            'pricing': trainer.pricing_metrics,
+            'training_summary': trainer.training_history.get('training_summary')
+        },
+        finished_at=datetime.now().isoformat()
+    )
+    return 0
+
+class TrainingJobRunner:
+    """Runs EpochBasedTrainer in a separate process per job.
+
+    Each job gets its own directory (job.json, status.json, train.log and
+    the trainer's model files and plots), so the live models directory is
+    only touched by the final publish_release, which is atomic. Job state
+    lives in status.json rather than in memory, so any web worker can
+    report on or cancel a job. At most one job runs at a time.
+    """
+
+    def __init__(self, csv_path, models_dir, jobs_dir=None, ai_models=None, keep=10):
+        self.csv_path = os.path.abspath(csv_path)
+        self.models_dir = os.path.abspath(models_dir)
+        self.jobs_dir = jobs_dir or DEFAULT_JOBS_DIR
+        self.ai_models = ai_models
+        self.keep = keep
+        self._processes = {}
+        self._lock = threading.Lock()
+
+    def _job_dir(self, job_id):
+        if not _JOB_ID.match(job_id or ''):
+            return None
+        return os.path.join(self.jobs_dir, job_id)
+
+    def get(self, job_id):
+        """Current status of a job, or None if unknown"""
+        job_dir = self._job_dir(job_id)
+        if job_dir is None:
+            return None
+        status = _read_json(os.path.join(job_dir, STATUS_FILE))
+        if status and status['state'] not in FINAL_STATES and job_id not in self._processes \
+                and status.get('pid') and not _pid_alive(status['pid']):
+            # The job process died without reporting (e.g. killed with the server)
+            status['state'] = 'failed'
+            status['error'] = 'Training process exited unexpectedly'
+        return status
+
+    def list_jobs(self, limit=20):
+        if not os.path.isdir(self.jobs_dir):
+            return []
+        jobs = [self.get(job_id) for job_id in os.listdir(self.jobs_dir) if _JOB_ID.match(job_id)]
+        jobs = [job for job in jobs if job]
+        jobs.sort(key=lambda job: job['created_at'], reverse=True)
+        return jobs[:limit]
+
+    @contextmanager
+    def _start_lock(self):
+        """Exclusive across threads and worker processes; released if the holder dies"""
+        os.makedirs(self.jobs_dir, exist_ok=True)
+        with self._lock, open(os.path.join(self.jobs_dir, LOCK_FILE), 'a') as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def active_job(self):
+        for job in self.list_jobs(limit=self.keep):
+            if job['state'] not in FINAL_STATES:
+                return job
+        return None
+
+    def start(self, options=None):
+        """Launch a training job; returns its status, or None if one is already running"""
+        options = validate_options(options)
+        # The check and the new job's status.json must be atomic for all web
+        # workers, not just this one's threads
+        with self._start_lock():
+            if self.active_job() is not None:
+                return None
+
+            job_id = uuid.uuid4().hex[:12]
+            job_dir = self._job_dir(job_id)
+            os.makedirs(job_dir)
+            _write_json(os.path.join(job_dir, JOB_FILE), {
+                'job_id': job_id,
+                'csv_path': self.csv_path,
+                'publish_dir': self.models_dir,
+                'options': options
+            })
+            status = {
+                'job_id': job_id,
+                'state': 'queued',
+                'stage': None,
+                'options': options,
+                'created_at': datetime.now().isoformat(),
+                'progress': {'epochs_completed': 0, 'epochs_total': options['epochs']},
+                'epochs': [],
+                'timings': {}
+            }
+            _write_json(os.path.join(job_dir, STATUS_FILE), status)
+
+            with open(os.path.join(job_dir, LOG_FILE), 'a') as log:
+                process = subprocess.Popen(
+                    [sys.executable, os.path.abspath(__file__), 'run', job_dir],
+                    cwd=os.path.dirname(os.path.abspath(__file__)),
+                    stdout=log, stderr=subprocess.STDOUT,
+                    # Own process group: cancellation also stops epoch workers
+                    start_new_session=True
+                )
+            self._processes[job_id] = process
+
+        threading.Thread(target=self._monitor, args=(job_id, process),
+                         name=f'training-job-{job_id}', daemon=True).start()
+        logger.info(f"Started training job {job_id} (pid {process.pid}) with {options}")
+        self.prune()
+        return status
+
+    def cancel(self, job_id):
+        """Signal a running job; returns the status, or None if unknown"""
+        status = self.get(job_id)
+        if status is None or status['state'] in FINAL_STATES:
+            return status
+        if status.get('stage') == PUBLISH_STEP:
+            raise RuntimeError("Job is publishing its release and can no longer be cancelled")
+        process = self._processes.get(job_id)
+        pid = process.pid if process is not None else status.get('pid')
+        if pid is None:
+            raise RuntimeError("Job has not started yet; retry shortly")
+        try:
+            os.killpg(pid, signal.SIGTERM)
+        except ProcessLookupError:
+            pass
+        logger.info(f"Cancellation requested for training job {job_id}")
+        return dict(status, cancel_requested=True)
+
+    def _monitor(self, job_id, process):
+        returncode = process.wait()
+        with self._lock:
+            self._processes.pop(job_id, None)
+        status_path = os.path.join(self._job_dir(job_id), STATUS_FILE)
+        status = _read_json(status_path) or {'job_id': job_id}
+        if status.get('state') not in FINAL_STATES:
+            if returncode == -signal.SIGTERM:
+                # Cancelled before the job installed its signal handler
+                status.update(state='cancelled')
+            else:
+                status.update(state='failed', error=f"Training process exited with code {returncode}")
+            status['finished_at'] = datetime.now().isoformat()
+            _write_json(status_path, status)
+        logger.info(f"Training job {job_id} finished: {status['state']}")
+
+        if status['state'] == 'succeeded' and self.ai_models is not None:
+            try:
+                self.ai_models.reload_models(background=True)
+            except Exception as e:
+                logger.error(f"Reload after training job {job_id} failed: {str(e)}")
+
+    def prune(self):
+        """Delete the oldest finished job directories beyond `keep`"""
+        for job in self.list_jobs(limit=None)[self.keep:]:
+            if job['state'] in FINAL_STATES:
+                shutil.rmtree(self._job_dir(job['job_id']), ignore_errors=True)
+
+if __name__ == "__main__":
+    if len(sys.argv) == 3 and sys.argv[1] == 'run':
+        sys.exit(run_job(sys.argv[2]))
+    print("Usage: python training_jobs.py run <job_dir>")
+    sys.exit(1)